@@ -0,0 +1,227 @@
+"""
+Per-request query and latency instrumentation.
+
+RequestMetricsMiddleware records, for every request, the number of SQL
+queries and the time spent in them, the time spent serializing (sections
+wrapped in track('serializer'), e.g. by SerializerTimingMixin) and the total
+latency, labelled by URL name (`campaign-search`, `verify-repayment`, ...).
+Totals are kept per process in REGISTRY and exposed in the Prometheus text
+format by backend.views.MetricsView. A request that runs more queries than
+its endpoint's budget (settings.QUERY_BUDGETS, else
+settings.QUERY_BUDGET_DEFAULT) is logged with its most repeated statement,
+which is usually the N+1.
+
+Queries are counted by a database execute wrapper that reads the current
+request from a context variable, so queries run in sync_to_async threads
+are attributed to the request that started them.
+"""
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = Counter()
+        self.timings = defaultdict(float)  # track() section -> seconds
+        self.depth = defaultdict(int)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_seconds += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.statements[sql] += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+@contextlib.contextmanager
+def track(section):
+    """Add the time spent in the block to the current request's `section` timing; nested blocks count once."""
+    metrics = _current.get()
+    if metrics is None or metrics.depth[section]:
+        yield
+        return
+    metrics.depth[section] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[section] += time.perf_counter() - started
+        metrics.depth[section] -= 1
+
+
+class SerializerTimingMixin:
+    """For DRF serializers: time to_representation() as the request's serializer time."""
+
+    def to_representation(self, instance):
+        with track('serializer'):
+            return super().to_representation(instance)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide totals per endpoint, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()  # (endpoint, method, status) -> count
+            self.over_budget = Counter()  # endpoint -> count
+            self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+            self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+            self.sql_seconds = defaultdict(float)
+            self.serializer_seconds = defaultdict(float)
+
+    def observe(self, endpoint, method, status, metrics, duration, over_budget):
+        with self._lock:
+            self.requests[endpoint, method, status] += 1
+            self.latency[endpoint].observe(duration)
+            self.queries[endpoint].observe(metrics.queries)
+            self.sql_seconds[endpoint] += metrics.sql_seconds
+            self.serializer_seconds[endpoint] += metrics.timings['serializer']
+            if over_budget:
+                self.over_budget[endpoint] += 1
+
+    def render(self):
+        lines = []
+
+        def header(name, kind, text):
+            lines.extend([f"# HELP {name} {text}", f"# TYPE {name} {kind}"])
+
+        def histogram(name, histograms):
+            for endpoint, values in sorted(histograms.items()):
+                for bound, count in zip(values.buckets, values.counts):
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {values.count}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {values.sum}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {values.count}')
+
+        with self._lock:
+            header('darb_http_requests_total', 'counter', "Requests by URL name, method and status.")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'darb_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            header('darb_http_request_duration_seconds', 'histogram', "Time to produce the response.")
+            histogram('darb_http_request_duration_seconds', self.latency)
+            header('darb_http_request_queries', 'histogram', "SQL queries per request.")
+            histogram('darb_http_request_queries', self.queries)
+            for name, totals, text in (
+                ('darb_http_request_sql_seconds_total', self.sql_seconds, "Time spent in SQL queries."),
+                ('darb_http_request_serializer_seconds_total', self.serializer_seconds, "Time spent serializing."),
+                ('darb_http_query_budget_exceeded_total', self.over_budget, "Requests over their query budget."),
+            ):
+                header(name, 'counter', text)
+                for endpoint, value in sorted(totals.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def query_budget(endpoint):
+    return settings.QUERY_BUDGETS.get(endpoint, settings.QUERY_BUDGET_DEFAULT)
+
+
+class RequestMetricsMiddleware:
+    """Keep it first in MIDDLEWARE so the latency covers the other middleware too."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics)
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        endpoint = (match.url_name or match.view_name) if match else 'unmatched'
+        budget = query_budget(endpoint)
+        over_budget = metrics.queries > budget
+        if over_budget:
+            statement, repeats = metrics.statements.most_common(1)[0]
+            logger.warning(
+                "%s %s (%s) ran %d queries, over its budget of %d; most repeated (%dx): %s",
+                request.method, request.path, endpoint, metrics.queries, budget, repeats, statement,
+            )
+        REGISTRY.observe(endpoint, request.method, response.status_code, metrics, duration, over_budget)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.sql_seconds * 1000:.1f};desc="{metrics.queries} queries"',
+                f"serializer;dur={metrics.timings['serializer'] * 1000:.1f}",
+                f"total;dur={duration * 1000:.1f}",
+            ])
+        return response
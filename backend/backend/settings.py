@@ -27,6 +27,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY', 'fallback_secret_key')
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY")
+PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+# Shared Paystack HTTP client (payments/paystack.py): keep-alive pool, timeouts in seconds, retries (POSTs
+# only when the connection failed)
+PAYSTACK_POOL_SIZE = int(os.getenv('PAYSTACK_POOL_SIZE', '10'))
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv('PAYSTACK_CONNECT_TIMEOUT', '3.05'))
+PAYSTACK_READ_TIMEOUT = float(os.getenv('PAYSTACK_READ_TIMEOUT', '10'))
+PAYSTACK_MAX_RETRIES = int(os.getenv('PAYSTACK_MAX_RETRIES', '3'))
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
@@ -52,6 +59,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -127,7 +135,69 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Direct upload URLs (api/uploads/direct/): per client IP before sign-up, per user after
+    'DEFAULT_THROTTLE_RATES': {
+        'direct-upload-anon': os.getenv('DIRECT_UPLOAD_ANON_RATE', '20/hour'),
+        'direct-upload': os.getenv('DIRECT_UPLOAD_RATE', '120/hour'),
+    },
+}
+
+# Default page size for the campaign list/search endpoints (clients may pass ?page_size=)
+CAMPAIGN_PAGE_SIZE = int(os.getenv('CAMPAIGN_PAGE_SIZE', '20'))
+
+# Dotted path to a campaigns.search backend; empty picks one for the database vendor
+CAMPAIGN_SEARCH_BACKEND = os.getenv('CAMPAIGN_SEARCH_BACKEND', '')
+
+# Most (campaign, amount) items one batch funding request may carry
+LOAN_BATCH_MAX_ITEMS = int(os.getenv('LOAN_BATCH_MAX_ITEMS', '100'))
+
+# Cache backend: CACHE_BACKEND=locmem (default, per process), file or redis (needs the redis package).
+# CACHE_LOCATION is the directory for file and the URL for redis.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'darb'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', _CACHE_BACKENDS[CACHE_BACKEND][1]),
+    }
+}
+# Serialized campaign payloads (campaigns/cache.py): cache alias and lifetime in seconds. The lifetime
+# also bounds how long a 304 keeps a copy alive, so keep it well under PRIVATE_MEDIA_URL_EXPIRY.
+CAMPAIGN_CACHE_ALIAS = os.getenv('CAMPAIGN_CACHE_ALIAS', 'default')
+CAMPAIGN_CACHE_TIMEOUT = int(os.getenv('CAMPAIGN_CACHE_TIMEOUT', '300'))
+# Live progress streams (campaigns/events.py). The default broker only reaches viewers in the same
+# process; run several ASGI workers with campaigns.events.RedisBroker and CAMPAIGN_EVENTS_REDIS_URL.
+CAMPAIGN_EVENTS_BROKER = os.getenv('CAMPAIGN_EVENTS_BROKER', 'campaigns.events.LocalBroker')
+CAMPAIGN_EVENTS_REDIS_URL = os.getenv('CAMPAIGN_EVENTS_REDIS_URL', 'redis://127.0.0.1:6379/2')
+CAMPAIGN_STREAM_HEARTBEAT = float(os.getenv('CAMPAIGN_STREAM_HEARTBEAT', '15'))  # Seconds between keep-alives
+# Multipart uploads (backend/uploads.py): largest file accepted per field, in bytes, and accepted types
+UPLOAD_MAX_SIZES = {
+    'image': int(os.getenv('UPLOAD_MAX_IMAGE_SIZE', str(10 * 1024 * 1024))),
+    'cac_d_img': int(os.getenv('UPLOAD_MAX_DOCUMENT_SIZE', str(5 * 1024 * 1024))),
+    'identity_document': int(os.getenv('UPLOAD_MAX_DOCUMENT_SIZE', str(5 * 1024 * 1024))),
+}
+UPLOAD_CONTENT_TYPES = ('image/jpeg', 'image/png', 'image/webp')
+# Seconds a direct-upload URL / token from api/uploads/direct/ stays valid
+DIRECT_UPLOAD_EXPIRY = int(os.getenv('DIRECT_UPLOAD_EXPIRY', '900'))
+# Request instrumentation (backend/metrics.py). A request running more SQL queries than its URL name's
+# budget is logged with its most repeated statement. Scrapers of /metrics must send METRICS_TOKEN as a
+# bearer token; without one set, the endpoint only answers when DEBUG is on.
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '10'))
+QUERY_BUDGETS = {
+    'campaign-create': 2,  # The ETag's last_updated() probe + the cursor page, answered from the payload cache
+    'campaign-search': 2,
+    'campaign-progress': 3,
+    'campaign-due': 2,
+    'verify-repayment': 6,
+    'async-verify-repayment': 6,
+    'loan-batch': 15,  # The same statements however many campaigns a batch funds
 }
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_SERVER_TIMING = DEBUG  # Server-Timing response header, for browser dev tools
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
@@ -170,6 +240,38 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media storage (backend/storage.py), content-addressed either way: MEDIA_STORAGE=filesystem (default,
+# MEDIA_ROOT) or s3 (any S3-compatible store such as MinIO, configured by the S3_* settings).
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'filesystem')
+_MEDIA_STORAGES = {
+    'filesystem': 'backend.storage.HashedFileSystemStorage',
+    's3': 'backend.storage.S3Storage',
+}
+STORAGES = {
+    'default': {'BACKEND': _MEDIA_STORAGES[MEDIA_STORAGE]},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', 'http://127.0.0.1:9000')
+S3_BUCKET = os.getenv('S3_BUCKET', 'darb-media')
+S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID', '')
+S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY', '')
+S3_PUBLIC_URL = os.getenv('S3_PUBLIC_URL', '')  # e.g. a CDN in front of the bucket; defaults to the bucket URL
+
+# Documents under these prefixes only get signed, expiring links (api/media/...), valid for
+# PRIVATE_MEDIA_URL_EXPIRY seconds. On the filesystem they are stored under PRIVATE_MEDIA_ROOT, which
+# must never be mapped to a URL: a web server should only serve it through an `internal` location.
+# MEDIA_SENDFILE_HEADER hands the file to the web server instead of streaming it through Django:
+# X-Accel-Redirect (nginx) or X-Sendfile (Apache / lighttpd). For nginx:
+#     location /protected-media/ { internal; alias /path/to/private_media/; }
+# where /protected-media/ is MEDIA_ACCEL_REDIRECT_PREFIX and the alias is PRIVATE_MEDIA_ROOT.
+# Deployments that kept these documents under MEDIA_ROOT move MEDIA_ROOT/<prefix> into PRIVATE_MEDIA_ROOT.
+PRIVATE_MEDIA_PREFIXES = ('cac_documents/', 'identity_documents/')
+PRIVATE_MEDIA_ROOT = os.getenv('PRIVATE_MEDIA_ROOT', os.path.join(BASE_DIR, 'private_media'))
+PRIVATE_MEDIA_URL_EXPIRY = int(os.getenv('PRIVATE_MEDIA_URL_EXPIRY', '3600'))
+MEDIA_SENDFILE_HEADER = os.getenv('MEDIA_SENDFILE_HEADER', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
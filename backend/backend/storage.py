@@ -0,0 +1,256 @@
+"""
+Media storage backends.
+
+Both backends store each upload under its content hash,
+<upload_to>/<sha256[:2]>/<sha256><ext>, so the same document uploaded twice
+is kept once, and let clients upload straight to storage:
+presigned_upload() returns the request ({"method", "url", "headers"}) the
+client sends the file with, so the app server never handles its bytes.
+  - HashedFileSystemStorage keeps files under MEDIA_ROOT, and private
+    documents under PRIVATE_MEDIA_ROOT, which no /media/ route serves. Its
+    upload "presigning" points at backend.views.LocalUploadView, which
+    stands in for an object store in development and tests.
+  - S3Storage talks to any S3-compatible store (AWS S3, MinIO) with
+    SigV4-presigned requests.
+Files under PRIVATE_MEDIA_PREFIXES never get a public URL: url() returns a
+short-lived signed link to backend.views.PrivateMediaView, which serves them
+with X-Accel-Redirect / X-Sendfile or a redirect to a presigned GET.
+"""
+import base64
+import datetime
+import hashlib
+import hmac
+import posixpath
+import tempfile
+from urllib.parse import quote, urlencode, urlsplit
+import httpx
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.deconstruct import deconstructible
+
+PRIVATE_MEDIA_SALT = 'private-media'
+LOCAL_UPLOAD_SALT = 'local-upload'
+
+
+def file_digest(content):
+    """SHA-256 of a File, reusing the one LimitedUploadHandler computed while streaming it in."""
+    digest = getattr(content, 'sha256', None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        digest = sha256.hexdigest()
+    return digest
+
+
+def hashed_name(name, digest):
+    """Content-addressed name for `name`: same directory and extension, hash as the file name."""
+    directory, filename = posixpath.split(name)
+    stem, extension = posixpath.splitext(filename)
+    if stem == digest and posixpath.basename(directory) == digest[:2]:
+        return name  # Already content-addressed, e.g. a direct upload
+    return posixpath.join(directory, digest[:2], f"{digest}{extension.lower()}")
+
+
+def is_private(name):
+    return name.startswith(tuple(settings.PRIVATE_MEDIA_PREFIXES))
+
+
+def private_media_url(name):
+    """A link to PrivateMediaView for `name`, valid for PRIVATE_MEDIA_URL_EXPIRY seconds."""
+    token = signing.TimestampSigner(salt=PRIVATE_MEDIA_SALT).sign(name)[len(name) + 1:]
+    return f"{reverse('private-media', kwargs={'name': name})}?{urlencode({'token': token})}"
+
+
+def check_private_media_token(name, token):
+    """Raise signing.BadSignature unless `token` came from private_media_url(name) and has not expired."""
+    signing.TimestampSigner(salt=PRIVATE_MEDIA_SALT).unsign(
+        f"{name}:{token}", max_age=settings.PRIVATE_MEDIA_URL_EXPIRY
+    )
+
+
+class ContentAddressedMixin:
+    content_addressed = True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(name, file_digest(content))
+        if self.exists(name):
+            return name  # Already stored: same bytes, same name
+        return super().save(name, content, max_length=max_length)
+
+    def url(self, name):
+        if is_private(name):
+            return private_media_url(name)
+        return super().url(name)
+
+
+@deconstructible(path='backend.storage.HashedFileSystemStorage')
+class HashedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Two writers of one name are writing the same bytes
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    # Private documents live outside MEDIA_ROOT, so neither static() in DEBUG nor a web server's
+    # /media/ alias can reach them. Everything but _save() finds files through path().
+    def path(self, name):
+        if is_private(name):
+            return safe_join(settings.PRIVATE_MEDIA_ROOT, name)
+        return super().path(name)
+
+    def _save(self, name, content):
+        if is_private(name):
+            return self.private_storage()._save(name, content)
+        return super()._save(name, content)
+
+    def private_storage(self):
+        return FileSystemStorage(
+            location=settings.PRIVATE_MEDIA_ROOT, allow_overwrite=True,
+            file_permissions_mode=self.file_permissions_mode, directory_permissions_mode=self.directory_permissions_mode,
+        )
+
+    def presigned_upload(self, name, content_type, size, sha256):
+        token = signing.dumps(
+            {'name': name, 'content_type': content_type, 'size': size, 'sha256': sha256}, salt=LOCAL_UPLOAD_SALT
+        )
+        return {
+            'method': 'PUT',
+            'url': reverse('local-upload', kwargs={'token': token}),
+            'headers': {'Content-Type': content_type},
+        }
+
+
+def presign_url(method, url, access_key, secret_key, region, expires, headers=None, now=None):
+    """
+    AWS Signature Version 4 query-string signing of `url`. `headers`
+    ({name: value}) are signed too, so the request must carry them
+    unchanged; the payload itself is left unsigned.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date, date = now.strftime('%Y%m%dT%H%M%SZ'), now.strftime('%Y%m%d')
+    parts = urlsplit(url)
+    headers = {'host': parts.netloc, **{key.lower(): str(value).strip() for key, value in (headers or {}).items()}}
+    signed_headers = ';'.join(sorted(headers))
+    scope = f"{date}/{region}/s3/aws4_request"
+    query = {
+        'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+        'X-Amz-Credential': f"{access_key}/{scope}",
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(expires),
+        'X-Amz-SignedHeaders': signed_headers,
+    }
+    canonical_query = '&'.join(f"{quote(key, safe='-_.~')}={quote(value, safe='-_.~')}" for key, value in sorted(query.items()))
+    canonical_request = '\n'.join([
+        method,
+        quote(parts.path or '/', safe='/-_.~'),
+        canonical_query,
+        ''.join(f"{key}:{headers[key]}\n" for key in sorted(headers)),
+        signed_headers,
+        'UNSIGNED-PAYLOAD',
+    ])
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = f"AWS4{secret_key}".encode()
+    for part in (date, region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    return f"{parts.scheme}://{parts.netloc}{quote(parts.path or '/', safe='/-_.~')}?{canonical_query}&X-Amz-Signature={signature}"
+
+
+@deconstructible(path='backend.storage.S3Storage')
+class S3Storage(ContentAddressedMixin, Storage):
+    """
+    Objects live in settings.S3_BUCKET at settings.S3_ENDPOINT_URL
+    (path-style addressing, as MinIO expects). Every request, the server's
+    own included, is a presigned URL, so no SDK is needed.
+    """
+    request_expiry = 60
+
+    def __init__(self, endpoint_url=None, bucket=None, region=None, access_key=None, secret_key=None, public_url=None):
+        self.endpoint_url = (endpoint_url or settings.S3_ENDPOINT_URL).rstrip('/')
+        self.bucket = bucket or settings.S3_BUCKET
+        self.region = region or settings.S3_REGION
+        self.access_key = access_key or settings.S3_ACCESS_KEY_ID
+        self.secret_key = secret_key or settings.S3_SECRET_ACCESS_KEY
+        self.public_url = (public_url or settings.S3_PUBLIC_URL or f"{self.endpoint_url}/{self.bucket}").rstrip('/')
+
+    def object_url(self, name):
+        return f"{self.endpoint_url}/{self.bucket}/{name}"
+
+    def presign(self, method, name, expires=None, headers=None):
+        return presign_url(
+            method, self.object_url(name), self.access_key, self.secret_key, self.region,
+            expires or self.request_expiry, headers=headers,
+        )
+
+    def request(self, method, name, headers=None, **kwargs):
+        return httpx.request(method, self.presign(method, name, headers=headers), headers=headers, **kwargs)
+
+    def _save(self, name, content):
+        headers = {
+            'Content-Type': getattr(content, 'content_type', None) or 'application/octet-stream',
+            'Content-Length': str(content.size),
+        }
+        self.request('PUT', name, headers=headers, content=content.chunks()).raise_for_status()
+        return name
+
+    def _open(self, name, mode='rb'):
+        spooled = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        with httpx.stream('GET', self.presign('GET', name)) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                spooled.write(chunk)
+        spooled.seek(0)
+        return File(spooled, name)
+
+    def read_head(self, name, size):
+        """The first `size` bytes of an object, with a ranged GET."""
+        response = self.request('GET', name, headers={'Range': f"bytes=0-{size - 1}"})
+        if response.status_code == 404:
+            raise FileNotFoundError(name)
+        response.raise_for_status()
+        return response.content[:size]
+
+    def exists(self, name):
+        return self.request('HEAD', name).status_code == 200
+
+    def size(self, name):
+        response = self.request('HEAD', name)
+        response.raise_for_status()
+        return int(response.headers['Content-Length'])
+
+    def delete(self, name):
+        response = self.request('DELETE', name)
+        if response.status_code not in (204, 404):
+            response.raise_for_status()
+
+    def get_available_name(self, name, max_length=None):
+        return name  # Content-addressed: overwriting a name rewrites the same bytes
+
+    def url(self, name):
+        if is_private(name):
+            return private_media_url(name)
+        return f"{self.public_url}/{quote(name)}"
+
+    def presigned_url(self, name):
+        """Short-lived GET for PrivateMediaView to redirect to."""
+        return self.presign('GET', name, expires=settings.PRIVATE_MEDIA_URL_EXPIRY)
+
+    def presigned_upload(self, name, content_type, size, sha256):
+        # S3 checks the signed length and checksum, so the object really has the content its name claims
+        headers = {
+            'Content-Type': content_type,
+            'x-amz-checksum-sha256': base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        url = self.presign('PUT', name, expires=settings.DIRECT_UPLOAD_EXPIRY, headers={**headers, 'Content-Length': size})
+        return {'method': 'PUT', 'url': url, 'headers': headers}
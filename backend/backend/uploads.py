@@ -0,0 +1,202 @@
+"""
+Size- and type-bounded handling of multipart file uploads.
+
+Views that accept documents (campaign banners and CAC scans, identity
+documents) list their file fields in LimitedUploadMixin.upload_fields. Each
+upload is streamed chunk by chunk into a temporary file on disk, never held in
+memory, while a SHA-256 of its content is computed; the finished file carries
+it as `.sha256`. A request is rejected as soon as it can be told apart:
+  - by Content-Length, before any of the body is read, when it exceeds what
+    the allowed fields could add up to;
+  - by the declared content type or the first bytes of a file;
+  - by size, at the chunk that takes a file past its field's limit.
+Saving the upload moves the temporary file into FileSystemStorage rather
+than copying it again.
+
+Clients can instead upload straight to storage (backend.views.DirectUploadView)
+and send the returned token in the matching DirectUploadField, which checks
+the first bytes of the stored file before accepting it.
+"""
+import hashlib
+import mimetypes
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+# Leading bytes of each accepted content type
+SIGNATURES = {
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'image/webp': (b'RIFF',),  # Followed by the size and b'WEBP', checked below
+}
+# File fields that accept direct uploads, and the model each belongs to
+DIRECT_UPLOAD_FIELDS = {
+    'image': 'campaigns.Campaign',
+    'cac_d_img': 'campaigns.Campaign',
+    'identity_document': 'users.User',
+}
+DIRECT_UPLOAD_SALT = 'direct-upload'
+# Headers, boundaries and the plain form fields sent alongside the files
+FORM_OVERHEAD = 64 * 1024
+# Bytes sniff_content_type() needs to tell the accepted types apart
+SNIFF_SIZE = 12
+
+
+class UploadRejected(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'upload_rejected'
+
+    def __init__(self, detail, status_code=None):
+        super().__init__(detail)
+        if status_code is not None:
+            self.status_code = status_code
+
+
+def sniff_content_type(head):
+    """The accepted content type `head` (a file's first bytes) starts with, or None."""
+    for content_type, signatures in SIGNATURES.items():
+        if head.startswith(signatures):
+            if content_type == 'image/webp' and head[8:12] != b'WEBP':
+                continue
+            return content_type
+    return None
+
+
+def stored_head(name):
+    """The first SNIFF_SIZE bytes of a stored file, with a ranged read where the storage has one."""
+    if hasattr(default_storage, 'read_head'):
+        return default_storage.read_head(name, SNIFF_SIZE)
+    with default_storage.open(name) as file:
+        return file.read(SNIFF_SIZE)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    Stream each file of `limits` ({field name: max bytes}) to a temporary file,
+    hashing it on the way, and raise UploadRejected for anything else: files in
+    other fields, content types outside settings.UPLOAD_CONTENT_TYPES, content
+    that does not match its declared type, or files over their limit.
+    """
+
+    def __init__(self, request=None, limits=None):
+        super().__init__(request)
+        self.limits = limits or {}
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > sum(self.limits.values()) + FORM_OVERHEAD:
+            raise UploadRejected(
+                "Request body is larger than the allowed uploads.", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if field_name not in self.limits:
+            raise UploadRejected(f"Unexpected file field '{field_name}'.")
+        if content_type not in settings.UPLOAD_CONTENT_TYPES:
+            raise UploadRejected(
+                f"{field_name}: unsupported file type '{content_type}'.", status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        if content_length is not None and content_length > self.limits[field_name]:
+            self.reject_size()
+        self.file = TemporaryUploadedFile(file_name, content_type, 0, charset, content_type_extra)
+        self.hash = hashlib.sha256()
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.limits[self.field_name]:
+            self.abort()
+            self.reject_size()
+        if len(self.head) < SNIFF_SIZE:
+            self.head += raw_data[:SNIFF_SIZE - len(self.head)]
+            if len(self.head) == SNIFF_SIZE and sniff_content_type(self.head) != self.content_type:
+                self.abort()
+                raise UploadRejected(
+                    f"{self.field_name}: content does not match '{self.content_type}'.",
+                    status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                )
+        self.hash.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if sniff_content_type(self.head) != self.content_type:  # Shorter than any signature
+            self.abort()
+            raise UploadRejected(f"{self.field_name}: file is empty or truncated.")
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hash.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if getattr(self, 'file', None) is not None:
+            self.abort()
+
+    def abort(self):
+        self.file.close()  # Deletes the temporary file
+
+    def reject_size(self):
+        raise UploadRejected(
+            f"{self.field_name}: file is larger than {self.limits[self.field_name] // (1024 * 1024)} MB.",
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+
+class LimitedUploadMixin:
+    """
+    For views taking multipart uploads: only the `upload_fields` may carry
+    files, each up to settings.UPLOAD_MAX_SIZES[field] bytes.
+    """
+    upload_fields = ()
+
+    def initialize_request(self, request, *args, **kwargs):
+        limits = {field: settings.UPLOAD_MAX_SIZES[field] for field in self.upload_fields}
+        request.upload_handlers = [LimitedUploadHandler(request, limits)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+def upload_directory(field):
+    """The upload_to directory of a DIRECT_UPLOAD_FIELDS field."""
+    return apps.get_model(DIRECT_UPLOAD_FIELDS[field])._meta.get_field(field).upload_to
+
+
+def direct_upload_token(field, name):
+    return signing.dumps({'field': field, 'name': name}, salt=DIRECT_UPLOAD_SALT)
+
+
+class DirectUploadField(serializers.CharField):
+    """
+    Write-only alternative to a file field: takes the token DirectUploadView
+    issued for a completed direct upload and sets the file field (its
+    `source`) to the stored name. The object store only checked the upload's
+    size and SHA-256, so a stored file whose first bytes do not match the
+    type in its name is deleted and refused here.
+    """
+
+    def __init__(self, field, **kwargs):
+        self.upload_field = field
+        kwargs.setdefault('source', field)
+        kwargs.setdefault('write_only', True)
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        token = super().to_internal_value(data)
+        try:
+            claim = signing.loads(token, salt=DIRECT_UPLOAD_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRY)
+        except signing.BadSignature:
+            raise serializers.ValidationError("Invalid or expired upload token.")
+        name = claim['name']
+        try:
+            head = stored_head(name) if claim['field'] == self.upload_field else None
+        except FileNotFoundError:
+            head = None
+        if head is None:
+            raise serializers.ValidationError("Upload not found; it must finish before the form is sent.")
+        if sniff_content_type(head) != mimetypes.guess_type(name)[0]:
+            default_storage.delete(name)
+            raise serializers.ValidationError("Uploaded file does not match its declared type.")
+        return name
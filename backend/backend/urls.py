@@ -18,12 +18,17 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from .views import DirectUploadView, LocalUploadView, MetricsView, PrivateMediaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/campaigns/', include('campaigns.urls')),
     path('api/payments/', include('payments.urls')),
+    path('api/uploads/direct/', DirectUploadView.as_view(), name='direct-upload'),
+    path('api/uploads/local/<str:token>/', LocalUploadView.as_view(), name='local-upload'),
+    path('api/media/<path:name>', PrivateMediaView.as_view(), name='private-media'),  # Signed links only
+    path('metrics', MetricsView.as_view(), name='metrics'),  # Prometheus scrape target
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
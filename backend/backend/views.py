@@ -0,0 +1,165 @@
+import hashlib
+import hmac
+import mimetypes
+import posixpath
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import serializers, status
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.response import Response
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework.views import APIView
+from .metrics import REGISTRY
+from .storage import LOCAL_UPLOAD_SALT, check_private_media_token, hashed_name, is_private
+from .uploads import DIRECT_UPLOAD_FIELDS, SNIFF_SIZE, direct_upload_token, sniff_content_type, upload_directory
+
+
+class DirectUploadSerializer(serializers.Serializer):
+    field = serializers.ChoiceField(choices=list(DIRECT_UPLOAD_FIELDS))
+    content_type = serializers.ChoiceField(choices=settings.UPLOAD_CONTENT_TYPES)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-f]{64}$')
+
+    def validate(self, attrs):
+        limit = settings.UPLOAD_MAX_SIZES[attrs['field']]
+        if attrs['size'] > limit:
+            raise serializers.ValidationError({'size': f"Must be at most {limit} bytes."})
+        return attrs
+
+
+class AnonymousUploadThrottle(AnonRateThrottle):
+    scope = 'direct-upload-anon'
+
+
+class UserUploadThrottle(UserRateThrottle):
+    scope = 'direct-upload'
+
+
+class DirectUploadView(APIView):
+    """
+    Step one of a direct upload. Given the file's field, type, size and
+    SHA-256, return its content-addressed name, the token to submit in the
+    form's `<field>_upload` field, and the request to upload it with, or
+    `"upload": null` when the same file is already stored.
+    """
+    permission_classes = []
+    throttle_classes = [AnonymousUploadThrottle, UserUploadThrottle]
+    anonymous_fields = ('identity_document',)  # Sent with the registration form, before there is an account
+
+    def post(self, request):
+        serializer = DirectUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        field, content_type, size, sha256 = (serializer.validated_data[key] for key in ('field', 'content_type', 'size', 'sha256'))
+        if field not in self.anonymous_fields and not request.user.is_authenticated:
+            raise NotAuthenticated()
+
+        extension = mimetypes.guess_extension(content_type)
+        name = hashed_name(posixpath.join(upload_directory(field), f"upload{extension}"), sha256)
+        upload = None
+        if not default_storage.exists(name):
+            upload = default_storage.presigned_upload(name, content_type, size, sha256)
+            upload['url'] = request.build_absolute_uri(upload['url'])
+        return Response({'name': name, 'token': direct_upload_token(field, name), 'upload': upload})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LocalUploadView(View):
+    """
+    Receives a direct upload for HashedFileSystemStorage, as an object store
+    would: a PUT of the raw file to the URL presigned_upload() signed. The body
+    is streamed to a temporary file and kept only if its first bytes match the
+    signed content type and its size and SHA-256 are the ones signed for.
+    """
+    chunk_size = 64 * 1024
+
+    def put(self, request, token):
+        try:
+            claim = signing.loads(token, salt=LOCAL_UPLOAD_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRY)
+        except signing.BadSignature:
+            return HttpResponseForbidden("Invalid or expired upload URL.")
+        if request.content_type != claim['content_type'] or request.META.get('CONTENT_LENGTH') != str(claim['size']):
+            return HttpResponse("Content-Type or Content-Length differs from the signed upload.",
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        sha256, head = hashlib.sha256(), b''
+        with TemporaryUploadedFile(claim['name'], claim['content_type'], claim['size'], None) as file:
+            remaining = claim['size']
+            while remaining:
+                chunk = request.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                if len(head) < SNIFF_SIZE:
+                    head += chunk[:SNIFF_SIZE - len(head)]
+                    if len(head) == SNIFF_SIZE and sniff_content_type(head) != claim['content_type']:
+                        return HttpResponse(f"Content does not match '{claim['content_type']}'.",
+                                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+                sha256.update(chunk)
+                file.write(chunk)
+                remaining -= len(chunk)
+            if sniff_content_type(head) != claim['content_type']:  # Shorter than any signature
+                return HttpResponse("File is empty or truncated.", status=status.HTTP_400_BAD_REQUEST)
+            if remaining or sha256.hexdigest() != claim['sha256']:
+                return HttpResponse("Upload does not match its signed size and SHA-256.",
+                                    status=status.HTTP_400_BAD_REQUEST)
+            file.seek(0)
+            file.sha256 = claim['sha256']
+            default_storage.save(claim['name'], file)
+        return HttpResponse(status=status.HTTP_200_OK)
+
+
+class PrivateMediaView(View):
+    """
+    Serves a private document (PRIVATE_MEDIA_PREFIXES) to holders of a link
+    from storage.private_media_url(). The bytes are sent by the web server
+    (MEDIA_SENDFILE_HEADER) or the object store (a presigned redirect) where
+    possible, and only by Django as a fallback.
+    """
+
+    def get(self, request, name):
+        if not is_private(name):
+            raise Http404
+        try:
+            check_private_media_token(name, request.GET.get('token', ''))
+        except signing.BadSignature:
+            return HttpResponseForbidden("Invalid or expired link.")
+
+        if hasattr(default_storage, 'presigned_url'):
+            response = HttpResponseRedirect(default_storage.presigned_url(name))
+        elif not default_storage.exists(name):
+            raise Http404
+        elif settings.MEDIA_SENDFILE_HEADER == 'X-Accel-Redirect':
+            # nginx serves it from an `internal` location mapped to PRIVATE_MEDIA_ROOT
+            response = HttpResponse(content_type=mimetypes.guess_type(name)[0])
+            response['X-Accel-Redirect'] = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX}{name}"
+        elif settings.MEDIA_SENDFILE_HEADER:
+            # Apache mod_xsendfile / lighttpd take a filesystem path
+            response = HttpResponse(content_type=mimetypes.guess_type(name)[0])
+            response[settings.MEDIA_SENDFILE_HEADER] = default_storage.path(name)
+        else:
+            response = FileResponse(default_storage.open(name))
+        patch_cache_control(response, private=True, max_age=settings.PRIVATE_MEDIA_URL_EXPIRY)
+        return response
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint for this process's RequestMetricsMiddleware
+    totals. Scrapers must send settings.METRICS_TOKEN as a bearer token;
+    with no token configured it is only open when DEBUG is on.
+    """
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not token:
+            if not settings.DEBUG:
+                return HttpResponseForbidden("Set METRICS_TOKEN to enable the metrics endpoint.")
+        elif not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return HttpResponseForbidden()
+        return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,15 +1,24 @@
 from django.contrib import admin
-from .models import Campaign, Loan, Repayment
+from .models import Campaign, Loan, Repayment, RepaymentSchedule
 
 admin.site.site_header = "DARB ADMINISTRATION😎🔥🚀"
 admin.site.site_title = "Darb Admin Portal"
 admin.site.index_title = "Welcome to Darb Administration Portal"
 
+class RepaymentScheduleInline(admin.TabularInline):
+    model = RepaymentSchedule
+    fields = ('installment', 'due_date', 'amount', 'paid')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
     list_display = ('title', 'founder', 'goal_amount', 'current_amount', 'is_approved', 'created_at', 'funded_at')
     list_filter = ('is_approved', 'created_at')
     search_fields = ('title', 'founder__username')
+    readonly_fields = ('repaid_amount', 'verified_installments')
+    inlines = [RepaymentScheduleInline]
 
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
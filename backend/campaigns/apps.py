@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CampaignsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'campaigns'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import install_search_backend
+        from . import signals  # noqa: F401  (registers the cache version receivers)
+        post_migrate.connect(install_search_backend, sender=self)
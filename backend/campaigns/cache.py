@@ -0,0 +1,43 @@
+"""
+Cache of serialized campaign payloads.
+
+CampaignSerializer caches the part of its output that is the same for every
+caller under (campaign id, Campaign.version). The version is bumped in the
+same transaction as any change to the campaign (signals.py) and is read in
+the same query as the rest of the row, so a cached payload always matches the
+row it was looked up for; superseded entries are never read again and expire.
+Entries also expire after settings.CAMPAIGN_CACHE_TIMEOUT seconds, because
+monthly_due_info moves with the calendar.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Bump when the fields in the cached payload change, so entries in the old shape are never served
+PAYLOAD_FORMAT = 2
+
+
+def get_cache():
+    return caches[settings.CAMPAIGN_CACHE_ALIAS]
+
+
+def payload_key(campaign):
+    # Listings annotate the installments due so far, which moves with the
+    # calendar rather than the version; include it when it is known.
+    due = getattr(campaign, 'schedule_installments_due', '')
+    return f"campaign:{PAYLOAD_FORMAT}:{campaign.pk}:v{campaign.version}:{due}"
+
+
+def get_payloads(campaigns, build):
+    """
+    Return {campaign_id: payload} for `campaigns`, with one cache round trip
+    for the hits and one for storing whatever build(campaign) had to compute.
+    """
+    cache = get_cache()
+    keys = {payload_key(campaign): campaign for campaign in campaigns}
+    payloads = cache.get_many(keys)
+    missing = {key: build(campaign) for key, campaign in keys.items() if key not in payloads}
+    if missing:
+        cache.set_many(missing, timeout=settings.CAMPAIGN_CACHE_TIMEOUT)
+        payloads.update(missing)
+    return {campaign.pk: payloads[key] for key, campaign in keys.items()}
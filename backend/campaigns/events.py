@@ -0,0 +1,167 @@
+"""
+Live campaign progress for the server-sent events stream.
+
+When a Loan or Repayment commits, signals.py publishes the campaign's
+progress to the broker; every CampaignProgressStreamView connection watching
+that campaign holds a subscription and writes each message out as an SSE
+event. Brokers expose:
+  - publish(channel, message): called from sync code after commit.
+  - subscribe(channel): async context manager yielding an asyncio.Queue of
+    messages for the running event loop.
+
+The active broker is settings.CAMPAIGN_EVENTS_BROKER (a dotted path).
+LocalBroker fans out within one process; RedisBroker relays through Redis
+pub/sub so every worker process sees every commit.
+"""
+import asyncio
+import contextlib
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+from .models import Campaign
+
+PROGRESS_FIELDS = ('id', 'goal_amount', 'current_amount', 'interest_rate', 'funded_at', 'repaid_amount', 'version')
+
+
+class LocalBroker:
+    """
+    In-process fan-out. Each subscriber gets a small bounded queue; when a slow
+    client falls behind, its oldest message is dropped, since every progress
+    message carries the full current figures.
+    """
+    queue_size = 8
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # channel -> {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        self.deliver(str(channel), message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        by_loop = defaultdict(list)
+        for loop, queue in subscribers:
+            by_loop[loop].append(queue)
+        # One wake-up per event loop, however many viewers it serves
+        for loop, queues in by_loop.items():
+            with contextlib.suppress(RuntimeError):  # Loop already closed
+                loop.call_soon_threadsafe(self._put_all, queues, message)
+
+    def _put_all(self, queues, message):
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(str(channel), ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        channel = str(channel)
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker(LocalBroker):
+    """
+    Multi-process fan-out through Redis pub/sub (needs the redis package).
+    Messages are published to Redis; each event loop keeps one pattern
+    subscription and hands what it receives to the local subscribers, so a
+    process holds one Redis connection however many viewers it serves.
+    """
+    prefix = 'campaign-progress:'
+
+    def __init__(self, url=None):
+        super().__init__()
+        import redis
+        self.url = url or settings.CAMPAIGN_EVENTS_REDIS_URL
+        self._redis = redis.Redis.from_url(self.url)
+        self._listeners = {}  # loop -> listener task
+
+    def publish(self, channel, message):
+        self._redis.publish(f"{self.prefix}{channel}", json.dumps(message, cls=JSONEncoder))
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._listeners or self._listeners[loop].done():
+                self._listeners[loop] = loop.create_task(self._listen())
+        async with super().subscribe(channel) as queue:
+            yield queue
+
+    async def _listen(self):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        async with client.pubsub() as pubsub:
+            await pubsub.psubscribe(f"{self.prefix}*")
+            async for item in pubsub.listen():
+                if item['type'] == 'pmessage':
+                    channel = item['channel'].decode()[len(self.prefix):]
+                    self.deliver(channel, json.loads(item['data']))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by settings.CAMPAIGN_EVENTS_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CAMPAIGN_EVENTS_BROKER)()
+    return _broker
+
+
+def reset_broker():
+    """Drop the shared broker (e.g. after settings change in tests)."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def progress_message(campaign):
+    """The progress figures a stream event carries, shaped like CampaignSerializer's output."""
+    funding_progress = campaign.current_amount / campaign.goal_amount * 100 if campaign.goal_amount else 0
+    # Round-trip through DRF's encoder so local and Redis subscribers get the same plain-JSON values
+    return json.loads(json.dumps({
+        'id': campaign.id,
+        'current_amount': str(campaign.current_amount),
+        'funding_progress': funding_progress,
+        'funded_at': campaign.funded_at,
+        'remaining_repayment': campaign.remaining_repayment(),
+        'repayment_progress': campaign.repayment_progress(),
+        'is_fully_repaid': campaign.is_fully_repaid(),
+        'version': campaign.version,
+    }, cls=JSONEncoder))
+
+
+def progress_snapshot(campaign_id):
+    campaign = Campaign.objects.only(*PROGRESS_FIELDS).filter(pk=campaign_id).first()
+    return progress_message(campaign) if campaign else None
+
+
+def publish_progress(campaign_id):
+    """Read the committed figures and push them to everyone watching the campaign."""
+    message = progress_snapshot(campaign_id)
+    if message is not None:
+        get_broker().publish(campaign_id, message)
@@ -0,0 +1,119 @@
+"""
+Resized variants of campaign banner and CAC document images.
+
+Uploads are stored as-is and the campaign is flagged images_pending;
+the process_campaign_images command builds WebP and JPEG copies at each
+VARIANTS width, records them in Campaign.image_variants and clears the flag.
+Variants are re-encoded from pixels only, so EXIF (GPS position, camera
+serial numbers, ...) is never copied; orientation is applied first.
+Until a campaign's variants exist the serializer only exposes the original.
+Replaced variants are deleted by comparing the campaign's old and new
+image_variants; content-addressed ones are shared between campaigns and kept.
+"""
+import io
+import os
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from .models import Campaign
+
+# (name, max width in px); images are never upscaled
+VARIANTS = (('thumb', 160), ('card', 640), ('full', 1600))
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def build_variants(file, storage=default_storage):
+    """
+    Write every variant of `file` (an image FieldFile) next to it under
+    variants/ and return {variant: {"width": px, "webp": name, "jpeg": name}}.
+    """
+    directory = file.field.upload_to  # Not the file's own directory, which is a hash prefix
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    with file.open('rb'), Image.open(file) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        variants = {}
+        for name, width in VARIANTS:
+            resized = image.copy()
+            resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+            variant = {'width': resized.width}
+            for extension, image_format, params in FORMATS:
+                encoded = io.BytesIO()
+                if image_format == 'JPEG' and resized.mode == 'RGBA':
+                    flattened = Image.new('RGB', resized.size, 'white')
+                    flattened.paste(resized, mask=resized.getchannel('A'))
+                    flattened.save(encoded, image_format, **params)
+                else:
+                    resized.save(encoded, image_format, **params)
+                path = os.path.join(directory, 'variants', f"{stem}-{name}.{extension}")
+                variant[extension] = storage.save(path, ContentFile(encoded.getvalue()))
+            variants[name] = variant
+    return variants
+
+
+def variant_names(entry):
+    return {
+        variant[extension]
+        for variant in entry.get('variants', {}).values()
+        for extension, _, _ in FORMATS if variant.get(extension)
+    }
+
+
+def delete_variants(stale, kept=(), storage=default_storage):
+    """
+    Delete the variant files of the `stale` entries that none of the `kept`
+    entries (the campaign's current image_variants) still use. Content-addressed
+    variants are left in place, like the uploads they come from: the same image
+    uploaded to another campaign shares them.
+    """
+    if getattr(storage, 'content_addressed', False):
+        return
+    in_use = set().union(*map(variant_names, kept))
+    for name in set().union(*map(variant_names, stale)) - in_use:
+        storage.delete(name)
+
+
+def process_campaign_images(batch_size=20):
+    """
+    Build variants for the oldest batch of pending campaigns. A file that
+    cannot be read as an image is recorded with its error instead of being
+    retried forever. Rows locked by another worker are skipped where the
+    database supports SKIP LOCKED. Returns (campaigns processed, campaigns
+    with an unreadable image).
+    """
+    processed = failed = 0
+    with transaction.atomic():
+        pending = Campaign.objects.filter(images_pending=True).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        for campaign in pending.only('id', *Campaign.IMAGE_FIELDS, 'image_variants')[:batch_size]:
+            entries, built, stale = {}, [], []
+            for field in Campaign.IMAGE_FIELDS:
+                file = getattr(campaign, field)
+                previous = campaign.image_variants.get(field, {})
+                if previous.get('source') == (file.name or None) and 'error' not in previous:
+                    if previous:
+                        entries[field] = previous
+                    continue
+                stale.append(previous)
+                if not file.name:
+                    continue
+                try:
+                    entries[field] = {'source': file.name, 'variants': build_variants(file)}
+                    built.append(entries[field])
+                except (OSError, ValueError, Image.DecompressionBombError) as e:
+                    entries[field] = {'source': file.name, 'error': str(e)}
+            # Only if no new upload replaced the images meanwhile; otherwise the next pass redoes them
+            if Campaign.objects.filter(
+                pk=campaign.pk, **{field: getattr(campaign, field).name for field in Campaign.IMAGE_FIELDS}
+            ).touch(image_variants=entries, images_pending=False):
+                processed += 1
+                failed += any('error' in entry for entry in entries.values())
+                delete_variants(stale, kept=entries.values())
+            else:
+                delete_variants(built, kept=campaign.image_variants.values())
+    return processed, failed
@@ -0,0 +1,70 @@
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from campaigns.models import Campaign
+from campaigns.search import IContainsSearchBackend, get_search_backend
+from campaigns.synthetic import WORDS, rolled_back
+from users.models import User
+
+# Long tail of filler words so topical terms match a realistic fraction of campaigns
+FILLER = [f"w{n:04d}" for n in range(5000)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the first page of campaign search for each --query on a synthetic catalog of "
+        "--campaigns campaigns, with the configured full-text backend and with icontains scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--query', action='append', dest='queries', help="Search term (repeatable).")
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or ["solar", "cassava irrigation", "mobile repairs lagos", "zzz"]
+        with rolled_back():
+            self._generate(options['campaigns'])
+            backends = [get_search_backend(), IContainsSearchBackend()]
+            for term in queries:
+                for backend in backends:
+                    timings, hits = self._time(backend, term, options['repeat'])
+                    self.stdout.write(
+                        f"{backend.__class__.__name__:<24} {term!r:<24} first page {hits:>3} hits  "
+                        f"median {statistics.median(timings):8.2f} ms  max {max(timings):8.2f} ms"
+                    )
+
+    def _generate(self, count):
+        founder = User.objects.create(
+            username=f"bench-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex}@bench.invalid",
+            user_type='founder', is_approved=True,
+        )
+        rng = random.Random(42)
+        started = time.perf_counter()
+        for offset in range(0, count, 5000):
+            Campaign.objects.bulk_create([
+                Campaign(
+                    founder=founder,
+                    title=" ".join(rng.sample(WORDS, 3)).title(),
+                    description=" ".join(rng.choices(WORDS, k=4) + rng.choices(FILLER, k=60)),
+                    goal_amount=Decimal('100000.00'), interest_rate=Decimal('12.00'),
+                    repayment_period=12, is_approved=True,
+                )
+                for _ in range(min(5000, count - offset))
+            ])
+        self.stdout.write(f"Generated {count} campaigns in {time.perf_counter() - started:.1f}s")
+
+    def _time(self, backend, term, repeat):
+        queryset = Campaign.objects.filter(is_approved=True)
+        timings, hits = [], 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            # Mirrors what CampaignSearchView does for one page of results
+            hits = len(list(
+                backend.search(queryset, term).order_by('search_rank', '-id').values_list('id', flat=True)[:20]
+            ))
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings, hits
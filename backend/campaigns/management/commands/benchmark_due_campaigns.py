@@ -0,0 +1,66 @@
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from campaigns.models import Campaign
+from campaigns.synthetic import rolled_back
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one page of the due / overdue dashboard (overdue, due in the next 7 days, and both) "
+        "on a synthetic catalog of --campaigns campaigns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per window.")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            now = self._generate(options['campaigns'])
+            windows = {
+                "overdue": (None, now),
+                "next 7 days": (now, now + timezone.timedelta(days=7)),
+                "overdue + 7 days": (None, now + timezone.timedelta(days=7)),
+            }
+            for label, (start, end) in windows.items():
+                timings, hits = [], 0
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    # Mirrors one page of DueCampaignsView
+                    hits = len(list(Campaign.objects.select_related('founder').due_before(end, start)[:20]))
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:<18} first page {hits:>3} rows  "
+                    f"median {statistics.median(timings):8.2f} ms  max {max(timings):8.2f} ms"
+                )
+
+    def _generate(self, count):
+        founder = User.objects.create(
+            username=f"bench-{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex}@bench.invalid",
+            user_type='founder', is_approved=True,
+        )
+        rng = random.Random(42)
+        now = timezone.now() + timezone.timedelta(hours=1)
+        started = time.perf_counter()
+        for offset in range(0, count, 5000):
+            campaigns = []
+            for _ in range(min(5000, count - offset)):
+                # A fifth unfunded; the rest owe their next installment within -60..+30 days
+                funded = rng.random() < 0.8
+                campaigns.append(Campaign(
+                    founder=founder, title="Bench campaign", description="Synthetic",
+                    goal_amount=Decimal('100000.00'), current_amount=Decimal('100000.00') if funded else 0,
+                    interest_rate=Decimal('12.00'), repayment_period=12, is_approved=True,
+                    funded_at=now if funded else None,
+                    next_due_date=now + timezone.timedelta(hours=rng.randint(-60 * 24, 30 * 24)) if funded else None,
+                    next_due_amount=Decimal('9333.33') if funded else None,
+                ))
+            Campaign.objects.bulk_create(campaigns)
+        self.stdout.write(f"Generated {count} campaigns in {time.perf_counter() - started:.1f}s")
+        return now
@@ -0,0 +1,193 @@
+import hashlib
+import hmac
+import json
+import math
+import statistics
+import subprocess
+import time
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from campaigns.models import Campaign, Repayment
+from campaigns.synthetic import generate_dataset, rolled_back
+from payments.services import process_payment_events
+from users.models import User
+
+WEBHOOK_SECRET = 'sk_benchmark'
+SEARCH_TERMS = ("solar", "cassava irrigation", "mobile repairs lagos", "bakery", "zzz")
+
+
+def summarize(timings, queries):
+    ordered = sorted(timings)
+    return {
+        'queries': {'median': statistics.median(queries), 'max': max(queries)},
+        'wall_ms': {
+            'median': round(statistics.median(ordered), 3),
+            'p95': round(ordered[math.ceil(len(ordered) * 0.95) - 1], 3),
+            'max': round(ordered[-1], 3),
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main API paths (campaign list, search, progress, repayment initialize and "
+        "verify, the Paystack webhook and its processing, disbursement) --repeat times each on a "
+        "synthetic dataset, with Paystack mocked out. Reports SQL queries and median / p95 wall "
+        "time per path; --output saves them as JSON and --compare diffs against an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=2000)
+        parser.add_argument('--founders', type=int, default=200)
+        parser.add_argument('--lenders', type=int, default=2000)
+        parser.add_argument('--loans-per-campaign', type=int, default=10)
+        parser.add_argument('--repayments-per-campaign', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per endpoint.")
+        parser.add_argument('--label', default='', help="Name for this run (defaults to `git describe`).")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--compare', help="JSON from an earlier run to compare against.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        dataset = {key: options[key] for key in (
+            'campaigns', 'founders', 'lenders', 'loans_per_campaign', 'repayments_per_campaign', 'seed',
+        )}
+        with override_settings(ALLOWED_HOSTS=['testserver'], PAYSTACK_SECRET_KEY=WEBHOOK_SECRET), rolled_back():
+            counts = generate_dataset(**dataset)
+            self.stdout.write(
+                f"Generated {counts['campaigns']} campaigns, {counts['loans']} loans and "
+                f"{counts['repayments']} repayments in {counts['seconds']}s"
+            )
+            endpoints = self._run(options['repeat'])
+
+        report = {
+            'label': options['label'] or git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'repeat': options['repeat'],
+            'endpoints': endpoints,
+        }
+        for name, result in endpoints.items():
+            self.stdout.write(
+                f"{name:<22} queries {result['queries']['median']:>5} (max {result['queries']['max']:>4})  "
+                f"median {result['wall_ms']['median']:8.2f} ms  p95 {result['wall_ms']['p95']:8.2f} ms  "
+                f"max {result['wall_ms']['max']:8.2f} ms"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self._compare(json.load(previous), report)
+
+    def _run(self, repeat):
+        lender = User.objects.filter(user_type='lender').first()
+        client = APIClient()
+        client.force_authenticate(lender)
+        # Funded campaigns still being repaid, each used once so writes never pile onto one row
+        outstanding = list(
+            Campaign.objects.filter(is_approved=True, funded_at__isnull=False, fully_repaid_at__isnull=True)
+            .values_list('id', 'next_due_amount')[:2 * repeat]
+        )
+        if len(outstanding) < 2 * repeat:
+            raise CommandError(f"Need {2 * repeat} campaigns still being repaid; generate more campaigns.")
+        initialize, webhook = outstanding[:repeat], outstanding[repeat:]
+        references = list(Repayment.objects.order_by('?').values_list('reference', flat=True)[:repeat])
+
+        def get(name, data=None, **kwargs):
+            response = client.get(reverse(name, kwargs=kwargs), data)
+            if response.status_code != 200:
+                raise CommandError(f"{name} answered {response.status_code}")
+
+        def initialize_repayment(n):
+            campaign_id, amount = initialize[n]
+            response = client.post(reverse('initialize-repayment'), {'campaign_id': campaign_id, 'amount': str(amount)})
+            if response.status_code != 200:
+                raise CommandError(f"initialize-repayment answered {response.status_code}: {response.data}")
+
+        def deliver_webhook(n):
+            campaign_id, amount = webhook[n]
+            body = json.dumps({"event": "charge.success", "data": {
+                "reference": f"bench-repayment-{n}", "amount": int(amount * 100), "status": "success",
+                "metadata": {"type": "repayment", "campaign_id": campaign_id, "user_id": lender.id},
+            }}).encode()
+            signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha512).hexdigest()
+            response = client.post(
+                reverse('paystack-webhook'), body, content_type='application/json',
+                headers={"x-paystack-signature": signature},
+            )
+            if response.status_code != 200:
+                raise CommandError(f"paystack-webhook answered {response.status_code}")
+
+        def process_event(n):
+            if process_payment_events(batch_size=1) != (1, 0):
+                raise CommandError("A benchmark payment event failed to apply.")
+
+        def disburse(n):
+            # Each run pays out every fully repaid campaign, then undoes it for the next run
+            with rolled_back():
+                call_command('disburse_repayments', stdout=StringIO())
+
+        paths = {
+            'campaign-list': lambda n: get('campaign-create'),
+            'campaign-search': lambda n: get('campaign-search', {'search': SEARCH_TERMS[n % len(SEARCH_TERMS)]}),
+            'campaign-progress': lambda n: get('campaign-progress', pk=webhook[n][0]),
+            'initialize-repayment': initialize_repayment,
+            'verify-repayment': lambda n: get('verify-repayment', reference=references[n % len(references)]),
+            'paystack-webhook': deliver_webhook,
+            'process-payment-event': process_event,
+            'disburse-repayments': disburse,
+        }
+        paystack = mock.Mock()
+        paystack.initialize_transaction.return_value = (
+            None, {"status": True, "data": {"authorization_url": "https://checkout.paystack.test"}},
+        )
+        results = {}
+        with mock.patch('campaigns.views.get_client', return_value=paystack):
+            for name, path in paths.items():
+                timings, queries = [], []
+                for n in range(repeat):
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        path(n)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    queries.append(len(captured))
+                results[name] = summarize(timings, queries)
+        return results
+
+    def _compare(self, before, after):
+        self.stdout.write(f"\nCompared with {before.get('label') or 'previous run'} ({before.get('created_at', '?')}):")
+        if before.get('dataset') != after['dataset'] or before.get('database') != after['database']:
+            self.stderr.write(self.style.WARNING("Dataset or database differs; numbers are not like for like."))
+        for name, result in after['endpoints'].items():
+            old = before.get('endpoints', {}).get(name)
+            if old is None:
+                self.stdout.write(f"{name:<22} (new)")
+                continue
+            old_ms, new_ms = old['wall_ms']['median'], result['wall_ms']['median']
+            change = f"{(new_ms - old_ms) / old_ms * 100:+.0f}%" if old_ms else "n/a"
+            self.stdout.write(
+                f"{name:<22} queries {old['queries']['median']:>5} -> {result['queries']['median']:<5}  "
+                f"median {old_ms:8.2f} -> {new_ms:8.2f} ms ({change})"
+            )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from campaigns.synthetic import generate_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic lending dataset (founders, lenders, campaigns, loans, "
+        "repayments) for load tests. The data is committed; use a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--founders', type=int, default=100)
+        parser.add_argument('--lenders', type=int, default=1000)
+        parser.add_argument('--campaigns', type=int, default=1000)
+        parser.add_argument('--loans-per-campaign', type=int, default=10, help="Average loans per campaign.")
+        parser.add_argument(
+            '--repayments-per-campaign', type=int, default=4, help="Average installments repaid per funded campaign."
+        )
+        parser.add_argument('--funded-fraction', type=float, default=0.7, help="Share of campaigns fully funded.")
+        parser.add_argument('--seed', type=int, default=42, help="Same seed, same dataset.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Campaigns inserted per batch.")
+
+    def handle(self, *args, **options):
+        counts = generate_dataset(
+            founders=options['founders'], lenders=options['lenders'], campaigns=options['campaigns'],
+            loans_per_campaign=options['loans_per_campaign'],
+            repayments_per_campaign=options['repayments_per_campaign'],
+            funded_fraction=options['funded_fraction'], seed=options['seed'], batch_size=options['batch_size'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['founders']} founders, {counts['lenders']} lenders, {counts['campaigns']} campaigns, "
+            f"{counts['loans']} loans and {counts['repayments']} repayments in {counts['seconds']}s."
+        ))
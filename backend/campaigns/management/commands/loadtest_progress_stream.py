@@ -0,0 +1,120 @@
+import asyncio
+import resource
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from campaigns.events import get_broker
+from campaigns.models import Campaign
+from payments.services import record_loan
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Open thousands of progress streams through the ASGI handler in-process, commit loans "
+        "and measure how long each update takes to reach every subscriber."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=3000)
+        parser.add_argument('--updates', type=int, default=10, help="Loans committed while streams are open.")
+        parser.add_argument('--interval', type=float, default=0.5, help="Seconds between loans.")
+        parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for connects / deliveries.")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        founder = User.objects.create(username=f"loadtest-founder-{tag}", email=f"founder-{tag}@loadtest.invalid",
+                                      user_type='founder', is_approved=True)
+        lender = User.objects.create(username=f"loadtest-lender-{tag}", email=f"lender-{tag}@loadtest.invalid",
+                                     user_type='lender')
+        campaign = Campaign.objects.create(
+            founder=founder, title="Load test", description="Load test", goal_amount=Decimal('1000000.00'),
+            interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        try:
+            with override_settings(ALLOWED_HOSTS=['127.0.0.1']):
+                asyncio.run(self._run(campaign, lender, options))
+        finally:
+            campaign.delete()
+            founder.delete()
+            lender.delete()
+
+    async def _run(self, campaign, lender, options):
+        application = ASGIHandler()
+        path = reverse('campaign-progress-stream', args=[campaign.pk])
+        count = options['subscribers']
+        disconnect = asyncio.Event()
+        received = {}  # version -> [arrival times]
+        statuses = []
+
+        async def subscriber(number):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+                'headers': [(b'host', b'127.0.0.1'), (b'accept', b'text/event-stream')],
+                'client': ('127.0.0.1', 10000 + number), 'server': ('127.0.0.1', 80),
+            }
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif message['type'] == 'http.response.body' and message['body'].startswith(b'id: '):
+                    version = int(message['body'][4:message['body'].index(b'\n')])
+                    received.setdefault(version, []).append(time.perf_counter())
+
+            await application(scope, receive, send)
+
+        broker = get_broker()
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(subscriber(number)) for number in range(count)]
+        await self._wait(lambda: broker.subscriber_count(campaign.pk) >= count, options['timeout'])
+        self.stdout.write(
+            f"{broker.subscriber_count(campaign.pk)} stream(s) open in {time.perf_counter() - started:.2f}s, "
+            f"{threading.active_count()} thread(s), max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024} MB"
+        )
+
+        latencies = []
+        for _ in range(options['updates']):
+            committed = time.perf_counter()
+            # The loan's on_commit hook publishes from this worker thread, as it would from a request
+            await asyncio.to_thread(record_loan, campaign, lender, Decimal('10.00'))
+            version = campaign.version
+            await self._wait(lambda: len(received.get(version, ())) >= count, options['timeout'])
+            arrivals = [(arrival - committed) * 1000 for arrival in received.get(version, ())]
+            latencies.append(arrivals)
+            self.stdout.write(
+                f"update v{version}: {len(arrivals)}/{count} delivered  "
+                f"p50 {statistics.median(arrivals):7.1f} ms  max {max(arrivals):7.1f} ms"
+            )
+            await asyncio.sleep(options['interval'])
+
+        disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), options['timeout'])
+        everything = sorted(ms for arrivals in latencies for ms in arrivals)
+        failed = sum(1 for status_code in statuses if status_code != 200)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(everything)} deliveries to {count} subscriber(s): "
+            f"p50 {statistics.median(everything):.1f} ms  p95 {everything[int(len(everything) * 0.95) - 1]:.1f} ms  "
+            f"max {everything[-1]:.1f} ms; {failed} failed connect(s), "
+            f"{broker.subscriber_count()} subscription(s) left after disconnect"
+        ))
+
+    async def _wait(self, condition, timeout):
+        deadline = time.perf_counter() + timeout
+        while not condition() and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
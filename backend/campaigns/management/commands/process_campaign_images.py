@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from campaigns.images import process_campaign_images
+
+
+class Command(BaseCommand):
+    help = "Build resized WebP/JPEG variants for newly uploaded campaign images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help="Campaigns processed per transaction.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new uploads instead of exiting.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when nothing is pending.")
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        while True:
+            processed, failed = process_campaign_images(batch_size=options['batch_size'])
+            total_processed += processed
+            total_failed += failed
+            if processed:
+                self.stdout.write(f"Processed {processed} campaign(s), {failed} with an unreadable image.")
+            if processed < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {total_processed} campaign(s); {total_failed} had an unreadable image."
+        ))
@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+from campaigns.models import Campaign, CampaignQuerySet, Repayment
+
+
+def ledger_totals():
+    """Correlated subqueries that recompute a campaign's totals from its Repayment rows."""
+    per_campaign = Repayment.objects.filter(campaign=OuterRef('pk')).order_by().values('campaign')
+    repaid_amount = Coalesce(
+        Subquery(per_campaign.annotate(total=Sum('amount')).values('total')),
+        Value(Decimal('0.00')),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+    return {
+        'repaid_amount': repaid_amount,
+        'verified_installments': Coalesce(
+            Subquery(per_campaign.filter(is_verified=True).annotate(count=Count('pk')).values('count')),
+            Value(0),
+        ),
+        'fully_repaid_at': Case(
+            When(
+                GreaterThanOrEqual(repaid_amount, CampaignQuerySet.total_repayment_expression()),
+                then=Coalesce(
+                    F('fully_repaid_at'),
+                    Subquery(per_campaign.annotate(last=Max('created_at')).values('last')),
+                ),
+            ),
+            default=Value(None),
+            output_field=models.DateTimeField(),
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill or reconcile the repaid_amount / verified_installments / fully_repaid_at "
+        "totals stored on campaigns."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Campaigns fixed per UPDATE statement.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted campaigns without fixing them.")
+
+    def handle(self, *args, **options):
+        totals = ledger_totals()
+        drifted = Campaign.objects.annotate(
+            expected_amount=totals['repaid_amount'],
+            expected_installments=totals['verified_installments'],
+            total_repayment=CampaignQuerySet.total_repayment_expression(),
+        ).filter(
+            ~Q(repaid_amount=F('expected_amount'))
+            | ~Q(verified_installments=F('expected_installments'))
+            | Q(fully_repaid_at__isnull=True, expected_amount__gte=F('total_repayment'))
+            | Q(fully_repaid_at__isnull=False, expected_amount__lt=F('total_repayment'))
+        ).values_list('id', 'repaid_amount', 'expected_amount', 'verified_installments', 'expected_installments')
+
+        batch, fixed = [], 0
+        for campaign_id, repaid, expected_repaid, installments, expected_installments in list(drifted):
+            self.stdout.write(
+                f"Campaign {campaign_id}: repaid {repaid} -> {expected_repaid}, "
+                f"installments {installments} -> {expected_installments}"
+            )
+            batch.append(campaign_id)
+            if len(batch) >= options['batch_size']:
+                fixed += self._flush(batch, options['dry_run'])
+                batch = []
+        fixed += self._flush(batch, options['dry_run'])
+
+        verb = "would be reconciled" if options['dry_run'] else "reconciled"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} campaign(s) {verb}."))
+
+    def _flush(self, campaign_ids, dry_run):
+        # Recompute inside the UPDATE itself so repayments landing mid-run are not lost
+        if campaign_ids and not dry_run:
+            Campaign.objects.filter(id__in=campaign_ids).touch(**ledger_totals())
+        return len(campaign_ids)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from campaigns.models import Campaign
+
+class Command(BaseCommand):
+    help = (
+        "Close overdue and fully repaid campaigns and flag defaulted founders. "
+        "Meant to run periodically (e.g. from cron every few minutes)."
+    )
+
+    def handle(self, *args, **kwargs):
+        defaulted, closed = Campaign.objects.refresh_status()
+        self.stdout.write(f"Flagged {defaulted} founder(s) as defaulted.")
+        self.stdout.write(self.style.SUCCESS(f"Closed {closed} campaign(s)."))
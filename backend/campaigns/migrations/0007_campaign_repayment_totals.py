@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:34
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_repayment_totals(apps, schema_editor):
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    Repayment = apps.get_model('campaigns', 'Repayment')
+    per_campaign = Repayment.objects.filter(campaign=OuterRef('pk')).order_by().values('campaign')
+    Campaign.objects.update(
+        repaid_amount=Coalesce(
+            Subquery(per_campaign.annotate(total=Sum('amount')).values('total')),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        verified_installments=Coalesce(
+            Subquery(per_campaign.filter(is_verified=True).annotate(count=Count('pk')).values('count')),
+            Value(0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0006_campaign_funded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='repaid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='verified_installments',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_repayment_totals, migrations.RunPython.noop),
+    ]
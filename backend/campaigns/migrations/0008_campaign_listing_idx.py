@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0007_campaign_repayment_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['is_approved', 'created_at', 'id'], name='campaign_listing_idx'),
+        ),
+    ]
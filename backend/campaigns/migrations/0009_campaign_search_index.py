@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:38
+
+import campaigns.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0008_campaign_listing_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignSearchIndex',
+            fields=[
+                ('campaign', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='campaigns.campaign')),
+                ('document', campaigns.models.FullTextField(db_column='campaigns_campaign_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'campaigns_campaign_fts',
+                'managed': False,
+            },
+        ),
+    ]
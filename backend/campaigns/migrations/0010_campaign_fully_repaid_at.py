@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:43
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, Max, OuterRef, Subquery, Value
+
+
+def backfill_fully_repaid_at(apps, schema_editor):
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    Repayment = apps.get_model('campaigns', 'Repayment')
+    total_repayment = ExpressionWrapper(
+        F('goal_amount') + F('goal_amount') * F('interest_rate') / Value(100),
+        output_field=models.DecimalField(max_digits=14, decimal_places=4),
+    )
+    # Use the latest repayment as the moment the campaign was paid off
+    last_repayment = Repayment.objects.filter(campaign=OuterRef('pk')).order_by().values('campaign').annotate(
+        last=Max('created_at')
+    ).values('last')
+    Campaign.objects.filter(repaid_amount__gte=total_repayment).update(fully_repaid_at=Subquery(last_repayment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0009_campaign_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='fully_repaid_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_fully_repaid_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0010_campaign_fully_repaid_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='reference',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_funded_campaigns_credited(apps, schema_editor):
+    # Campaigns funded before this field existed were settled by the old code
+    # paths; never credit their founders a second time.
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    Campaign.objects.filter(funded_at__isnull=False).update(founder_credited_at=F('funded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0011_loan_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='founder_credited_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_funded_campaigns_credited, migrations.RunPython.noop),
+    ]
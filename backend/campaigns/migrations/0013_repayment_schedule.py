@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:08
+
+import django.db.models.deletion
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+
+
+def materialize_schedules(apps, schema_editor):
+    """Build the schedule of every already funded campaign (mirrors Campaign.create_schedule)."""
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    RepaymentSchedule = apps.get_model('campaigns', 'RepaymentSchedule')
+    rows = []
+    for campaign in Campaign.objects.filter(funded_at__isnull=False, repayment_period__gt=0).iterator():
+        period = campaign.repayment_period
+        total = (campaign.goal_amount + campaign.goal_amount * campaign.interest_rate / 100).quantize(Decimal('0.01'))
+        monthly = (total / period).quantize(Decimal('0.01'))
+        rows.extend(
+            RepaymentSchedule(
+                campaign_id=campaign.pk, installment=n, due_date=campaign.funded_at + relativedelta(months=n),
+                amount=monthly if n < period else total - monthly * (period - 1),
+                paid=n <= campaign.verified_installments,
+            )
+            for n in range(1, period + 1)
+        )
+        if len(rows) >= 500:
+            RepaymentSchedule.objects.bulk_create(rows)
+            rows = []
+    RepaymentSchedule.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0012_campaign_founder_credited_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepaymentSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('installment', models.PositiveIntegerField()),
+                ('due_date', models.DateTimeField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('paid', models.BooleanField(default=False)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='campaigns.campaign')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['due_date', 'paid'], name='schedule_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'installment'), name='unique_schedule_installment')],
+            },
+        ),
+        migrations.RunPython(materialize_schedules, migrations.RunPython.noop),
+    ]
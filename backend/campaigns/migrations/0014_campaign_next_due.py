@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_next_due(apps, schema_editor):
+    """Same update as CampaignQuerySet.sync_next_due()."""
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    RepaymentSchedule = apps.get_model('campaigns', 'RepaymentSchedule')
+    next_unpaid = RepaymentSchedule.objects.filter(campaign=OuterRef('pk'), paid=False).order_by('installment')
+    Campaign.objects.filter(fully_repaid_at__isnull=True).update(
+        next_due_date=Subquery(next_unpaid.values('due_date')[:1]),
+        next_due_amount=Subquery(next_unpaid.values('amount')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0013_repayment_schedule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='next_due_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='next_due_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(fields=['next_due_date', 'id'], name='campaign_next_due_idx'),
+        ),
+        migrations.RunPython(backfill_next_due, migrations.RunPython.noop),
+    ]
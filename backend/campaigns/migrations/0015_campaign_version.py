@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0014_campaign_next_due'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
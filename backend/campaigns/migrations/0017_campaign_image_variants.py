@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def queue_existing_images(apps, schema_editor):
+    """Existing uploads have no variants yet; hand them to process_campaign_images."""
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    has_image = Q(image__isnull=False) & ~Q(image='')
+    has_document = Q(cac_d_img__isnull=False) & ~Q(cac_d_img='')
+    Campaign.objects.filter(has_image | has_document).update(images_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0016_campaign_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='images_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(condition=models.Q(('images_pending', True)), fields=['id'], name='campaign_images_pending_idx'),
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
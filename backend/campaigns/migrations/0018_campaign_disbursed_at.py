@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, Max, OuterRef, Subquery
+
+
+def mark_disbursed(apps, schema_editor):
+    """Campaigns already paid out keep the time of their Disbursement ledger rows."""
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    Disbursement = apps.get_model('payments', 'Disbursement')
+    ledger = Disbursement.objects.filter(campaign=OuterRef('pk')).order_by()
+    Campaign.objects.filter(Exists(ledger), fully_repaid_at__isnull=False).update(
+        disbursed_at=Subquery(ledger.values('campaign').annotate(at=Max('created_at')).values('at'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0017_campaign_image_variants'),
+        ('payments', '0003_balance_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='disbursed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=models.Index(condition=models.Q(('disbursed_at__isnull', True), ('fully_repaid_at__isnull', False)), fields=['fully_repaid_at', 'id'], name='campaign_pending_payout_idx'),
+        ),
+        migrations.RunPython(mark_disbursed, migrations.RunPython.noop),
+    ]
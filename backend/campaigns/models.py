@@ -1,9 +1,139 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, Exists, ExpressionWrapper, F, Lookup, Max, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
 from users.models import User
 from decimal import Decimal
+from functools import reduce
+from operator import or_
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
+class CampaignQuerySet(models.QuerySet):
+    def for_listing(self, user=None):
+        """
+        Prefetch everything CampaignSerializer reads so a page of campaigns
+        serializes in a constant number of queries:
+          - founder: joined in the same SELECT.
+          - has_funded: whether `user` has a Loan on the campaign, via EXISTS.
+          - schedule_*: repayment schedule figures, see with_schedule_info().
+        Repayment totals need no annotation; they are stored on the row.
+        """
+        qs = self.select_related('founder').with_schedule_info()
+        if user is not None and user.is_authenticated:
+            return qs.annotate(has_funded=Exists(
+                Loan.objects.filter(campaign=OuterRef('pk'), lender=user)
+            ))
+        return qs.annotate(has_funded=Value(False))
+
+    @staticmethod
+    def total_repayment_expression():
+        """SQL twin of Campaign.calculate_total_repayment()."""
+        return ExpressionWrapper(
+            F('goal_amount') + F('goal_amount') * F('interest_rate') / Value(100),
+            output_field=models.DecimalField(max_digits=14, decimal_places=4),
+        )
+
+    def fully_repaid(self):
+        return self.filter(repaid_amount__gte=self.total_repayment_expression())
+
+    def overdue(self, now=None):
+        """
+        Campaigns past their repayment deadline with money still owed.
+        Funded campaigns are due when the last installment of their
+        RepaymentSchedule is; campaigns without a schedule fall back to
+        created_at + repayment_period * 30 days, built as one cutoff per
+        distinct period OR'ed together instead of date arithmetic in SQL.
+        """
+        now = now or timezone.now() + timezone.timedelta(hours=1)
+        schedule = RepaymentSchedule.objects.filter(campaign=OuterRef('pk'))
+        scheduled_deadline = Q(Exists(schedule)) & ~Q(Exists(schedule.filter(due_date__gte=now)))
+        periods = self.order_by().values_list('repayment_period', flat=True).distinct()
+        cutoffs = [
+            Q(repayment_period=period, created_at__lt=now - timezone.timedelta(days=period * 30))
+            for period in periods
+        ]
+        unscheduled_deadline = ~Q(Exists(schedule)) & reduce(or_, cutoffs, Q(pk__in=[]))
+        return self.filter(
+            scheduled_deadline | unscheduled_deadline, repaid_amount__lt=self.total_repayment_expression()
+        )
+
+    def with_schedule_info(self, now=None):
+        """
+        Annotate the RepaymentSchedule counts get_monthly_due_info() needs,
+        as correlated subqueries so a page of campaigns stays one query.
+        The next installment itself is stored on the row (next_due_date).
+        """
+        now = now or timezone.now() + timezone.timedelta(hours=1)
+        schedule = RepaymentSchedule.objects.filter(campaign=OuterRef('pk')).order_by()
+
+        def count(rows):
+            return Coalesce(Subquery(rows.values('campaign').annotate(n=Count('pk')).values('n')), Value(0))
+
+        return self.annotate(
+            schedule_installments_due=count(schedule.filter(due_date__lte=now)),
+            schedule_installments_paid=count(schedule.filter(paid=True)),
+        )
+
+    def touch(self, **fields):
+        """
+        update() that also marks the campaigns as changed: bumps version (which
+        keys cached payloads and ETags) and sets updated_at (Last-Modified).
+        Set-based writes that bypass Campaign.save() go through here.
+        """
+        return self.update(**fields, version=F('version') + 1, updated_at=timezone.now())
+
+    def last_updated(self):
+        """Latest updated_at in the queryset (one probe of its index): the collection version of listings."""
+        return self.order_by().aggregate(updated_at=Max('updated_at'))['updated_at']
+
+    def sync_next_due(self):
+        """
+        Copy each campaign's first unpaid installment into next_due_date /
+        next_due_amount, clearing them once the campaign is fully repaid.
+        """
+        next_unpaid = RepaymentSchedule.objects.filter(campaign=OuterRef('pk'), paid=False).order_by('installment')
+        return self.touch(
+            next_due_date=Case(
+                When(fully_repaid_at__isnull=True, then=Subquery(next_unpaid.values('due_date')[:1])),
+                default=Value(None), output_field=models.DateTimeField(),
+            ),
+            next_due_amount=Case(
+                When(fully_repaid_at__isnull=True, then=Subquery(next_unpaid.values('amount')[:1])),
+                default=Value(None), output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
+    def due_before(self, end, start=None):
+        """
+        Campaigns whose next installment falls due by `end` (and on or after
+        `start`, if given), soonest first. Answered from the next_due_date index.
+        """
+        qs = self.filter(next_due_date__lte=end)
+        if start is not None:
+            qs = qs.filter(next_due_date__gte=start)
+        return qs.order_by('next_due_date', 'id')
+
+    def refresh_status(self, now=None):
+        """
+        Set-based equivalent of calling Campaign.update_status() on every approved
+        campaign: founders of overdue campaigns are flagged as defaulted and
+        unapproved, and overdue or fully repaid campaigns are unapproved.
+        Returns the number of (defaulted founders, closed campaigns).
+        """
+        approved = self.filter(is_approved=True)
+        with transaction.atomic():
+            overdue = approved.overdue(now)
+            defaulted = User.objects.filter(
+                id__in=overdue.values('founder_id')
+            ).update(has_defaulted=True, is_approved=False)
+            closed = overdue.touch(is_approved=False)
+            closed += approved.fully_repaid().touch(is_approved=False)
+        return defaulted, closed
+
+
 class Campaign(models.Model):
     founder = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='campaigns')
     title = models.CharField(max_length=255)
@@ -14,13 +144,73 @@ class Campaign(models.Model):
     repayment_period = models.PositiveIntegerField(help_text="Repayment period in months")
     is_approved = models.BooleanField(default=False)
     funded_at = models.DateTimeField(null=True, blank=True)  # Set when fully funded
+    founder_credited_at = models.DateTimeField(null=True, blank=True)  # Set once goal_amount is paid to the founder
     created_at = models.DateTimeField(auto_now_add=True)
     image = models.ImageField(upload_to='campaigns/', null=True, blank=True)  # Banner image
     cac_d_img = models.ImageField(upload_to='cac_documents/', null=True, blank=True)  # CAC document image
+    # Running repayment ledger totals, maintained by Repayment.save()/delete()
+    repaid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    verified_installments = models.PositiveIntegerField(default=0)
+    fully_repaid_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Set when repaid_amount covers the total
+    disbursed_at = models.DateTimeField(null=True, blank=True)  # Set once lenders are paid out, even with no loans
+    # First unpaid RepaymentSchedule installment, kept by sync_next_due(); NULL when nothing is owed
+    next_due_date = models.DateTimeField(null=True, blank=True)
+    next_due_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # Bumped on every change to the campaign or its loans/repayments; keys cached payloads (campaigns/cache.py)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Last-Modified; also set by touch()
+    # Resized, EXIF-free copies of image / cac_d_img built by process_campaign_images (campaigns/images.py):
+    # {field: {"source": name, "variants": {variant: {"width", "webp", "jpeg"}}}}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    images_pending = models.BooleanField(default=False, editable=False)  # Set when an image changes
+
+    objects = CampaignQuerySet.as_manager()
+
+    IMAGE_FIELDS = ('image', 'cac_d_img')
+
+    class Meta:
+        indexes = [
+            # Supports the approved-campaign listings paginated by (created_at, id)
+            models.Index(fields=['is_approved', 'created_at', 'id'], name='campaign_listing_idx'),
+            # Supports the due / overdue dashboard paginated by (next_due_date, id)
+            models.Index(fields=['next_due_date', 'id'], name='campaign_next_due_idx'),
+            # Lets the image worker find its queue without scanning every campaign
+            models.Index(fields=['id'], condition=Q(images_pending=True), name='campaign_images_pending_idx'),
+            # The disbursement queue: repaid but not paid out, in the order disburse_repayments takes them
+            models.Index(
+                fields=['fully_repaid_at', 'id'], condition=Q(fully_repaid_at__isnull=False, disbursed_at__isnull=True),
+                name='campaign_pending_payout_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Bump version in the same UPDATE, so a stale instance can never write an
+        old version back, and queue changed images for their variants.
+        """
+        update_fields = kwargs.get('update_fields')
+        if self.images_changed() and (update_fields is None or set(update_fields) & set(self.IMAGE_FIELDS)):
+            self.images_pending = True
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'images_pending'}
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        self.version = F('version') + 1
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+
+    def images_changed(self):
+        """True if image or cac_d_img differs from the file its variants were built from."""
+        return any(
+            (getattr(self, field).name or None) != self.image_variants.get(field, {}).get('source')
+            for field in self.IMAGE_FIELDS
+        )
+
     def is_goal_reached(self):
         return self.current_amount >= self.goal_amount
 
@@ -36,15 +226,13 @@ class Campaign(models.Model):
 
     def remaining_repayment(self):
         total_repayment = self.calculate_total_repayment()
-        repaid_amount = sum(repayment.amount for repayment in self.repayments.all())
-        return total_repayment - Decimal(repaid_amount)
+        return total_repayment - Decimal(self.repaid_amount)
 
     def repayment_progress(self):
         total_repayment = self.calculate_total_repayment()
-        repaid_amount = sum(repayment.amount for repayment in self.repayments.all())
         if total_repayment == 0:
             return 0
-        return (Decimal(repaid_amount) / total_repayment) * 100
+        return (Decimal(self.repaid_amount) / total_repayment) * 100
 
     def is_fully_repaid(self):
         return self.remaining_repayment() <= 0
@@ -55,50 +243,86 @@ class Campaign(models.Model):
         (Existing logic remains; see previous implementation.)
         """
         now = timezone.now() + timezone.timedelta(hours=1)
-        repayment_deadline = self.created_at + timezone.timedelta(days=self.repayment_period * 30)
+        repayment_deadline = self.repayment_deadline()
         updated = False
         if now > repayment_deadline and self.remaining_repayment() > 0:
             self.founder.has_defaulted = True
             self.founder.is_approved = False
-            self.founder.save()
+            self.founder.save(update_fields=['has_defaulted', 'is_approved'])
             if self.is_approved:
                 self.is_approved = False
-                self.save()
+                self.save(update_fields=['is_approved'])
             updated = True
         elif self.remaining_repayment() <= 0:
             if self.is_approved:
                 self.is_approved = False
-                self.save()
+                self.save(update_fields=['is_approved'])
             updated = True
         return updated
 
+    def repayment_deadline(self):
+        """Due date of the last scheduled installment, or created_at + period for unscheduled campaigns."""
+        last = self.schedule.order_by('-installment').values_list('due_date', flat=True).first()
+        return last or self.created_at + timezone.timedelta(days=self.repayment_period * 30)
+
+    def create_schedule(self):
+        """
+        Materialize one RepaymentSchedule row per monthly installment, due
+        monthly from funded_at. Amounts are rounded to the cent with the last
+        installment taking the remainder. Safe to call again: existing rows
+        are kept.
+        """
+        if not self.funded_at or not self.repayment_period:
+            return
+        RepaymentSchedule.objects.bulk_create(self.schedule_installments(), ignore_conflicts=True)
+        RepaymentSchedule.objects.filter(campaign=self).sync_paid()
+        Campaign.objects.filter(pk=self.pk).sync_next_due()
+        self.refresh_from_db(fields=['next_due_date', 'next_due_amount', 'version'])
+
+    def schedule_installments(self):
+        """The unsaved RepaymentSchedule rows create_schedule() inserts for a funded campaign."""
+        total = self.calculate_total_repayment().quantize(Decimal('0.01'))
+        monthly = (total / self.repayment_period).quantize(Decimal('0.01'))
+        return [
+            RepaymentSchedule(
+                campaign=self, installment=n, due_date=self.funded_at + relativedelta(months=n),
+                amount=monthly if n < self.repayment_period else total - monthly * (self.repayment_period - 1),
+            )
+            for n in range(1, self.repayment_period + 1)
+        ]
+
     def get_monthly_due_info(self):
         """
-        Returns a dictionary with monthly repayment info:
+        Returns a dictionary with monthly repayment info, read from the
+        campaign's RepaymentSchedule (annotated by with_schedule_info(), or
+        fetched in one query otherwise):
           - monthly_repayment: calculated monthly installment amount.
           - installments_due: number of installments that should have been paid since funded.
-          - installments_paid: count of verified repayments.
+          - installments_paid: count of paid installments.
           - next_due_date: ISO formatted date when the next installment is due.
           - due_this_month: True if an installment is due for the current month.
-          - amount_due: the monthly installment amount if due (or 0 otherwise).
+          - amount_due: the next installment amount if due (or 0 otherwise).
         """
         if not self.funded_at:
             # Not yet fully funded, so no due info.
             return {}
-        now = timezone.now() + timezone.timedelta(hours=1)
-        # Calculate months passed since funded_at (using year and month differences)
-        rd = relativedelta(now, self.funded_at)
-        installments_due = rd.years * 12 + rd.months  # How many months passed
-        installments_paid = self.repayments.filter(is_verified=True).count()
+        if not hasattr(self, 'schedule_installments_due'):
+            info = Campaign.objects.with_schedule_info().filter(pk=self.pk).values(
+                'schedule_installments_due', 'schedule_installments_paid',
+            ).get()
+            for name, value in info.items():
+                setattr(self, name, value)
+        installments_due = self.schedule_installments_due
+        installments_paid = self.schedule_installments_paid
         monthly_amount = self.monthly_repayment_amount() or Decimal('0.00')
-        next_due_date = self.funded_at + relativedelta(months=installments_paid + 1)
+        next_due_date = self.next_due_date
         due_this_month = installments_due > installments_paid
-        amount_due = monthly_amount if due_this_month else Decimal('0.00')
+        amount_due = self.next_due_amount if due_this_month else Decimal('0.00')
         return {
             "monthly_repayment": str(monthly_amount),
             "installments_due": installments_due,
             "installments_paid": installments_paid,
-            "next_due_date": next_due_date.isoformat(),
+            "next_due_date": next_due_date.isoformat() if next_due_date else None,
             "due_this_month": due_this_month,
             "amount_due": str(amount_due),
         }
@@ -107,6 +331,7 @@ class Loan(models.Model):
     campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='loans')
     lender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    reference = models.CharField(max_length=255, unique=True, null=True, blank=True)  # Paystack transaction reference
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -125,8 +350,118 @@ class Repayment(models.Model):
         return f"Repayment of {self.amount} for {self.campaign.title}"
     
     def save(self, *args, **kwargs):
-        """Mark the campaign as fully repaid if repayment is complete."""
-        super().save(*args, **kwargs)
-        if self.campaign.remaining_repayment() <= 0:
-            self.campaign.is_fully_repaid = True
-            self.campaign.save()
+        """Save the repayment and apply its delta to the campaign's ledger totals."""
+        with transaction.atomic():
+            previous_amount, previous_verified = Decimal('0.00'), False
+            if not self._state.adding:
+                previous = Repayment.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'amount', 'is_verified'
+                ).first()
+                if previous:
+                    previous_amount, previous_verified = previous
+            super().save(*args, **kwargs)
+            self._apply_to_campaign(
+                Decimal(self.amount) - previous_amount,
+                int(self.is_verified) - int(previous_verified),
+            )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._apply_to_campaign(-Decimal(self.amount), -int(self.is_verified))
+        return result
+
+    def _apply_to_campaign(self, amount_delta, installments_delta):
+        """Increment the campaign totals in the database and sync the cached instance."""
+        if not amount_delta and not installments_delta:
+            return
+        repaid_amount = F('repaid_amount') + amount_delta
+        Campaign.objects.filter(pk=self.campaign_id).update(
+            repaid_amount=repaid_amount,
+            verified_installments=F('verified_installments') + installments_delta,
+            # Right-hand sides see the pre-update row, so compare the new total here
+            fully_repaid_at=Case(
+                When(
+                    GreaterThanOrEqual(repaid_amount, CampaignQuerySet.total_repayment_expression()),
+                    then=Coalesce(F('fully_repaid_at'), Value(timezone.now())),
+                ),
+                default=Value(None),
+                output_field=models.DateTimeField(),
+            ),
+        )
+        if installments_delta:
+            RepaymentSchedule.objects.filter(campaign_id=self.campaign_id).sync_paid()
+        Campaign.objects.filter(pk=self.campaign_id).sync_next_due()
+        if Repayment.campaign.is_cached(self):
+            self.campaign.refresh_from_db(fields=[
+                'repaid_amount', 'verified_installments', 'fully_repaid_at', 'next_due_date', 'next_due_amount',
+                'version',
+            ])
+
+
+class RepaymentScheduleQuerySet(models.QuerySet):
+    def sync_paid(self):
+        """
+        Mark installments paid up to their campaign's verified_installments
+        count and the rest unpaid, in one UPDATE.
+        """
+        verified = Campaign.objects.filter(pk=OuterRef('campaign_id')).values('verified_installments')
+        return self.update(paid=Case(
+            When(installment__lte=Subquery(verified), then=Value(True)),
+            default=Value(False),
+        ))
+
+
+class RepaymentSchedule(models.Model):
+    """One monthly installment of a funded campaign, materialized by Campaign.create_schedule()."""
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='schedule')
+    installment = models.PositiveIntegerField()  # 1-based
+    due_date = models.DateTimeField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    paid = models.BooleanField(default=False)
+
+    objects = RepaymentScheduleQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'installment'], name='unique_schedule_installment'),
+        ]
+        indexes = [
+            # "Which installments fall due in this window" without touching campaigns
+            models.Index(fields=['due_date', 'paid'], name='schedule_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Installment {self.installment} of {self.campaign.title} due {self.due_date:%Y-%m-%d}"
+
+
+class FullTextField(models.TextField):
+    """The hidden column named after an FTS5 table, which accepts MATCH queries."""
+
+
+@FullTextField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class CampaignSearchIndex(models.Model):
+    """
+    Read-only view of the SQLite FTS5 table over Campaign title/description.
+    The table and its sync triggers are created by campaigns.search, not by
+    migrations, so that they survive Django rebuilding the campaign table.
+    """
+    campaign = models.OneToOneField(
+        Campaign, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_index',
+    )
+    document = FullTextField(db_column='campaigns_campaign_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'campaigns_campaign_fts'
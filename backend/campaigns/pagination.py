@@ -0,0 +1,23 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CampaignCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first. Backed by the
+    (is_approved, created_at, id) index, so page cost does not grow with the table.
+    Page size defaults to settings.CAMPAIGN_PAGE_SIZE and can be changed per
+    request with ?page_size=, up to max_page_size.
+    """
+    page_size = settings.CAMPAIGN_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class DueCampaignPagination(CursorPagination):
+    """Keyset pagination over (next_due_date, id), soonest first, backed by campaign_next_due_idx."""
+    page_size = settings.CAMPAIGN_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('next_due_date', 'id')
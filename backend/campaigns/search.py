@@ -0,0 +1,172 @@
+"""
+Pluggable full-text search for campaigns.
+
+Every backend exposes the same two operations:
+  - install(connection): idempotently create whatever index the backend needs.
+  - search(queryset, term): filter `queryset` to matches and annotate
+    `search_rank`, where a LOWER rank means a MORE relevant campaign.
+
+The active backend is settings.CAMPAIGN_SEARCH_BACKEND (a dotted path), or is
+picked from the database vendor when that setting is empty.
+"""
+import re
+from django.conf import settings
+from django.db import connection as default_connection, connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_tokens(term):
+    return _TOKEN_RE.findall(term or '')
+
+
+class IContainsSearchBackend:
+    """Fallback for databases without a full-text index: unranked LIKE scans."""
+
+    def install(self, connection):
+        pass
+
+    def search(self, queryset, term):
+        query = Q()
+        for token in search_tokens(term):
+            query &= Q(title__icontains=token) | Q(description__icontains=token)
+        return queryset.filter(query).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSSearchBackend:
+    """
+    An external-content FTS5 table mirrors campaigns_campaign(title, description),
+    kept in sync by triggers so bulk writes are indexed too. Results are ranked
+    with FTS5's bm25 `rank` column (more negative is better), title weighted 10x.
+    """
+    table = 'campaigns_campaign_fts'
+    triggers = {
+        'campaigns_campaign_fts_ai': """
+            CREATE TRIGGER IF NOT EXISTS campaigns_campaign_fts_ai AFTER INSERT ON campaigns_campaign BEGIN
+                INSERT INTO campaigns_campaign_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END""",
+        'campaigns_campaign_fts_ad': """
+            CREATE TRIGGER IF NOT EXISTS campaigns_campaign_fts_ad AFTER DELETE ON campaigns_campaign BEGIN
+                INSERT INTO campaigns_campaign_fts(campaigns_campaign_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END""",
+        'campaigns_campaign_fts_au': """
+            CREATE TRIGGER IF NOT EXISTS campaigns_campaign_fts_au
+            AFTER UPDATE OF title, description ON campaigns_campaign BEGIN
+                INSERT INTO campaigns_campaign_fts(campaigns_campaign_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO campaigns_campaign_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END""",
+    }
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'campaigns_campaign'"
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if existing.issuperset(self.triggers):
+                return
+            # Table rebuilds during migrations drop triggers, so the index may be
+            # stale: recreate the triggers and rebuild from the content table.
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                "title, description, content='campaigns_campaign', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            # Persistently weight title matches above description matches in `rank`
+            cursor.execute(f"INSERT INTO {self.table}({self.table}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+            for sql in self.triggers.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+    def search(self, queryset, term):
+        tokens = search_tokens(term)
+        if not tokens:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        # Quote every token so user input can never be parsed as FTS5 syntax;
+        # the last one is a prefix match to support search-as-you-type.
+        query = ' '.join(f'"{token}"' for token in tokens) + '*'
+        return queryset.filter(search_index__document__match=query).annotate(
+            search_rank=F('search_index__rank')
+        )
+
+
+class PostgresSearchBackend:
+    """
+    A generated tsvector column (title weighted above description) with a GIN
+    index, ranked with ts_rank. The column is added here rather than on the
+    model so the model stays importable without psycopg.
+    """
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ALTER TABLE campaigns_campaign ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                "GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+                ") STORED"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS campaigns_campaign_search_vector_idx "
+                "ON campaigns_campaign USING GIN (search_vector)"
+            )
+
+    def search(self, queryset, term):
+        tokens = search_tokens(term)
+        if not tokens:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(RawSQL(
+            "campaigns_campaign.search_vector @@ to_tsquery('english', %s)", [query],
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            "-ts_rank(campaigns_campaign.search_vector, to_tsquery('english', %s))", [query],
+            output_field=FloatField(),
+        ))
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    connection = connection or default_connection
+    path = getattr(settings, 'CAMPAIGN_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, IContainsSearchBackend)()
+
+
+def install_search_backend(using='default', **kwargs):
+    """post_migrate receiver: make sure the search index exists and is in sync."""
+    connection = connections[using]
+    get_search_backend(connection).install(connection)
+
+
+class CampaignSearchFilter(SearchFilter):
+    """
+    DRF filter backend for ?search= that delegates to the configured search
+    backend and, when a term is given, tells the cursor paginator to order
+    results by relevance instead of recency.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '')
+        if not search_tokens(term):
+            return queryset
+        return get_search_backend().search(queryset, term)
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return ('search_rank', '-id')
+        return None
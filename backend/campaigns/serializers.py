@@ -1,16 +1,34 @@
 from decimal import Decimal
-from django.utils import timezone
 from rest_framework import serializers
 from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from backend.metrics import SerializerTimingMixin
+from backend.uploads import DirectUploadField
+from payments.services import record_loan, record_loans
+from .cache import get_payloads
 from .models import Campaign, Loan, Repayment
 
-class CampaignSerializer(serializers.ModelSerializer):
+class CampaignListSerializer(SerializerTimingMixin, serializers.ListSerializer):
+    """Serve a page of campaigns from the payload cache with a single get_many()."""
+
+    def to_representation(self, data):
+        campaigns = data.all() if isinstance(data, models.manager.BaseManager) else data
+        payloads = get_payloads(campaigns, self.child.shared_representation)
+        return [self.child.with_request_fields(campaign, payloads[campaign.pk]) for campaign in campaigns]
+
+
+class CampaignSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     total_repayment = serializers.SerializerMethodField()
     remaining_repayment = serializers.SerializerMethodField()
     repayment_progress = serializers.SerializerMethodField()
     funding_progress = serializers.SerializerMethodField()
     monthly_due_info = serializers.SerializerMethodField()
-    has_funded = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    cac_d_img_variants = serializers.SerializerMethodField()
+    # Tokens from api/uploads/direct/, for files uploaded straight to storage
+    image_upload = DirectUploadField('image')
+    cac_d_img_upload = DirectUploadField('cac_d_img')
 
     class Meta:
         model = Campaign
@@ -18,24 +36,52 @@ class CampaignSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'goal_amount', 'current_amount', 
             'interest_rate', 'repayment_period', 'is_approved', 'funded_at', 'created_at', 'founder',
             'total_repayment', 'remaining_repayment', 'repayment_progress',  
-            'funding_progress', 'is_fully_repaid', 'image', 'cac_d_img', 'monthly_due_info',
-            'has_funded'
+            'funding_progress', 'is_fully_repaid', 'image', 'cac_d_img', 'image_variants', 'cac_d_img_variants',
+            'image_upload', 'cac_d_img_upload', 'monthly_due_info',
         ]
         read_only_fields = ['current_amount', 'is_approved', 'founder']
+        list_serializer_class = CampaignListSerializer
 
     def to_representation(self, instance):
+        payload = get_payloads([instance], self.shared_representation)[instance.pk]
+        return self.with_request_fields(instance, payload)
+
+    def shared_representation(self, instance):
+        """The fields that are the same for every caller, cached per campaign version."""
         rep = super().to_representation(instance)
+        # Stored relative; with_request_fields() makes it absolute for the caller's host
+        rep['image'] = instance.image.url if instance.image else None
+        # Signed links to the private CAC document are only built per caller, for its founder and staff
+        del rep['cac_d_img'], rep['cac_d_img_variants']
+        return rep
+
+    def with_request_fields(self, instance, payload):
+        rep = dict(payload)
         request = self.context.get('request')
-        if instance.image:
-            rep['image'] = request.build_absolute_uri(instance.image.url) if request else instance.image.url
-        else:
-            rep['image'] = None
-        if instance.cac_d_img:
-            rep['cac_d_img'] = request.build_absolute_uri(instance.cac_d_img.url) if request else instance.cac_d_img.url
-        else:
-            rep['cac_d_img'] = None
+        names = ['image']
+        if self.can_see_documents(instance):
+            rep['cac_d_img'] = instance.cac_d_img.url if instance.cac_d_img else None
+            rep['cac_d_img_variants'] = self.get_cac_d_img_variants(instance)
+            names.append('cac_d_img')
+        if request:
+            for name in names:
+                if rep[name]:
+                    rep[name] = request.build_absolute_uri(rep[name])
+                if rep[f'{name}_variants']:
+                    rep[f'{name}_variants'] = {
+                        variant: {key: request.build_absolute_uri(value) if key != 'width' else value
+                                  for key, value in urls.items()}
+                        for variant, urls in rep[f'{name}_variants'].items()
+                    }
+        rep['has_funded'] = self.get_has_funded(instance)  # Per user, so never cached
         return rep
 
+    def can_see_documents(self, obj):
+        """Only the campaign's founder and staff get links to its CAC document."""
+        request = self.context.get('request')
+        user = request.user if request else None
+        return bool(user and user.is_authenticated and (user.is_staff or user.pk == obj.founder_id))
+
     def get_total_repayment(self, obj):
         return obj.calculate_total_repayment()
 
@@ -53,7 +99,31 @@ class CampaignSerializer(serializers.ModelSerializer):
     def get_monthly_due_info(self, obj):
         return obj.get_monthly_due_info()
 
+    def get_image_variants(self, obj):
+        return self.variant_urls(obj, 'image')
+
+    def get_cac_d_img_variants(self, obj):
+        return self.variant_urls(obj, 'cac_d_img')
+
+    def variant_urls(self, obj, field):
+        """
+        {variant: {"width", "webp", "jpeg"}} for srcset / <picture>, or None
+        until process_campaign_images has built them for the current file.
+        """
+        file = getattr(obj, field)
+        entry = obj.image_variants.get(field, {})
+        if 'variants' not in entry or entry['source'] != (file.name or None):
+            return None
+        return {
+            variant: {'width': urls['width'], 'webp': file.storage.url(urls['webp']),
+                      'jpeg': file.storage.url(urls['jpeg'])}
+            for variant, urls in entry['variants'].items()
+        }
+
     def get_has_funded(self, obj):
+        # Annotated by Campaign.objects.for_listing(); fall back to a query otherwise
+        if hasattr(obj, 'has_funded'):
+            return obj.has_funded
         request = self.context.get('request')
         if request and request.user and request.user.is_authenticated:
             return obj.loans.filter(lender=request.user).exists()
@@ -64,6 +134,34 @@ class CampaignSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class DueCampaignSerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    """Row of the due / overdue dashboard; reads stored columns only."""
+    founder = serializers.CharField(source='founder.username', read_only=True)
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Campaign
+        fields = [
+            'id', 'title', 'founder', 'next_due_date', 'next_due_amount',
+            'verified_installments', 'repayment_period', 'status',
+        ]
+
+    def get_status(self, obj):
+        now = self.context.get('now') or timezone.now() + timezone.timedelta(hours=1)
+        return 'overdue' if obj.next_due_date < now else 'due'
+
+
+class DueWindowSerializer(serializers.Serializer):
+    """?start= / ?end= of the due dashboard; end defaults to a week from now."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must be before end.")
+        return attrs
+
+
 class LoanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Loan
@@ -71,26 +169,23 @@ class LoanSerializer(serializers.ModelSerializer):
         read_only_fields = ['lender']
 
     def create(self, validated_data):
-        validated_data['lender'] = self.context['request'].user
-        campaign = validated_data['campaign']
+        # Adds to the campaign's total atomically and pays the founder once it is funded
+        return record_loan(validated_data['campaign'], self.context['request'].user, validated_data['amount'])
+    
 
-        # Update campaign's current amount
-        campaign.current_amount += validated_data['amount']
-        campaign.save()
+class BatchLoanItemSerializer(serializers.Serializer):
+    campaign = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
 
-        # Check if the campaign is fully funded and hasn't been funded already.
-        if campaign.current_amount >= campaign.goal_amount and campaign.funded_at is None:
-            campaign.funded_at = timezone.now()  # Set funded date
-            campaign.save()
 
-            # Transfer funds to the founder
-            founder = campaign.founder
-            if hasattr(founder, 'balance'):
-                founder.balance += campaign.goal_amount
-                founder.save()
+class BatchLoanSerializer(serializers.Serializer):
+    loans = BatchLoanItemSerializer(many=True, allow_empty=False, max_length=settings.LOAN_BATCH_MAX_ITEMS)
+
+    def create(self, validated_data):
+        # Items are checked against the remaining goals together; each gets its own result
+        items = [(item['campaign'], item['amount']) for item in validated_data['loans']]
+        return record_loans(self.context['request'].user, items)
 
-        return super().create(validated_data)
-    
 
 class RepaymentSerializer(serializers.ModelSerializer):
     campaign_id = serializers.IntegerField(write_only=True)  # Accept campaign ID from the request
@@ -119,12 +214,5 @@ class RepaymentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         campaign = validated_data.pop('campaign_id')
 
-        # Add the repayment
-        repayment = Repayment.objects.create(campaign=campaign, **validated_data)
-
-        # Check if the campaign is fully repaid
-        if campaign.remaining_repayment() <= 0:
-            campaign.is_fully_repaid = True
-            campaign.save()
-
-        return repayment
+        # Add the repayment; Repayment.save() keeps the campaign totals in sync
+        return Repayment.objects.create(campaign=campaign, **validated_data)
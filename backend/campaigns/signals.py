@@ -0,0 +1,24 @@
+"""
+Keep Campaign.version current so cached campaign payloads (see cache.py) are
+never served after a campaign's loans or repayments change. Campaign.save()
+bumps its own version, and set-based updates use CampaignQuerySet.touch().
+
+Once the change commits, the new progress is pushed to live streams (events.py).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .events import publish_progress
+from .models import Campaign, Loan, Repayment
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_save, sender=Repayment)
+@receiver(post_delete, sender=Loan)
+@receiver(post_delete, sender=Repayment)
+def campaign_child_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        campaign_id = instance.campaign_id
+        Campaign.objects.filter(pk=campaign_id).touch()
+        # A failed publish must not fail the write that has already committed
+        transaction.on_commit(lambda: publish_progress(campaign_id), robust=True)
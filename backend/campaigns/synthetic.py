@@ -0,0 +1,151 @@
+"""
+Synthetic lending data for benchmarks and local load tests.
+
+generate_dataset() writes founders, lenders, campaigns, loans, repayments,
+repayment schedules and the funding ledger with bulk_create only, and fills
+every stored total (current_amount, funded_at, repaid_amount,
+verified_installments, fully_repaid_at, next_due_*, User.balance) from the
+rows it generated, so the data looks as if it had arrived through the API.
+The same seed always produces the same amounts, dates and texts.
+
+The benchmark commands build their data inside rolled_back(), so none of it
+outlives the run.
+"""
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.utils import timezone
+from payments.models import BalanceEntry
+from users.models import User
+from .models import Campaign, Loan, Repayment, RepaymentSchedule
+
+CENT = Decimal('0.01')
+WORDS = (
+    "solar farm cassava bakery kiosk transport logistics fashion tailoring poultry fishery "
+    "software clinic pharmacy school printing laundry catering water irrigation textile "
+    "market traders women youth rural urban lagos abuja kano ibadan enugu energy cooling "
+    "storage export import recycling plastics furniture salon barbing mobile repairs"
+).split()
+GOALS = [Decimal(amount) for amount in ('50000', '100000', '250000', '500000', '1000000', '2500000', '5000000')]
+INTEREST_RATES = [Decimal(rate) for rate in ('5.00', '8.00', '10.00', '12.50', '15.00', '20.00', '25.00')]
+PERIODS = (3, 6, 9, 12, 18, 24)
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back when it ends, however it ends."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def split_amount(total, parts, rng):
+    """Split `total` into `parts` random positive amounts (to the cent) that add up to it exactly."""
+    weights = [rng.uniform(0.5, 1.5) for _ in range(parts)]
+    scale = sum(weights)
+    amounts = [max(CENT, (total * Decimal(weight / scale)).quantize(CENT)) for weight in weights[:-1]]
+    return amounts + [total - sum(amounts, Decimal('0'))]
+
+
+def generate_dataset(founders=100, lenders=1000, campaigns=1000, loans_per_campaign=10,
+                     repayments_per_campaign=4, funded_fraction=0.7, seed=42, batch_size=1000, stdout=None):
+    """
+    Generate a dataset and return its row counts. Funded campaigns are lent
+    exactly their goal by about `loans_per_campaign` lenders and have paid
+    about `repayments_per_campaign` installments (capped at their period,
+    so some are fully repaid and awaiting disbursement); the rest are part
+    funded. Rows are written `batch_size` campaigns at a time.
+    """
+    rng = random.Random(seed)
+    tag = uuid.uuid4().hex[:8]  # Keeps usernames unique when the same seed runs twice
+    now = timezone.now() + timezone.timedelta(hours=1)  # Same clock as get_monthly_due_info
+    started = time.perf_counter()
+    counts = {'founders': founders, 'lenders': lenders, 'campaigns': 0, 'loans': 0, 'repayments': 0, 'schedule': 0}
+
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(username=f"syn-{tag}-founder-{n}", email=f"{tag}-founder-{n}@synthetic.invalid",
+                 first_name="Founder", last_name=str(n), user_type='founder', is_approved=True)
+            for n in range(founders)
+        ], batch_size=batch_size)
+        User.objects.bulk_create([
+            User(username=f"syn-{tag}-lender-{n}", email=f"{tag}-lender-{n}@synthetic.invalid",
+                 first_name="Lender", last_name=str(n), user_type='lender')
+            for n in range(lenders)
+        ], batch_size=batch_size)
+        founder_ids = list(User.objects.filter(username__startswith=f"syn-{tag}-founder-").values_list('id', flat=True))
+        lender_ids = list(User.objects.filter(username__startswith=f"syn-{tag}-lender-").values_list('id', flat=True))
+        credited = {}  # founder_id -> funding credited
+
+        for offset in range(0, campaigns, batch_size):
+            rows, plans = [], []
+            for _ in range(offset, min(campaigns, offset + batch_size)):
+                goal, rate, period = rng.choice(GOALS), rng.choice(INTEREST_RATES), rng.choice(PERIODS)
+                funded = rng.random() < funded_fraction
+                funded_at = now - timezone.timedelta(days=rng.randint(1, 30 * period)) if funded else None
+                total = (goal + goal * rate / 100).quantize(CENT)
+                monthly = (total / period).quantize(CENT)
+                schedule = [
+                    (n, funded_at + relativedelta(months=n), monthly if n < period else total - monthly * (period - 1))
+                    for n in range(1, period + 1)
+                ] if funded else []
+                paid = min(period, max(0, round(rng.gauss(repayments_per_campaign, 1)))) if funded else 0
+                repaid = sum((amount for _, _, amount in schedule[:paid]), Decimal('0'))
+                raised = goal if funded else (goal * Decimal(rng.uniform(0, 0.9))).quantize(CENT)
+                next_unpaid = schedule[paid] if paid < len(schedule) else None
+                fully_repaid_at = min(now, schedule[paid - 1][1]) if funded and paid == period else None
+                rows.append(Campaign(
+                    founder_id=rng.choice(founder_ids),
+                    title=" ".join(rng.sample(WORDS, 3)).title(),
+                    description=" ".join(rng.choices(WORDS, k=30)),
+                    goal_amount=goal, current_amount=raised, interest_rate=rate, repayment_period=period,
+                    is_approved=fully_repaid_at is None and rng.random() < 0.95,
+                    funded_at=funded_at, founder_credited_at=funded_at,
+                    repaid_amount=repaid, verified_installments=paid,
+                    fully_repaid_at=fully_repaid_at,
+                    next_due_date=next_unpaid[1] if next_unpaid else None,
+                    next_due_amount=next_unpaid[2] if next_unpaid else None,
+                ))
+                loans = max(1, round(rng.gauss(loans_per_campaign, loans_per_campaign / 4))) if raised else 0
+                plans.append((raised, loans, schedule, paid))
+            created = Campaign.objects.bulk_create(rows, batch_size=batch_size)
+
+            loans, repayments, installments, entries = [], [], [], []
+            for campaign, (raised, loan_count, schedule, paid) in zip(created, plans):
+                for amount in split_amount(raised, loan_count, rng) if loan_count else ():
+                    loans.append(Loan(campaign=campaign, lender_id=rng.choice(lender_ids), amount=amount,
+                                      reference=f"syn-{tag}-loan-{len(loans)}-{campaign.pk}"))
+                for n, due_date, amount in schedule:
+                    installments.append(RepaymentSchedule(
+                        campaign=campaign, installment=n, due_date=due_date, amount=amount, paid=n <= paid,
+                    ))
+                    if n <= paid:
+                        repayments.append(Repayment(campaign=campaign, amount=amount, is_verified=True,
+                                                    reference=f"syn-{tag}-repayment-{campaign.pk}-{n}"))
+                if campaign.funded_at:
+                    entries.append(BalanceEntry(user_id=campaign.founder_id, entry_type=BalanceEntry.CREDIT,
+                                                amount=campaign.goal_amount, source='funding',
+                                                reference=f"campaign:{campaign.pk}"))
+                    credited[campaign.founder_id] = credited.get(campaign.founder_id, Decimal('0')) + campaign.goal_amount
+            # Plain inserts: the totals these rows would maintain were already stored on the campaigns
+            Loan.objects.bulk_create(loans, batch_size=batch_size)
+            Repayment.objects.bulk_create(repayments, batch_size=batch_size)
+            RepaymentSchedule.objects.bulk_create(installments, batch_size=batch_size)
+            BalanceEntry.objects.bulk_create(entries, batch_size=batch_size)
+            counts['campaigns'] += len(created)
+            counts['loans'] += len(loans)
+            counts['repayments'] += len(repayments)
+            counts['schedule'] += len(installments)
+            if stdout:
+                stdout.write(f"  {counts['campaigns']}/{campaigns} campaigns ({time.perf_counter() - started:.1f}s)")
+
+        User.objects.bulk_update(
+            [User(pk=founder_id, balance=amount) for founder_id, amount in credited.items()], ['balance'],
+            batch_size=batch_size,
+        )
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
@@ -1,18 +1,20 @@
-from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 from .views import (
-    CampaignCreateView, LoanCreateView, InitializeRepaymentView, VerifyRepaymentView,
-    CampaignProgressView, CampaignSearchView
+    CampaignCreateView, LoanCreateView, BatchLoanView, InitializeRepaymentView, VerifyRepaymentView,
+    CampaignProgressView, CampaignProgressStreamView, CampaignSearchView, DueCampaignsView,
+    AsyncInitializeRepaymentView, AsyncVerifyRepaymentView
 )
 
 urlpatterns = [
     path('create/', CampaignCreateView.as_view(), name='campaign-create'), #for getting and creating campaigns
+    path('loans/batch/', BatchLoanView.as_view(), name='loan-batch'),  # Fund many campaigns at once
     path('repayment/initialize/', InitializeRepaymentView.as_view(), name='initialize-repayment'),
     path('repayment/verify/<str:reference>/', VerifyRepaymentView.as_view(), name='verify-repayment'),
     path('campaign/<int:pk>/progress/', CampaignProgressView.as_view(), name='campaign-progress'),
+    path('campaign/<int:pk>/progress/stream/', CampaignProgressStreamView.as_view(), name='campaign-progress-stream'),
     path('campaign/search/', CampaignSearchView.as_view(), name='campaign-search'),  # ✅ Search campaigns
-]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('campaign/due/', DueCampaignsView.as_view(), name='campaign-due'),  # Due / overdue installments (admins)
+    # Async equivalents, for use when served through backend/asgi.py
+    path('repayment/async/initialize/', AsyncInitializeRepaymentView.as_view(), name='async-initialize-repayment'),
+    path('repayment/async/verify/<str:reference>/', AsyncVerifyRepaymentView.as_view(), name='async-verify-repayment'),
+]
\ No newline at end of file
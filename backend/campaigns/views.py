@@ -1,42 +1,105 @@
 from rest_framework import generics, permissions
 from .models import Campaign, Loan, Repayment
-from .serializers import CampaignSerializer, LoanSerializer, RepaymentSerializer
+from .serializers import (
+    BatchLoanSerializer, CampaignSerializer, DueCampaignSerializer, DueWindowSerializer, LoanSerializer,
+    RepaymentSerializer
+)
+from .pagination import CampaignCursorPagination, DueCampaignPagination
+from .events import get_broker, progress_snapshot
+from .search import CampaignSearchFilter
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.filters import SearchFilter
 from django.conf import settings
-import requests
+import asyncio
+import hashlib
+import json
+import time
 import uuid
-from users.models import User
+from adrf.views import APIView as AsyncAPIView
+from backend.uploads import LimitedUploadMixin
+from asgiref.sync import sync_to_async
+from payments.paystack import get_async_client, get_client
+from payments.services import confirmation_status
+from payments.utils import confirmation_response
 from rest_framework.parsers import MultiPartParser, FormParser
-from decimal import Decimal
-from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 
-class CampaignCreateView(generics.ListCreateAPIView):
+class CampaignListMixin:
+    """Serve campaigns annotated with everything CampaignSerializer needs."""
+
+    def get_queryset(self):
+        return super().get_queryset().for_listing(self.request.user)
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag and Last-Modified on GET. get_validators() returns (state,
+    last_modified) from one cheap query; when If-None-Match (or, without it,
+    If-Modified-Since) still matches, a 304 is returned before the view's
+    queryset runs or anything is serialized. The ETag also covers the user,
+    since has_funded differs per user.
+
+    Both validators also turn over every CAMPAIGN_CACHE_TIMEOUT seconds:
+    monthly_due_info moves with the calendar, a deleted campaign or a write
+    that committed after a later-stamped one never shows in the latest
+    updated_at, and the signed media links in a payload expire after
+    PRIVATE_MEDIA_URL_EXPIRY, so no 304 may keep a copy alive past that.
+    """
+
+    def get_validators(self):
+        """
+        Default for listings: the collection version is the latest updated_at
+        of any campaign, which moves on every insert, save or touch().
+        """
+        updated_at = Campaign.objects.last_updated()
+        return updated_at, updated_at
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        state, last_modified = validators
+        period = int(time.time() // settings.CAMPAIGN_CACHE_TIMEOUT)
+        etag = quote_etag(hashlib.sha1(repr((state, period, request.user.pk)).encode()).hexdigest())
+        last_modified = max(
+            int(last_modified.timestamp()) if last_modified else 0, period * settings.CAMPAIGN_CACHE_TIMEOUT,
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Make browsers revalidate every poll and keep each user's copy apart
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class CampaignCreateView(LimitedUploadMixin, ConditionalGetMixin, CampaignListMixin, generics.ListCreateAPIView):
     queryset = Campaign.objects.filter(is_approved=True)  # Ensure only approved campaigns are listed
     serializer_class = CampaignSerializer
+    pagination_class = CampaignCursorPagination
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)  # Allow file uploads (image)
+    upload_fields = ('image', 'cac_d_img')
 
     def perform_create(self, serializer):
         serializer.save(founder=self.request.user)
 
 
-class CampaignSearchView(generics.ListAPIView):
+class CampaignSearchView(ConditionalGetMixin, CampaignListMixin, generics.ListAPIView):
+    queryset = Campaign.objects.filter(is_approved=True)
     serializer_class = CampaignSerializer
-    filter_backends = [SearchFilter]
-    search_fields = ["title", "description"]
-
-    def get_queryset(self):
-        # Get only approved campaigns
-        qs = Campaign.objects.filter(is_approved=True)
-        # Update the status for each campaign
-        for campaign in qs:
-            campaign.update_status()
-        # Re-query to return only campaigns still approved after update
-        return Campaign.objects.filter(is_approved=True)
+    pagination_class = CampaignCursorPagination
+    filter_backends = [CampaignSearchFilter]  # Full-text index on title/description
+    # Overdue / repaid campaigns are closed by the refresh_campaign_status command
 
 class LoanCreateView(generics.CreateAPIView):
     queryset = Loan.objects.all()
@@ -44,11 +107,36 @@ class LoanCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class InitializeRepaymentView(APIView):
+class BatchLoanView(APIView):
+    """
+    Fund many campaigns in one request: {"loans": [{"campaign", "amount"}, ...]}.
+    Lenders only. Every item gets a result, in order; items that would
+    overfund their campaign, name one that is not approved, or the caller's
+    own campaign, are rejected without stopping the others. 201 if any loan
+    was recorded, else 400.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
     def post(self, request, *args, **kwargs):
+        if request.user.user_type != "lender":
+            return Response({"error": "Only lenders can fund campaigns"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = BatchLoanSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        results = [{**result, 'amount': str(result['amount'])} for result in serializer.save()]
+        recorded = sum('loan' in result for result in results)
+        return Response(
+            {'results': results, 'recorded': recorded, 'rejected': len(results) - recorded},
+            status=status.HTTP_201_CREATED if recorded else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class RepaymentInitializationMixin:
+    """Validation and response shaping shared by the sync and async initialize views."""
+
+    def get_repayment_error(self, request):
+        """Return an error Response if the requested repayment is not allowed, else None."""
         campaign_id = request.data.get("campaign_id")
         amount = request.data.get("amount")
-        email = request.user.email  # Ensure user is authenticated
 
         # Retrieve campaign using get_object_or_404 for consistency
         campaign = get_object_or_404(Campaign, id=campaign_id, is_approved=True)
@@ -60,32 +148,24 @@ class InitializeRepaymentView(APIView):
                 {"error": f"Amount exceeds remaining repayment: {remaining}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return None
 
+    def get_paystack_payload(self, request):
         # Generate a unique reference for the transaction
-        reference = str(uuid.uuid4())
-
-        # Prepare the Paystack API payload
-        payload = {
-            "email": email,
-            "amount": int(float(amount) * 100),  # Convert Naira to kobo
-            "reference": reference,
+        return {
+            "email": request.user.email,  # Ensure user is authenticated
+            "amount": int(float(request.data.get("amount")) * 100),  # Convert Naira to kobo
+            "reference": str(uuid.uuid4()),
+            # Echoed back in the charge.success webhook, which creates the Repayment
+            "metadata": {
+                "type": "repayment",
+                "campaign_id": request.data.get("campaign_id"),
+                "user_id": request.user.id,
+            },
             # "callback_url": f"{settings.FRONTEND_URL}/repayment-success",  # Uncomment if needed
         }
-        url = "https://api.paystack.co/transaction/initialize"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            res_data = response.json()
-        except Exception as e:
-            return Response(
-                {"error": str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
+    def initialized_response(self, res_data, reference):
         if not res_data.get("status"):
             return Response(
                 {"error": "Repayment initialization failed"},
@@ -103,87 +183,136 @@ class InitializeRepaymentView(APIView):
         )
 
 
-class VerifyRepaymentView(APIView):
-    def get(self, request, reference, *args, **kwargs):
-        # Verify repayment via Paystack
-        url = f"https://api.paystack.co/transaction/verify/{reference}"
-        headers = {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"}
+class InitializeRepaymentView(RepaymentInitializationMixin, APIView):
+    def post(self, request, *args, **kwargs):
+        error = self.get_repayment_error(request)
+        if error:
+            return error
+
+        payload = self.get_paystack_payload(request)
         try:
-            response = requests.get(url, headers=headers)
-            res_data = response.json()
+            _, res_data = get_client().initialize_transaction(**payload)
         except Exception as e:
             return Response(
                 {"error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return self.initialized_response(res_data, payload["reference"])
 
-        if not res_data.get("status") or res_data["data"]["status"] != "success":
-            return Response(
-                {"error": "Repayment verification failed"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
-        # Convert amount from kobo (integer) to Naira (Decimal)
-        amount_paid = Decimal(res_data["data"]["amount"]) / 100
+class VerifyRepaymentView(APIView):
+    """
+    Report whether the Paystack webhook has confirmed the repayment yet.
+    Only reads the database; the Repayment itself is created by process_payment_events.
+    """
+    def get(self, request, reference, *args, **kwargs):
+        state = confirmation_status(Repayment.objects.filter(reference=reference), reference)
+        return confirmation_response(state, "Repayment verified successfully", "Repayment verification failed")
+
 
-        # Retrieve the campaign using a query parameter
-        campaign_id = request.query_params.get("campaign_id")
-        campaign = get_object_or_404(Campaign, id=campaign_id)
+# Async variants for ASGI deployments: the Paystack round-trip awaits on the
+# shared httpx pool and only the ORM work runs in a thread.
 
-        # Create or retrieve the repayment record
-        repayment, created = Repayment.objects.get_or_create(
-            campaign=campaign,
-            reference=reference,
-            defaults={"amount": amount_paid, "is_verified": True}
-        )
+class AsyncInitializeRepaymentView(RepaymentInitializationMixin, AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        error = await sync_to_async(self.get_repayment_error)(request)
+        if error:
+            return error
 
-        if not created:
+        payload = self.get_paystack_payload(request)
+        try:
+            _, res_data = await get_async_client().initialize_transaction(**payload)
+        except Exception as e:
             return Response(
-                {"message": "Repayment already verified"},
-                status=status.HTTP_200_OK
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        return self.initialized_response(res_data, payload["reference"])
 
-        # After a new repayment, update the campaign's status
-        campaign.update_status()
-
-        # If the campaign has been fully repaid, disburse funds to lenders.
-        if campaign.remaining_repayment() <= 0:
-            self.disburse_to_lenders(campaign)
 
-        return Response(
-            {"message": "Repayment verified successfully"},
-            status=status.HTTP_200_OK
-        )
-
-    def disburse_to_lenders(self, campaign):
-        """
-        Disburse the fully repaid amount to lenders.
-        """
-        # Get lenders and their respective loan amounts
-        lenders = campaign.loans.values_list("lender_id", "amount")
-        lender_map = {}
-
-        total_donated = sum(amount for _, amount in lenders)
-        if total_donated == 0:
-            return  # Avoid division by zero
+class AsyncVerifyRepaymentView(AsyncAPIView):
+    async def get(self, request, reference, *args, **kwargs):
+        state = await sync_to_async(confirmation_status)(Repayment.objects.filter(reference=reference), reference)
+        return confirmation_response(state, "Repayment verified successfully", "Repayment verification failed")
 
-        total_repayment = campaign.calculate_total_repayment()
-
-        # Calculate repayment share for each lender
-        for lender_id, amount in lenders:
-            repayment_share = (amount / total_donated) * total_repayment
-            lender_map[lender_id] = lender_map.get(lender_id, Decimal(0)) + repayment_share
-
-        # Retrieve lender objects and update their balances in a transaction
-        lender_ids = lender_map.keys()
-        lender_objects = {lender.id: lender for lender in User.objects.filter(id__in=lender_ids)}
-
-        with transaction.atomic():
-            for lender_id, amount in lender_map.items():
-                lender = lender_objects[lender_id]
-                lender.balance += amount
-                lender.save()
-
-class CampaignProgressView(generics.RetrieveAPIView):
+class CampaignProgressView(ConditionalGetMixin, CampaignListMixin, generics.RetrieveAPIView):
     queryset = Campaign.objects.all()
     serializer_class = CampaignSerializer
+
+    def get_validators(self):
+        state = Campaign.objects.filter(pk=self.kwargs['pk']).with_schedule_info().values(
+            'version', 'schedule_installments_due', 'updated_at'
+        ).first()
+        if state is None:
+            return None  # Let the normal path answer 404
+        return (state['version'], state['schedule_installments_due']), state['updated_at']
+
+
+class DueCampaignsView(generics.ListAPIView):
+    """
+    Campaigns with an installment due up to ?end= (default: a week from now),
+    optionally from ?start=. Overdue ones come first. Served from the indexed
+    next_due_date column that repayments keep current, so the page is one
+    query (plus the cursor's) whatever the table size.
+    """
+    serializer_class = DueCampaignSerializer
+    pagination_class = DueCampaignPagination
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_window(self):
+        if not hasattr(self, '_window'):
+            window = DueWindowSerializer(data=self.request.query_params)
+            window.is_valid(raise_exception=True)
+            now = timezone.now() + timezone.timedelta(hours=1)  # Same clock as get_monthly_due_info
+            self._window = (now, window.validated_data.get('start'),
+                            window.validated_data.get('end') or now + timezone.timedelta(days=7))
+        return self._window
+
+    def get_queryset(self):
+        _, start, end = self.get_window()
+        return Campaign.objects.select_related('founder').due_before(end, start)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['now'] = self.get_window()[0]
+        return context
+
+
+class CampaignProgressStreamView(View):
+    """
+    Server-sent events for a campaign's funding and repayment progress: a
+    "progress" event on connect and after every committed Loan or Repayment,
+    with keep-alive comments in between. Needs ASGI (backend/asgi.py), where
+    an open stream is a parked coroutine rather than a busy worker.
+    """
+
+    async def get(self, request, pk):
+        if not await read_only_query(Campaign.objects.filter(pk=pk).exists)():
+            raise Http404
+        response = StreamingHttpResponse(self.events(pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+        return response
+
+    async def events(self, pk):
+        async with get_broker().subscribe(pk) as queue:
+            # Read only once subscribed, so a commit in between is not lost
+            message = await read_only_query(progress_snapshot)(pk)
+            yield "retry: 5000\n\n"
+            while True:
+                if message is not None:
+                    yield f"id: {message['version']}\nevent: progress\ndata: {json.dumps(message)}\n\n"
+                try:
+                    message = await asyncio.wait_for(queue.get(), settings.CAMPAIGN_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:  # Builtin TimeoutError only from Python 3.11
+                    message = None
+                    yield ": keep-alive\n\n"
+
+
+def read_only_query(func):
+    """
+    Run a short autocommit read on the shared thread pool. The async ORM
+    would use the request's own thread, and a stream keeps that thread and
+    its database connection for as long as the viewer stays.
+    """
+    return sync_to_async(func, thread_sensitive=False)
@@ -1,3 +1,22 @@
 from django.contrib import admin
+from .models import BalanceEntry, Disbursement, PaymentEvent
 
-# Register your models here.
+@admin.register(Disbursement)
+class DisbursementAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'lender', 'amount', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('campaign__title', 'lender__username')
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('event', 'reference', 'received_at', 'processed_at', 'attempts')
+    list_filter = ('event', 'processed_at')
+    search_fields = ('reference',)
+    readonly_fields = ('event', 'reference', 'payload', 'received_at')
+
+@admin.register(BalanceEntry)
+class BalanceEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'entry_type', 'amount', 'source', 'reference', 'created_at')
+    list_filter = ('entry_type', 'source', 'created_at')
+    search_fields = ('user__username', 'reference')
+    readonly_fields = ('user', 'entry_type', 'amount', 'source', 'reference', 'created_at')
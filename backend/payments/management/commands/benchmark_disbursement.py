@@ -0,0 +1,69 @@
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from campaigns.models import Campaign, Loan
+from campaigns.synthetic import rolled_back
+from payments.services import DISBURSEMENT_CHUNK_SIZE, disburse_campaign
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Time paying out one fully repaid campaign with --lenders lenders: the set-based "
+        "disburse_campaign against the old save-per-lender loop, with the queries each runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lenders', type=int, default=10_000)
+        parser.add_argument('--chunk-size', type=int, default=DISBURSEMENT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            campaign = self._generate(options['lenders'])
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                disburse_campaign(campaign, chunk_size=options['chunk_size'])
+                elapsed = time.perf_counter() - started
+            self.stdout.write(f"set-based      {elapsed * 1000:10.1f} ms  {len(queries):6d} queries")
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                self._legacy_disburse(campaign)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(f"per-lender     {elapsed * 1000:10.1f} ms  {len(queries):6d} queries")
+
+    def _generate(self, count):
+        tag = uuid.uuid4().hex[:8]
+        founder = User.objects.create(
+            username=f"bench-founder-{tag}", email=f"founder-{tag}@bench.invalid",
+            user_type='founder', is_approved=True,
+        )
+        User.objects.bulk_create([
+            User(username=f"bench-{tag}-{n}", email=f"{tag}-{n}@bench.invalid", user_type='lender')
+            for n in range(count)
+        ], batch_size=1000)
+        lenders = User.objects.filter(username__startswith=f"bench-{tag}-").values_list('id', flat=True)
+        campaign = Campaign.objects.create(
+            founder=founder, title="Benchmark", description="Disbursement benchmark",
+            goal_amount=Decimal(count * 100), current_amount=Decimal(count * 100),
+            interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        Loan.objects.bulk_create(
+            [Loan(campaign=campaign, lender_id=lender_id, amount=Decimal('100.00')) for lender_id in lenders],
+            batch_size=1000,
+        )
+        return campaign
+
+    def _legacy_disburse(self, campaign):
+        # The previous disburse_repayments loop, kept here only for comparison
+        total_repayment = campaign.calculate_total_repayment()
+        loans = campaign.loans.all()
+        total_loans = sum([loan.amount for loan in loans])
+        for loan in loans:
+            lender = loan.lender
+            lender.balance += (loan.amount / total_loans) * total_repayment
+            lender.save()
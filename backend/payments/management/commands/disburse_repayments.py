@@ -1,33 +1,64 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
 from django.core.management.base import BaseCommand
-from campaigns.models import Campaign
+from django.db import connection, connections
+from payments.services import DISBURSEMENT_CHUNK_SIZE, disburse_campaigns, pending_disbursements
 
 class Command(BaseCommand):
     help = "Disburse repayments to lenders."
 
-    def handle(self, *args, **kwargs):
-        # Fetch all campaigns with repayments
-        campaigns = Campaign.objects.prefetch_related('repayments', 'loans').all()
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes (1 runs in-process).")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Campaigns per chunk / transaction.")
+        parser.add_argument(
+            '--batch-size', type=int, default=DISBURSEMENT_CHUNK_SIZE,
+            help="Lender balances credited per UPDATE statement.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Report totals without writing anything.")
 
-        # Filter campaigns that are fully repaid
-        fully_repaid_campaigns = [
-            campaign for campaign in campaigns if campaign.remaining_repayment() <= 0
-        ]
+    def handle(self, *args, **options):
+        # Only campaigns repaid since the last run; paid-out ones are in the Disbursement ledger
+        campaign_ids = list(pending_disbursements().order_by('fully_repaid_at', 'id').values_list('id', flat=True))
+        size = options['chunk_size']
+        chunks = [campaign_ids[start:start + size] for start in range(0, len(campaign_ids), size)]
+        kwargs = {'dry_run': options['dry_run'], 'batch_size': options['batch_size']}
+        self.stdout.write(f"{len(campaign_ids)} campaign(s) to disburse in {len(chunks)} chunk(s).")
 
-        for campaign in fully_repaid_campaigns:
-            total_repayment = campaign.calculate_total_repayment()
-            loans = campaign.loans.all()
-            total_loans = sum([loan.amount for loan in loans])
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite has a single writer; parallel transactions would only fail with "database is locked"
+            self.stderr.write(self.style.WARNING("SQLite does not support concurrent writers; using 1 worker."))
+            workers = 1
 
-            # Disburse repayment to each lender proportionally
-            for loan in loans:
-                lender_share = (loan.amount / total_loans) * total_repayment
-                lender = loan.lender
-                lender.balance += lender_share  # Assuming Lender model has a balance field
-                lender.save()
+        self.started = time.perf_counter()
+        self.totals = {'campaigns': 0, 'lenders': 0, 'amount': Decimal('0')}
+        if workers <= 1:
+            for number, chunk in enumerate(chunks, 1):
+                self._report(number, len(chunks), disburse_campaigns(chunk, **kwargs))
+        else:
+            # Forked workers must open their own connections, never share the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('fork')
+            ) as pool:
+                futures = [pool.submit(disburse_campaigns, chunk, **kwargs) for chunk in chunks]
+                for number, future in enumerate(as_completed(futures), 1):
+                    self._report(number, len(chunks), future.result())
 
-                self.stdout.write(
-                    f"Disbursed {lender_share:.2f} to Lender {lender.id} from Campaign {campaign.id}"
-                )
+        verb = "Would disburse" if options['dry_run'] else "Disbursed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.totals['amount']:.2f} to {self.totals['lenders']} lender(s) "
+            f"across {self.totals['campaigns']} campaign(s) in {time.perf_counter() - self.started:.1f}s."
+        ))
 
-            # Log completion for the campaign
-            self.stdout.write(f"Completed disbursement for Campaign {campaign.id}.")
+    def _report(self, number, count, totals):
+        for key, value in totals.items():
+            self.totals[key] += value
+        elapsed = time.perf_counter() - self.started
+        rate = self.totals['campaigns'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"[{number}/{count}] {totals['campaigns']} campaign(s), {totals['lenders']} lender(s), "
+            f"{totals['amount']:.2f} - {rate:.1f} campaigns/s"
+        )
@@ -0,0 +1,235 @@
+import csv
+import json
+import sys
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from campaigns.events import publish_progress
+from campaigns.management.commands.reconcile_repayment_totals import ledger_totals
+from campaigns.models import Campaign, Repayment, RepaymentSchedule
+from payments.models import PaymentEvent
+from payments.services import disburse_campaigns
+
+READ_SIZE = 64 * 1024
+MAX_LISTED = 20  # Unmatched references printed before only counting them
+
+
+def iter_json_records(stream):
+    """
+    Yield the objects of a JSON array or a JSON Lines file, decoding from a
+    rolling buffer so the export is never loaded whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof, array = '', False, None
+    while True:
+        buffer = buffer.lstrip()
+        if array is None and buffer:
+            array = buffer.startswith('[')
+            buffer = buffer[1:].lstrip() if array else buffer
+        if array:
+            buffer = buffer.lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+        if buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                pass  # Record continues in the next chunk
+            else:
+                yield record
+                buffer = buffer[end:]
+                continue
+        if eof:
+            if buffer or array:
+                raise CommandError(f"Malformed or truncated JSON near: {buffer[:80]!r}")
+            return
+        chunk = stream.read(READ_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_csv_records(stream):
+    """Rows of a CSV export, keyed by lower_snake_case column names ("Paid At" -> "paid_at")."""
+    reader = csv.reader(stream)
+    header = [name.strip().lower().replace(' ', '_') for name in next(reader, [])]
+    for row in reader:
+        yield dict(zip(header, row))
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill repayments from a Paystack transaction export (CSV, JSON array or JSON Lines). "
+        "Successful repayment transactions whose reference is not recorded yet are matched to "
+        "their campaign (by the metadata the transaction was initialized with, or the webhook "
+        "event queued for it) and inserted in bulk; each affected campaign's totals, schedule, "
+        "status and payouts are then recomputed once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Export file, or - for stdin.")
+        parser.add_argument('--format', choices=['auto', 'csv', 'json'], default='auto',
+                            help="File format; auto goes by the file extension.")
+        parser.add_argument('--amounts-in', choices=['kobo', 'naira'],
+                            help="Unit of the amount column (default: kobo for JSON as the API returns it, "
+                                 "naira for CSV as the dashboard exports it).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Transactions inserted per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be imported without writing.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format == 'auto':
+            file_format = 'csv' if path.lower().endswith('.csv') else 'json'
+        unit = options['amounts_in'] or ('naira' if file_format == 'csv' else 'kobo')
+        self.divisor = Decimal(100) if unit == 'kobo' else Decimal(1)
+        self.dry_run = options['dry_run']
+        self.counts = {'read': 0, 'skipped': 0, 'recorded': 0, 'unmatched': 0, 'imported': 0}
+        self.seen, self.affected = set(), set()
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            records = iter_csv_records(stream) if file_format == 'csv' else iter_json_records(stream)
+            batch = []
+            for record in records:
+                self.counts['read'] += 1
+                parsed = self._parse(record)
+                if parsed is None:
+                    self.counts['skipped'] += 1
+                    continue
+                if parsed[0] in self.seen:  # Listed twice in the export
+                    continue
+                self.seen.add(parsed[0])
+                batch.append(parsed)
+                if len(batch) >= options['batch_size']:
+                    self._import(batch)
+                    batch = []
+            self._import(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        # Totals are rebuilt from the Repayment rows, so an interrupted run is
+        # repaired by running again or by reconcile_repayment_totals.
+        recomputed = 0 if self.dry_run else self._recompute(sorted(self.affected), options['batch_size'])
+        counts = self.counts
+        verb = "Would import" if self.dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {counts['read']} transaction(s): {verb} {counts['imported']} repayment(s) for "
+            f"{len(self.affected)} campaign(s); {counts['recorded']} already recorded, {counts['unmatched']} "
+            f"unmatched, {counts['skipped']} skipped (not a successful repayment)."
+            + (f" Recomputed {recomputed} campaign(s)." if not self.dry_run else "")
+        ))
+
+    def _parse(self, record):
+        """(reference, amount, metadata) for a successful repayment record, or None to skip it."""
+        if not isinstance(record, dict) or str(record.get('status', '')).lower() != 'success':
+            return None
+        metadata = record.get('metadata') or {}
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except ValueError:
+                metadata = {}
+        if not isinstance(metadata, dict):
+            metadata = {}
+        if record.get('campaign_id'):  # CSV exports with metadata flattened into columns
+            metadata.setdefault('campaign_id', record['campaign_id'])
+            metadata.setdefault('type', record.get('type') or 'repayment')
+        if metadata.get('type') not in (None, 'repayment'):
+            return None
+        reference = str(record.get('reference') or '').strip()
+        try:
+            amount = (Decimal(str(record.get('amount', '')).replace(',', '')) / self.divisor).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            return None
+        if not reference or amount <= 0:
+            return None
+        return reference, amount, metadata
+
+    def _import(self, batch):
+        if not batch:
+            return
+        references = [reference for reference, _, _ in batch]
+        recorded = set(Repayment.objects.filter(reference__in=references).values_list('reference', flat=True))
+        self.counts['recorded'] += len(recorded)
+        batch = [item for item in batch if item[0] not in recorded]
+
+        # Rows without campaign metadata: take it from the webhook event Paystack sent for the reference
+        missing = [reference for reference, _, metadata in batch if not metadata.get('campaign_id')]
+        queued = {}
+        for reference, payload in PaymentEvent.objects.filter(reference__in=missing).values_list('reference', 'payload'):
+            metadata = ((payload or {}).get('data') or {}).get('metadata') or {}
+            if isinstance(metadata, str):
+                try:
+                    metadata = json.loads(metadata)
+                except ValueError:
+                    metadata = {}
+            if not isinstance(metadata, dict):
+                continue
+            if metadata.get('type') == 'repayment' and metadata.get('campaign_id'):
+                queued[reference] = metadata['campaign_id']
+
+        matched = []
+        for reference, amount, metadata in batch:
+            try:
+                matched.append((reference, amount, int(metadata.get('campaign_id') or queued[reference])))
+            except (KeyError, TypeError, ValueError):
+                matched.append((reference, amount, None))
+        campaign_ids = set(Campaign.objects.filter(
+            id__in={campaign_id for _, _, campaign_id in matched if campaign_id}
+        ).values_list('id', flat=True))
+
+        repayments = []
+        for reference, amount, campaign_id in matched:
+            if campaign_id in campaign_ids:
+                repayments.append(Repayment(campaign_id=campaign_id, reference=reference, amount=amount, is_verified=True))
+                continue
+            self.counts['unmatched'] += 1
+            if self.counts['unmatched'] <= MAX_LISTED:
+                self.stderr.write(self.style.WARNING(f"No campaign found for transaction {reference}."))
+        if not self.dry_run:
+            inserted = self._insert(repayments)
+            self.counts['recorded'] += len(repayments) - len(inserted)
+            repayments = inserted
+        self.counts['imported'] += len(repayments)
+        self.affected.update(repayment.campaign_id for repayment in repayments)
+
+    def _insert(self, repayments):
+        """
+        Insert `repayments` and return the ones actually inserted. Plain
+        INSERTs, no Repayment.save() per row: totals are recomputed per
+        campaign at the end. If the webhook worker recorded one of the
+        references in the meantime, the batch falls back to one savepoint
+        per row and that reference keeps the worker's row.
+        """
+        try:
+            with transaction.atomic():
+                Repayment.objects.bulk_create(repayments)
+            return repayments
+        except IntegrityError:
+            inserted = []
+            for repayment in repayments:
+                try:
+                    with transaction.atomic():
+                        Repayment.objects.bulk_create([repayment])
+                except IntegrityError:
+                    continue
+                inserted.append(repayment)
+            return inserted
+
+    def _recompute(self, campaign_ids, batch_size):
+        """Once per affected campaign: repayment totals, paid installments, next due, status and payouts."""
+        for start in range(0, len(campaign_ids), batch_size):
+            chunk = campaign_ids[start:start + batch_size]
+            with transaction.atomic():
+                campaigns = Campaign.objects.filter(id__in=chunk)
+                campaigns.touch(**ledger_totals())
+                RepaymentSchedule.objects.filter(campaign_id__in=chunk).sync_paid()
+                campaigns.sync_next_due()
+                campaigns.refresh_status()
+                for campaign_id in chunk:
+                    transaction.on_commit(partial(publish_progress, campaign_id), robust=True)
+            # Pays out the ones now fully repaid, as record_repayment does for a single repayment
+            disburse_campaigns(chunk, batch_size=batch_size)
+        return len(campaign_ids)
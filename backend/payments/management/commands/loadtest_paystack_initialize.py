@@ -0,0 +1,126 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from asgiref.sync import ThreadSensitiveContext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from campaigns.models import Campaign
+from payments.paystack import reset_client
+from users.models import User
+
+
+class SlowPaystackHandler(BaseHTTPRequestHandler):
+    """Answers every initialize call with a checkout URL after `server.latency` seconds."""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.server.latency)
+        body = json.dumps({"status": True, "data": {
+            "authorization_url": "https://checkout.paystack.test", "reference": request.get("reference"),
+        }}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the sync and async repayment initialize views against a fake "
+        "Paystack with artificial latency. Initializing writes nothing, so requests measure "
+        "the Paystack round-trip rather than database writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once.")
+        parser.add_argument('--workers', type=int, default=4, help="WSGI worker threads serving the sync view.")
+        parser.add_argument('--latency', type=float, default=200, help="Fake Paystack latency in ms.")
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SlowPaystackHandler)
+        server.latency = options['latency'] / 1000
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        tag = uuid.uuid4().hex[:8]
+        founder = User.objects.create(username=f"loadtest-founder-{tag}", email=f"founder-{tag}@loadtest.invalid",
+                                      user_type='founder', is_approved=True)
+        lender = User.objects.create(username=f"loadtest-lender-{tag}", email=f"lender-{tag}@loadtest.invalid",
+                                     user_type='lender')
+        campaign = Campaign.objects.create(
+            founder=founder, title="Load test", description="Load test", goal_amount=Decimal('100000.00'),
+            interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        headers = {"Authorization": f"Bearer {RefreshToken.for_user(lender).access_token}"}
+        data = {'campaign_id': campaign.id, 'amount': 1}
+
+        try:
+            with override_settings(
+                PAYSTACK_BASE_URL=f"http://127.0.0.1:{server.server_port}",
+                # httpx waits for a free pooled connection, so size the pool to the load
+                PAYSTACK_POOL_SIZE=options['concurrency'],
+                ALLOWED_HOSTS=['testserver', '127.0.0.1'],
+            ):
+                reset_client()
+                path = reverse('initialize-repayment')
+                self._report(f"sync ({options['workers']} workers)", *self._run_sync(path, data, headers, options))
+                path = reverse('async-initialize-repayment')
+                self._report(f"async ({options['concurrency']} in flight)", *asyncio.run(self._run_async(path, data, headers, options)))
+        finally:
+            reset_client()
+            server.shutdown()
+            server.server_close()
+            campaign.delete()
+            founder.delete()
+            lender.delete()
+
+    def _run_sync(self, path, data, headers, options):
+        started = time.perf_counter()
+
+        def call(_):
+            # Latency includes time spent queued for a worker
+            response = Client().post(path, data, content_type='application/json', headers=headers)
+            return response.status_code, time.perf_counter() - started
+
+        # A WSGI server holds one worker per in-flight request; the rest queue behind them
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(call, range(options['requests'])))
+        return results, time.perf_counter() - started
+
+    async def _run_async(self, path, data, headers, options):
+        client = AsyncClient()
+        limit = asyncio.Semaphore(options['concurrency'])
+        started = time.perf_counter()
+
+        async def call():
+            # Like Django's ASGIHandler, give each request its own thread for sync ORM work
+            async with limit, ThreadSensitiveContext():
+                response = await client.post(path, data, content_type='application/json', headers=headers)
+                return response.status_code, time.perf_counter() - started
+
+        results = await asyncio.gather(*[call() for _ in range(options['requests'])])
+        return results, time.perf_counter() - started
+
+    def _report(self, label, results, elapsed):
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        failed = sum(1 for status_code, _ in results if status_code != 200)
+        self.stdout.write(
+            f"{label:<24} {len(results)} requests in {elapsed:.2f}s  {len(results) / elapsed:7.1f} req/s  "
+            f"p50 {statistics.median(latencies):7.1f} ms  p95 {latencies[int(len(latencies) * 0.95) - 1]:7.1f} ms  "
+            f"failed {failed}"
+        )
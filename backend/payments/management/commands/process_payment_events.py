@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from payments.services import process_payment_events
+
+
+class Command(BaseCommand):
+    help = "Apply queued Paystack webhook events (loans and repayments)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Events applied per transaction.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new events instead of exiting.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        total_processed = total_failed = 0
+        while True:
+            processed, failed = process_payment_events(batch_size=options['batch_size'])
+            total_processed += processed
+            total_failed += failed
+            if processed or failed:
+                self.stdout.write(f"Applied {processed} event(s), {failed} failed.")
+            if processed + failed < options['batch_size'] or not processed:
+                # Queue drained, or only failing events left: retry those on a later pass
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {total_processed} event(s); {total_failed} failed and will be retried."
+        ))
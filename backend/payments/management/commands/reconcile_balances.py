@@ -0,0 +1,39 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Coalesce
+from payments.services import ledger_balance
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Verify cached User.balance values against the BalanceEntry ledger and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Users fixed per UPDATE statement.")
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted balances without fixing them.")
+
+    def handle(self, *args, **options):
+        # One pass over users with a correlated ledger sum each; only drifted rows come back
+        drifted = User.objects.annotate(
+            cached=Coalesce(F('balance'), Value(Decimal('0.00')), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            expected=ledger_balance(),
+        ).exclude(cached=F('expected')).values_list('id', 'balance', 'expected')
+
+        batch, fixed = [], 0
+        for user_id, balance, expected in list(drifted):
+            self.stdout.write(f"User {user_id}: balance {balance} -> {expected:.2f}")
+            batch.append(user_id)
+            if len(batch) >= options['batch_size']:
+                fixed += self._flush(batch, options['dry_run'])
+                batch = []
+        fixed += self._flush(batch, options['dry_run'])
+
+        verb = "would be reconciled" if options['dry_run'] else "reconciled"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} balance(s) {verb}."))
+
+    def _flush(self, user_ids, dry_run):
+        # Recompute inside the UPDATE itself so entries posted mid-run are not lost
+        if user_ids and not dry_run:
+            User.objects.filter(id__in=user_ids).update(balance=ledger_balance())
+        return len(user_ids)
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:43
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def record_past_disbursements(apps, schema_editor):
+    """
+    Campaigns repaid before this ledger existed were already paid out by
+    VerifyRepaymentView, so record them as disbursed rather than paying twice.
+    """
+    Campaign = apps.get_model('campaigns', 'Campaign')
+    Loan = apps.get_model('campaigns', 'Loan')
+    Disbursement = apps.get_model('payments', 'Disbursement')
+    for campaign in Campaign.objects.filter(fully_repaid_at__isnull=False).iterator():
+        lent = dict(
+            Loan.objects.filter(campaign=campaign).order_by().values('lender_id')
+            .annotate(total=Sum('amount')).values_list('lender_id', 'total')
+        )
+        total_lent = sum(lent.values(), Decimal('0'))
+        if total_lent == 0:
+            continue
+        total_repayment = campaign.goal_amount + campaign.goal_amount * campaign.interest_rate / 100
+        Disbursement.objects.bulk_create([
+            Disbursement(
+                campaign=campaign, lender_id=lender_id,
+                amount=(amount / total_lent * total_repayment).quantize(Decimal('0.01')),
+            )
+            for lender_id, amount in lent.items()
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('campaigns', '0010_campaign_fully_repaid_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Disbursement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disbursements', to='campaigns.campaign')),
+                ('lender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disbursements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'lender'), name='unique_disbursement_per_lender')],
+            },
+        ),
+        migrations.RunPython(record_past_disbursements, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """Open the ledger with each user's current balance so cache and ledger agree."""
+    User = apps.get_model('users', 'User')
+    BalanceEntry = apps.get_model('payments', 'BalanceEntry')
+    users = User.objects.exclude(balance__isnull=True).exclude(balance=0).values_list('id', 'balance')
+    BalanceEntry.objects.bulk_create((
+        BalanceEntry(
+            user_id=user_id, entry_type='credit' if balance > 0 else 'debit', amount=abs(balance),
+            source='adjustment', reference='opening balance',
+        )
+        for user_id, balance in users.iterator()
+    ), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0002_user_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('credit', 'Credit'), ('debit', 'Debit')], max_length=6)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('source', models.CharField(choices=[('disbursement', 'Repayment disbursement'), ('funding', 'Campaign funding'), ('withdrawal', 'Withdrawal'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('amount__gt', 0)), name='balance_entry_amount_positive')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,80 @@
 from django.db import models
+from django.db.models import Q
+from campaigns.models import Campaign
+from users.models import User
 
-# Create your models here.
+class Disbursement(models.Model):
+    """
+    One payout of a fully repaid campaign to one of its lenders. The unique
+    (campaign, lender) pair makes disbursing a campaign idempotent.
+    """
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='disbursements')
+    lender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='disbursements')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'lender'], name='unique_disbursement_per_lender'),
+        ]
+
+    def __str__(self):
+        return f"Disbursed {self.amount} to {self.lender} from {self.campaign}"
+
+
+class PaymentEvent(models.Model):
+    """
+    A raw Paystack webhook event, stored as received. The webhook only appends
+    rows; process_payment_events applies them and sets processed_at.
+    """
+    MAX_ATTEMPTS = 5
+
+    event = models.CharField(max_length=100)
+    reference = models.CharField(max_length=255, blank=True, db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Keeps draining the queue cheap however many processed events pile up
+            models.Index(fields=['id'], condition=Q(processed_at__isnull=True), name='payment_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.reference}"
+
+
+class BalanceEntry(models.Model):
+    """
+    Append-only ledger of changes to User.balance; the balance column is a
+    cached sum of these rows, kept in step by payments.services.
+    """
+    CREDIT = 'credit'
+    DEBIT = 'debit'
+    ENTRY_TYPE_CHOICES = [
+        (CREDIT, 'Credit'),
+        (DEBIT, 'Debit'),
+    ]
+    SOURCE_CHOICES = [
+        ('disbursement', 'Repayment disbursement'),
+        ('funding', 'Campaign funding'),
+        ('withdrawal', 'Withdrawal'),
+        ('adjustment', 'Adjustment'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_entries')
+    entry_type = models.CharField(max_length=6, choices=ENTRY_TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    reference = models.CharField(max_length=255, blank=True)  # e.g. the campaign a payout came from
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(amount__gt=0), name='balance_entry_amount_positive'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} of {self.amount} for {self.user} ({self.source})"
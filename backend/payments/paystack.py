@@ -0,0 +1,190 @@
+"""
+Shared Paystack HTTP clients.
+
+A single requests.Session per process keeps TCP/TLS connections to Paystack
+alive between calls, sends the auth headers on every request, applies
+connect/read timeouts and retries with exponential backoff: connection errors
+for every request, read timeouts and 5xx responses for GETs only, since a
+retried POST could open a second transaction. Use get_client() rather than
+building clients per call.
+
+AsyncPaystackClient is the httpx.AsyncClient twin used by the async views
+under ASGI; get_async_client() keeps one per event loop and closes it on
+that loop when the loop shuts down.
+
+verify_signature() authenticates inbound webhook calls.
+"""
+import asyncio
+import hashlib
+import hmac
+import threading
+import weakref
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (500, 502, 503, 504)
+# Read timeouts and 5xx responses are only retried for these: a POST that reached Paystack may have
+# opened a transaction, so it is retried only when the connection failed before anything was sent.
+RETRY_METHODS = frozenset({'GET'})
+
+
+class PaystackError(Exception):
+    pass
+
+
+class PaystackClient:
+    def __init__(self, secret_key, base_url='https://api.paystack.co', pool_size=10,
+                 connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.3):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {secret_key}",
+            "Content-Type": "application/json",
+        })
+        retry = Retry(
+            total=max_retries, connect=max_retries, read=max_retries, status=max_retries,
+            backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, **kwargs):
+        """Send a request and return (status_code, decoded JSON body)."""
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+            return response.status_code, response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise PaystackError(f"Paystack request failed: {e}") from e
+
+    def initialize_transaction(self, email, amount, **extra):
+        """Start a transaction for `amount` kobo; returns (status_code, body)."""
+        return self.request('POST', '/transaction/initialize', json={"email": email, "amount": amount, **extra})
+
+    def verify_transaction(self, reference):
+        return self.request('GET', f'/transaction/verify/{reference}')
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncPaystackClient:
+    def __init__(self, secret_key, base_url='https://api.paystack.co', pool_size=10,
+                 connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.3):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            headers={"Authorization": f"Bearer {secret_key}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            # The transport retries failed connects; 5xx and timeouts are retried below for RETRY_METHODS
+            transport=httpx.AsyncHTTPTransport(retries=max_retries, limits=limits),
+        )
+
+    async def request(self, method, path, **kwargs):
+        """Send a request and return (status_code, decoded JSON body)."""
+        retries = self.max_retries if method in RETRY_METHODS else 0
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                if last_attempt:
+                    raise PaystackError(f"Paystack request failed: {e}") from e
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    try:
+                        return response.status_code, response.json()
+                    except ValueError as e:
+                        raise PaystackError(f"Paystack request failed: {e}") from e
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)
+
+    async def initialize_transaction(self, email, amount, **extra):
+        return await self.request('POST', '/transaction/initialize', json={"email": email, "amount": amount, **extra})
+
+    async def verify_transaction(self, reference):
+        return await self.request('GET', f'/transaction/verify/{reference}')
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def verify_signature(body, signature, secret_key=None):
+    """Check a webhook's x-paystack-signature: HMAC-SHA512 of the raw body with the secret key."""
+    secret_key = secret_key or settings.PAYSTACK_SECRET_KEY
+    if not signature or not secret_key:
+        return False
+    expected = hmac.new(secret_key.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _client_options():
+    return {
+        'secret_key': settings.PAYSTACK_SECRET_KEY,
+        'base_url': settings.PAYSTACK_BASE_URL,
+        'pool_size': settings.PAYSTACK_POOL_SIZE,
+        'connect_timeout': settings.PAYSTACK_CONNECT_TIMEOUT,
+        'read_timeout': settings.PAYSTACK_READ_TIMEOUT,
+        'max_retries': settings.PAYSTACK_MAX_RETRIES,
+    }
+
+
+_client = None
+_client_lock = threading.Lock()
+# httpx connection pools are bound to the loop that opened them: loop -> (client, closer task)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """Return the process-wide PaystackClient configured from settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PaystackClient(**_client_options())
+    return _client
+
+
+async def _close_with_loop(client):
+    """
+    Wait until cancelled, then close `client`. asyncio.run() and asgiref
+    cancel pending tasks before closing their loop, so this runs on the
+    client's own loop while it can still await.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.create_future()
+    finally:
+        entry = _async_clients.get(loop)
+        if entry is not None and entry[0] is client:
+            del _async_clients[loop]
+        await client.aclose()
+
+
+def get_async_client():
+    """Return the AsyncPaystackClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = AsyncPaystackClient(**_client_options())
+        entry = _async_clients[loop] = (client, loop.create_task(_close_with_loop(client)))
+    return entry[0]
+
+
+def reset_client():
+    """Close and drop the shared clients (e.g. after settings change in tests)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        for loop, (_, closer) in list(_async_clients.items()):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(closer.cancel)  # Closes the client on its own loop
+        _async_clients.clear()
@@ -0,0 +1,386 @@
+import json
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+from campaigns.events import publish_progress
+from campaigns.models import Campaign, Loan, Repayment, RepaymentSchedule
+from users.models import User
+from .models import BalanceEntry, Disbursement, PaymentEvent
+
+CENT = Decimal('0.01')
+DISBURSEMENT_CHUNK_SIZE = 500
+
+
+def lender_shares(campaign):
+    """
+    Split the campaign's total repayment between its lenders in proportion to
+    how much each one lent. Loans are summed per lender in the database, so a
+    lender with several loans gets a single share.
+    Returns {lender_id: share}, each share rounded to the cent.
+    """
+    lent = dict(
+        campaign.loans.order_by().values('lender_id').annotate(total=Sum('amount')).values_list('lender_id', 'total')
+    )
+    total_lent = sum(lent.values(), Decimal('0'))
+    if total_lent == 0:
+        return {}  # Avoid division by zero
+    total_repayment = campaign.calculate_total_repayment()
+    return {
+        lender_id: (amount / total_lent * total_repayment).quantize(CENT)
+        for lender_id, amount in lent.items()
+    }
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+def ledger_balance():
+    """Correlated subquery summing a user's BalanceEntry rows (credits minus debits)."""
+    signed_amount = Case(
+        When(entry_type=BalanceEntry.DEBIT, then=-F('amount')),
+        default=F('amount'),
+    )
+    per_user = BalanceEntry.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    return Coalesce(
+        Subquery(per_user.annotate(total=Sum(signed_amount)).values('total')),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def credit_balances(credits, source, reference='', chunk_size=DISBURSEMENT_CHUNK_SIZE):
+    """
+    Credit {user_id: amount}: append one BalanceEntry per user (batched
+    inserts) and add the amounts to the cached User.balance with one UPDATE
+    per chunk of users, using a CASE over F('balance') so concurrent writers
+    never lose credits. Users receiving the same amount share a WHEN branch,
+    which keeps the statement small when lenders lent equal sums.
+    """
+    apply_credits([
+        BalanceEntry(user_id=user_id, entry_type=BalanceEntry.CREDIT, amount=amount, source=source, reference=reference)
+        for user_id, amount in credits.items() if amount > 0
+    ], chunk_size=chunk_size)
+
+
+def apply_credits(entries, chunk_size=DISBURSEMENT_CHUNK_SIZE):
+    """
+    credit_balances() for prepared BalanceEntry credits, which may differ in
+    source and reference and name a user more than once.
+    """
+    balance_field = DecimalField(max_digits=10, decimal_places=2)
+    totals = defaultdict(Decimal)
+    for entry in entries:
+        totals[entry.user_id] += entry.amount
+    items = list(totals.items())
+    with transaction.atomic():
+        BalanceEntry.objects.bulk_create(entries, batch_size=chunk_size)
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            by_amount = defaultdict(list)
+            for user_id, amount in chunk:
+                by_amount[amount].append(user_id)
+            increment = Case(
+                *[When(id__in=user_ids, then=Value(amount)) for amount, user_ids in by_amount.items()],
+                default=Value(Decimal('0')), output_field=balance_field,
+            )
+            User.objects.filter(id__in=[user_id for user_id, _ in chunk]).update(
+                balance=Coalesce(F('balance'), Value(Decimal('0')), output_field=balance_field) + increment
+            )
+
+
+def debit_balance(user, amount, source, reference=''):
+    """
+    Take `amount` from the user's balance and record the debit. The balance
+    check and the decrement are one guarded UPDATE, so concurrent debits can
+    never overdraw. Raises InsufficientBalance; refreshes user.balance.
+    """
+    with transaction.atomic():
+        if not User.objects.filter(pk=user.pk, balance__gte=amount).update(balance=F('balance') - amount):
+            raise InsufficientBalance(f"Balance is less than {amount}")
+        BalanceEntry.objects.create(
+            user=user, entry_type=BalanceEntry.DEBIT, amount=amount, source=source, reference=reference
+        )
+    user.refresh_from_db(fields=['balance'])
+
+
+def pending_disbursements():
+    """
+    Fully repaid campaigns that have not been paid out yet, read from the
+    partial campaign_pending_payout_idx. disburse_campaign() sets disbursed_at
+    even when there was nobody to pay, so each campaign leaves the queue once.
+    """
+    return Campaign.objects.filter(fully_repaid_at__isnull=False, disbursed_at__isnull=True)
+
+
+def disburse_campaign(campaign, chunk_size=DISBURSEMENT_CHUNK_SIZE):
+    """
+    Pay a fully repaid campaign's lenders their shares, record them in the
+    Disbursement ledger and set the campaign's disbursed_at. Safe to call
+    repeatedly: a campaign already disbursed is skipped. Returns
+    {lender_id: share} for what was paid now.
+    """
+    with transaction.atomic():
+        # Serialize concurrent payouts of the same campaign; the ledger's unique
+        # constraint still rejects a double payout where row locks are unsupported.
+        locked = Campaign.objects.select_for_update().only('id', 'disbursed_at').get(pk=campaign.pk)
+        if locked.disbursed_at is not None:
+            return {}
+        shares = lender_shares(campaign)
+        Disbursement.objects.bulk_create(
+            [Disbursement(campaign=campaign, lender_id=lender_id, amount=share) for lender_id, share in shares.items()],
+            batch_size=chunk_size,
+        )
+        credit_balances(shares, source='disbursement', reference=f"campaign:{campaign.pk}", chunk_size=chunk_size)
+        Campaign.objects.filter(pk=campaign.pk).touch(disbursed_at=timezone.now())
+    return shares
+
+
+def disburse_campaigns(campaign_ids, dry_run=False, batch_size=DISBURSEMENT_CHUNK_SIZE):
+    """
+    Disburse a chunk of campaigns in one transaction and return totals for the
+    chunk. Rows already locked by another worker or run are skipped (where the
+    database supports SKIP LOCKED) and picked up by a later run. With
+    `dry_run`, shares are computed but nothing is written.
+    """
+    totals = {'campaigns': 0, 'lenders': 0, 'amount': Decimal('0')}
+    with transaction.atomic():
+        campaigns = pending_disbursements().filter(id__in=campaign_ids).only('id', 'goal_amount', 'interest_rate')
+        if connection.features.has_select_for_update_skip_locked:
+            campaigns = campaigns.select_for_update(skip_locked=True)
+        for campaign in campaigns:
+            shares = lender_shares(campaign) if dry_run else disburse_campaign(campaign, chunk_size=batch_size)
+            if shares:  # Nothing paid: already disbursed meanwhile, or no loans to share it between
+                totals['campaigns'] += 1
+                totals['lenders'] += len(shares)
+                totals['amount'] += sum(shares.values(), Decimal('0'))
+    return totals
+
+
+def record_loan(campaign, lender, amount, reference=None):
+    """
+    Record a verified funding payment as a Loan and add it to the campaign.
+
+    current_amount is incremented in the database and funded_at is set in
+    the same UPDATE when the loan reaches the goal, so concurrent lenders
+    never overwrite each other. The founder is credited goal_amount exactly
+    once, by whichever call wins the guarded update on founder_credited_at,
+    which also materializes the campaign's RepaymentSchedule.
+    `campaign` is refreshed with the new totals.
+    """
+    with transaction.atomic():
+        loan = Loan.objects.create(campaign=campaign, lender=lender, amount=amount, reference=reference)
+
+        now = timezone.now() + timezone.timedelta(hours=1)  # Same clock as get_monthly_due_info
+        reaches_goal = GreaterThanOrEqual(F('current_amount') + Value(amount), F('goal_amount'))
+        # funded_at is assigned first: MySQL evaluates SET left to right, and
+        # it must see the amount from before this loan like other backends do.
+        Campaign.objects.filter(pk=campaign.pk).update(
+            funded_at=Coalesce(F('funded_at'), Case(When(reaches_goal, then=Value(now)))),
+            current_amount=F('current_amount') + Value(amount),
+        )
+        # The UPDATE holds the row lock until commit, so this read is exact
+        campaign.refresh_from_db(fields=['current_amount', 'funded_at', 'version'])
+
+        if campaign.funded_at is not None and Campaign.objects.filter(
+            pk=campaign.pk, founder_credited_at__isnull=True
+        ).update(founder_credited_at=now):
+            credit_balances(
+                {campaign.founder_id: campaign.goal_amount}, source='funding', reference=f"campaign:{campaign.pk}"
+            )
+            # Only the call that funded the campaign gets here, so the schedule is built once
+            campaign.create_schedule()
+    return loan
+
+
+def record_loans(lender, items):
+    """
+    Fund several campaigns at once: `items` is a list of (campaign_id, amount).
+
+    All items are checked against their campaigns' remaining goal with one
+    locking SELECT (items for the same campaign count together, in order),
+    the accepted ones are inserted with one bulk_create, and every campaign's
+    current_amount is incremented, and funded_at set where the goal is
+    reached, by one UPDATE. Campaigns the batch funds credit their founder
+    and get their RepaymentSchedule as record_loan() does; the whole batch is
+    one transaction.
+    Returns one result per item, in order: {"campaign", "amount", "loan",
+    "funded"} for accepted items, {"campaign", "amount", "error"} for the rest.
+    """
+    with transaction.atomic():
+        campaigns = {
+            campaign.pk: campaign for campaign in Campaign.objects.select_for_update().filter(
+                pk__in={campaign_id for campaign_id, _ in items}
+            ).only('id', 'founder_id', 'goal_amount', 'current_amount', 'funded_at', 'founder_credited_at',
+                   'is_approved', 'interest_rate', 'repayment_period')
+        }
+        results, loans, increments = [], [], defaultdict(Decimal)
+        for campaign_id, amount in items:
+            result = {'campaign': campaign_id, 'amount': amount}
+            campaign = campaigns.get(campaign_id)
+            if campaign is None or not campaign.is_approved:
+                result['error'] = "Campaign does not exist or is not approved."
+            elif campaign.founder_id == lender.pk:
+                result['error'] = "You cannot fund your own campaign."
+            elif amount > campaign.goal_amount - campaign.current_amount - increments[campaign_id]:
+                remaining = max(campaign.goal_amount - campaign.current_amount - increments[campaign_id], Decimal('0'))
+                result['error'] = f"Amount exceeds the remaining goal of {remaining}."
+            else:
+                increments[campaign_id] += amount
+                loans.append((result, Loan(campaign_id=campaign_id, lender=lender, amount=amount)))
+            results.append(result)
+        if not loans:
+            return results
+
+        Loan.objects.bulk_create([loan for _, loan in loans])
+        now = timezone.now() + timezone.timedelta(hours=1)  # Same clock as get_monthly_due_info
+        by_amount = defaultdict(list)
+        for campaign_id, amount in increments.items():
+            by_amount[amount].append(campaign_id)
+        increment = Case(
+            *[When(id__in=campaign_ids, then=Value(amount)) for amount, campaign_ids in by_amount.items()],
+            default=Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        reaches_goal = GreaterThanOrEqual(F('current_amount') + increment, F('goal_amount'))
+        # funded_at first, as in record_loan: MySQL evaluates SET left to right
+        Campaign.objects.filter(id__in=increments).touch(
+            funded_at=Coalesce(F('funded_at'), Case(When(reaches_goal, then=Value(now)))),
+            current_amount=F('current_amount') + increment,
+        )
+
+        # Rows are locked, so the campaigns this batch funded are exactly these
+        funded = {
+            campaign_id: campaign for campaign_id, campaign in campaigns.items()
+            if campaign_id in increments and campaign.funded_at is None
+            and campaign.current_amount + increments[campaign_id] >= campaign.goal_amount
+        }
+        credited = {campaign_id for campaign_id, campaign in funded.items() if campaign.founder_credited_at is None}
+        if credited:
+            Campaign.objects.filter(id__in=credited, founder_credited_at__isnull=True).update(founder_credited_at=now)
+            credits, installments = [], []
+            for campaign in funded.values():
+                if campaign.pk in credited:
+                    credits.append(BalanceEntry(
+                        user_id=campaign.founder_id, entry_type=BalanceEntry.CREDIT, amount=campaign.goal_amount,
+                        source='funding', reference=f"campaign:{campaign.pk}",
+                    ))
+                    if campaign.repayment_period:
+                        campaign.funded_at = now
+                        installments.extend(campaign.schedule_installments())
+            apply_credits(credits)
+            RepaymentSchedule.objects.bulk_create(installments, ignore_conflicts=True)
+            RepaymentSchedule.objects.filter(campaign_id__in=credited).sync_paid()
+            Campaign.objects.filter(id__in=credited).sync_next_due()
+
+        for result, loan in loans:
+            result['loan'] = loan.pk
+            result['funded'] = result['campaign'] in funded
+        # bulk_create sends no post_save, so publish the new progress here
+        for campaign_id in increments:
+            transaction.on_commit(partial(publish_progress, campaign_id), robust=True)
+    return results
+
+
+def record_repayment(campaign, reference, amount):
+    """
+    Record a verified Paystack repayment once per reference. Updates the
+    campaign status and pays out lenders when it completes the repayment.
+    Returns (repayment, created).
+    """
+    repayment, created = Repayment.objects.get_or_create(
+        campaign=campaign,
+        reference=reference,
+        defaults={"amount": amount, "is_verified": True}
+    )
+    if created:
+        # After a new repayment, update the campaign's status
+        campaign.update_status()
+
+        # If the campaign has been fully repaid, disburse funds to lenders.
+        if campaign.remaining_repayment() <= 0:
+            disburse_campaign(campaign)
+    return repayment, created
+
+
+def confirmation_status(confirmed, reference):
+    """
+    Status of a Paystack transaction as far as the webhook queue knows:
+    'confirmed' if `confirmed` (a Loan or Repayment queryset) has a row,
+    'failed' if its event was processed without confirming anything or ran
+    out of attempts (no worker picks it up again), else 'pending'. Only
+    reads the database.
+    """
+    if confirmed.exists():
+        return 'confirmed'
+    if PaymentEvent.objects.filter(
+        Q(processed_at__isnull=False) | Q(attempts__gte=PaymentEvent.MAX_ATTEMPTS), reference=reference,
+    ).exists():
+        return 'failed'
+    return 'pending'
+
+
+def apply_payment_event(event):
+    """
+    Apply one webhook event. Successful charges carry the metadata set when
+    the transaction was initialized ({"type", "campaign_id", "user_id"}) and
+    are recorded as a Loan or Repayment; references already recorded are
+    skipped, so replays and duplicate deliveries are harmless.
+    """
+    data = event.payload.get("data") or {}
+    if event.event != "charge.success" or data.get("status") != "success":
+        return
+    metadata = data.get("metadata") or {}
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)  # Paystack echoes metadata sent as a JSON string unchanged
+
+    campaign = Campaign.objects.get(pk=metadata["campaign_id"])
+    amount = Decimal(data["amount"]) / 100  # kobo to Naira
+    if metadata.get("type") == "loan":
+        if not Loan.objects.filter(reference=event.reference).exists():
+            lender = User.objects.get(pk=metadata["user_id"])
+            if lender.user_type != "lender":
+                raise ValueError(f"User {lender.pk} is not a lender and cannot fund campaigns")
+            record_loan(campaign, lender, amount, reference=event.reference)
+    elif metadata.get("type") == "repayment":
+        record_repayment(campaign, event.reference, amount)
+    else:
+        raise ValueError(f"Unknown payment type: {metadata.get('type')!r}")
+
+
+def pending_payment_events():
+    return PaymentEvent.objects.filter(processed_at__isnull=True, attempts__lt=PaymentEvent.MAX_ATTEMPTS)
+
+
+def process_payment_events(batch_size=100):
+    """
+    Apply the oldest batch of pending events in one transaction. Each event
+    gets its own savepoint: a failing event records its error and is retried
+    by later runs, up to PaymentEvent.MAX_ATTEMPTS. Events locked by another
+    worker are skipped where the database supports SKIP LOCKED.
+    Returns (processed, failed).
+    """
+    processed = failed = 0
+    with transaction.atomic():
+        events = pending_payment_events().order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            events = events.select_for_update(skip_locked=True)
+        for event in events[:batch_size]:
+            try:
+                with transaction.atomic():
+                    apply_payment_event(event)
+            except Exception as e:
+                event.attempts += 1
+                event.error = str(e)
+                event.save(update_fields=['attempts', 'error'])
+                failed += 1
+            else:
+                event.processed_at = timezone.now()
+                event.error = ''
+                event.save(update_fields=['processed_at', 'error'])
+                processed += 1
+    return processed, failed
@@ -1,3 +1,644 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.test.utils import CaptureQueriesContext
+from campaigns.models import Campaign, Loan, Repayment
+from campaigns.serializers import LoanSerializer
+from users.models import User
+from .models import BalanceEntry, Disbursement, PaymentEvent
+from .paystack import AsyncPaystackClient, PaystackClient, PaystackError, get_async_client, reset_client
+from .services import (
+    InsufficientBalance, credit_balances, debit_balance, disburse_campaign, disburse_campaigns, lender_shares,
+    pending_disbursements, process_payment_events, record_loan, record_loans,
+)
 
-# Create your tests here.
+
+def make_user(username, user_type='lender', **extra):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password="password123",
+        user_type=user_type, **extra
+    )
+
+
+class DisbursementTests(TestCase):
+    def setUp(self):
+        founder = make_user("founder", user_type='founder', is_approved=True)
+        self.alice = make_user("alice")
+        self.bob = make_user("bob", balance=Decimal('5.00'))
+        self.campaign = Campaign.objects.create(
+            founder=founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('1000.00'), current_amount=Decimal('1000.00'),
+            interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        # Alice lends twice; her loans are combined into one share
+        Loan.objects.create(campaign=self.campaign, lender=self.alice, amount=Decimal('250.00'))
+        Loan.objects.create(campaign=self.campaign, lender=self.alice, amount=Decimal('500.00'))
+        Loan.objects.create(campaign=self.campaign, lender=self.bob, amount=Decimal('250.00'))
+
+    def test_shares_are_proportional_to_amount_lent(self):
+        self.assertEqual(lender_shares(self.campaign), {
+            self.alice.id: Decimal('825.00'),
+            self.bob.id: Decimal('275.00'),
+        })
+
+    def test_disburse_credits_balances_in_one_update_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            disburse_campaign(self.campaign)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "users_user"')]
+        self.assertEqual(len(updates), 1)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.balance, Decimal('825.00'))
+        self.assertEqual(self.bob.balance, Decimal('280.00'))
+
+    def test_credit_balances_chunks_and_handles_null_balance(self):
+        User.objects.filter(pk=self.alice.pk).update(balance=None)
+        credit_balances({self.alice.id: Decimal('1.50'), self.bob.id: Decimal('1.50')}, source='adjustment', chunk_size=1)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.balance, Decimal('1.50'))
+        self.assertEqual(self.bob.balance, Decimal('6.50'))
+
+    def test_command_disburses_each_repaid_campaign_once(self):
+        self.assertFalse(pending_disbursements().exists())
+        Repayment.objects.create(campaign=self.campaign, amount=Decimal('1100.00'), reference="r1", is_verified=True)
+        self.assertEqual(list(pending_disbursements()), [self.campaign])
+
+        out = StringIO()
+        call_command('disburse_repayments', stdout=out)
+        self.assertIn("Disbursed 1100.00 to 2 lender(s) across 1 campaign(s)", out.getvalue())
+        self.assertEqual(Disbursement.objects.filter(campaign=self.campaign).count(), 2)
+
+        out = StringIO()
+        call_command('disburse_repayments', stdout=out)
+        self.assertIn("0 campaign(s) to disburse", out.getvalue())
+        self.assertEqual(disburse_campaign(self.campaign), {})
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.balance, Decimal('280.00'))
+
+    def test_totals_count_only_campaigns_paid_out(self):
+        Repayment.objects.create(campaign=self.campaign, amount=Decimal('1100.00'), reference="r1", is_verified=True)
+        unfunded = Campaign.objects.create(
+            founder=self.campaign.founder, title="No lenders", description="Repaid without loans",
+            goal_amount=Decimal('100.00'), interest_rate=Decimal('10.00'), repayment_period=1, is_approved=True,
+        )
+        Repayment.objects.create(campaign=unfunded, amount=Decimal('110.00'), reference="r2", is_verified=True)
+        self.assertEqual(pending_disbursements().count(), 2)
+        totals = disburse_campaigns([self.campaign.pk, unfunded.pk])
+        self.assertEqual(totals, {'campaigns': 1, 'lenders': 2, 'amount': Decimal('1100.00')})
+        # Nobody to pay, but it still leaves the queue instead of being rescanned every run
+        unfunded.refresh_from_db()
+        self.assertIsNotNone(unfunded.disbursed_at)
+        self.assertFalse(pending_disbursements().exists())
+
+    def test_dry_run_reports_without_writing(self):
+        Repayment.objects.create(campaign=self.campaign, amount=Decimal('1100.00'), reference="r1", is_verified=True)
+        out = StringIO()
+        call_command('disburse_repayments', '--dry-run', '--chunk-size', '1', stdout=out)
+        self.assertIn("[1/1] 1 campaign(s), 2 lender(s), 1100.00", out.getvalue())
+        self.assertIn("Would disburse 1100.00", out.getvalue())
+        self.assertFalse(Disbursement.objects.exists())
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.balance, Decimal('5.00'))
+
+
+class BalanceLedgerTests(TestCase):
+    def setUp(self):
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+
+    def test_credits_and_debits_are_recorded(self):
+        credit_balances({self.alice.id: Decimal('30.00'), self.bob.id: Decimal('0.00')}, source='disbursement')
+        debit_balance(self.alice, Decimal('12.50'), source='withdrawal')
+        self.assertEqual(self.alice.balance, Decimal('17.50'))
+        self.assertEqual(
+            list(BalanceEntry.objects.order_by('id').values_list('user', 'entry_type', 'amount')),
+            [(self.alice.id, 'credit', Decimal('30.00')), (self.alice.id, 'debit', Decimal('12.50'))],
+        )
+        with self.assertRaises(InsufficientBalance):
+            debit_balance(self.bob, Decimal('0.01'), source='withdrawal')
+
+    def test_reconcile_restores_cached_balances_from_the_ledger(self):
+        credit_balances({self.alice.id: Decimal('30.00'), self.bob.id: Decimal('5.00')}, source='disbursement')
+        User.objects.filter(pk=self.alice.pk).update(balance=Decimal('999.00'))
+        User.objects.filter(pk=self.bob.pk).update(balance=None)
+
+        out = StringIO()
+        call_command('reconcile_balances', '--dry-run', stdout=out)
+        self.assertIn("2 balance(s) would be reconciled", out.getvalue())
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.balance, Decimal('999.00'))
+
+        out = StringIO()
+        call_command('reconcile_balances', stdout=out)
+        self.assertIn("User %d: balance 999.00 -> 30.00" % self.alice.id, out.getvalue())
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.balance, self.bob.balance), (Decimal('30.00'), Decimal('5.00')))
+
+        out = StringIO()
+        call_command('reconcile_balances', stdout=out)
+        self.assertIn("0 balance(s) reconciled", out.getvalue())
+
+
+class StubPaystackHandler(BaseHTTPRequestHandler):
+    """Keep-alive stub of the two Paystack endpoints the app uses."""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self._respond({"status": True, "data": {"status": "success", "amount": 150000}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.bodies.append(body)
+        self._respond({"status": True, "data": {"authorization_url": "https://pay.test", "reference": body.get("reference")}})
+
+    def _respond(self, payload):
+        self.server.requests.append((self.command, self.path, self.headers.get('Authorization')))
+        if self.server.failures:
+            self.server.failures -= 1
+            payload, code = {"status": False}, 503
+        else:
+            code = 200
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PaystackClientTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubPaystackHandler)
+        self.server.connections, self.server.requests, self.server.bodies, self.server.failures = 0, [], [], 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = PaystackClient(
+            "sk_test", base_url=f"http://127.0.0.1:{self.server.server_port}", backoff_factor=0
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused_across_calls(self):
+        for n in range(5):
+            status_code, data = self.client.verify_transaction(f"ref-{n}")
+            self.assertEqual(status_code, 200)
+            self.assertEqual(data["data"]["status"], "success")
+        self.client.initialize_transaction("a@example.com", 5000, reference="ref-init")
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertTrue(all(auth == "Bearer sk_test" for _, _, auth in self.server.requests))
+
+    def test_retries_server_errors(self):
+        self.server.failures = 2
+        status_code, data = self.client.verify_transaction("ref")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_initialize_is_not_retried_after_reaching_paystack(self):
+        # Each retry of a POST that got through could open another transaction
+        self.server.failures = 1
+        status_code, _ = self.client.initialize_transaction("a@example.com", 5000)
+        self.assertEqual(status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    async def test_async_client_retries_like_the_sync_one(self):
+        client = AsyncPaystackClient("sk_test", base_url=f"http://127.0.0.1:{self.server.server_port}", backoff_factor=0)
+        self.server.failures = 2
+        self.assertEqual((await client.verify_transaction("ref"))[0], 200)
+        self.server.failures = 1
+        self.assertEqual((await client.initialize_transaction("a@example.com", 5000))[0], 503)
+        await client.aclose()
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_connection_errors_raise_paystack_error(self):
+        client = PaystackClient("sk_test", base_url="http://127.0.0.1:9", max_retries=1, backoff_factor=0)
+        with self.assertRaises(PaystackError):
+            client.verify_transaction("ref")
+
+    def test_payment_and_repayment_views_share_the_pooled_client(self):
+        founder = make_user("founder", user_type='founder', is_approved=True)
+        lender = make_user("lender")
+        campaign = Campaign.objects.create(
+            founder=founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('5000.00'), interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        api = APIClient()
+        api.force_authenticate(lender)
+        data = {'campaign_id': campaign.id, 'amount': 15}
+        with override_settings(PAYSTACK_BASE_URL=f"http://127.0.0.1:{self.server.server_port}"):
+            reset_client()
+            self.addCleanup(reset_client)
+            response = api.post(reverse('initialize-payment'), data, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = api.post(reverse('initialize-repayment'), data, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual([body["metadata"]["type"] for body in self.server.bodies], ["loan", "repayment"])
+
+    async def test_async_views_initialize_through_the_event_loop_client(self):
+        founder = await User.objects.acreate(username="founder", email="founder@example.com", user_type='founder')
+        lender = await User.objects.acreate(username="lender", email="lender@example.com", user_type='lender')
+        campaign = await Campaign.objects.acreate(
+            founder=founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('5000.00'), interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        client = AsyncClient()
+        auth = {"Authorization": f"Bearer {RefreshToken.for_user(lender).access_token}"}
+        data = {'campaign_id': campaign.id, 'amount': 15}
+        with override_settings(PAYSTACK_BASE_URL=f"http://127.0.0.1:{self.server.server_port}"):
+            reset_client()
+            self.addCleanup(reset_client)
+            for name in ('async-initialize-payment', 'async-initialize-repayment'):
+                response = await client.post(reverse(name), data, content_type='application/json', headers=auth)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.connections, 1)
+        # Resetting closes the loop's client on the loop itself
+        paystack = get_async_client()
+        reset_client()
+        for _ in range(50):
+            if paystack.client.is_closed:
+                break
+            await asyncio.sleep(0.01)
+        self.assertTrue(paystack.client.is_closed)
+        self.assertIsNot(get_async_client(), paystack)
+        self.assertEqual(
+            [body["metadata"] for body in self.server.bodies],
+            [{"type": t, "campaign_id": campaign.id, "user_id": lender.id} for t in ("loan", "repayment")],
+        )
+
+
+@override_settings(PAYSTACK_SECRET_KEY="sk_test_webhook")
+class PaymentEventTests(TestCase):
+    def setUp(self):
+        founder = make_user("founder", user_type='founder', is_approved=True)
+        self.lender = make_user("lender")
+        self.campaign = Campaign.objects.create(
+            founder=founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('1000.00'), interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.lender)
+
+    def deliver(self, reference, kind, amount=100000, status="success", signature=None, user=None):
+        body = json.dumps({"event": "charge.success", "data": {
+            "reference": reference, "amount": amount, "status": status,
+            "metadata": {"type": kind, "campaign_id": self.campaign.id, "user_id": (user or self.lender).id},
+        }}).encode()
+        signature = signature or hmac.new(b"sk_test_webhook", body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            reverse('paystack-webhook'), body, content_type='application/json',
+            headers={"x-paystack-signature": signature},
+        )
+
+    def test_webhook_rejects_bad_signatures(self):
+        response = self.deliver("pay-1", "loan", signature="0" * 128)
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_webhook_only_queues_the_event(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.deliver("pay-1", "loan")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        event = PaymentEvent.objects.get()
+        self.assertEqual((event.event, event.reference, event.processed_at), ("charge.success", "pay-1", None))
+        self.assertFalse(Loan.objects.exists())
+
+    def test_events_are_applied_once_per_reference(self):
+        self.deliver("pay-1", "loan")
+        self.deliver("pay-1", "loan")  # Paystack retries deliveries
+        self.deliver("repay-1", "repayment", amount=50000)
+
+        response = self.api.get(reverse('verify-payment', args=["pay-1"]))
+        self.assertEqual(response.status_code, 202)
+
+        out = StringIO()
+        call_command('process_payment_events', stdout=out)
+        self.assertIn("Processed 3 event(s); 0 failed", out.getvalue())
+        loan = Loan.objects.get()
+        self.assertEqual((loan.reference, loan.lender, loan.amount), ("pay-1", self.lender, Decimal('1000.00')))
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.current_amount, Decimal('1000.00'))
+        self.assertEqual(self.campaign.repaid_amount, Decimal('500.00'))
+
+        response = self.api.get(reverse('verify-payment', args=["pay-1"]))
+        self.assertEqual(response.data, {"message": "Payment verified successfully, loan created"})
+        response = self.api.get(reverse('verify-repayment', args=["repay-1"]))
+        self.assertEqual(response.data, {"message": "Repayment verified successfully"})
+
+    def test_unsuccessful_and_failing_events(self):
+        self.deliver("pay-failed", "loan", status="failed")
+        self.deliver("pay-bad", "gift")
+        self.assertEqual(process_payment_events(), (1, 1))
+
+        response = self.api.get(reverse('verify-payment', args=["pay-failed"]))
+        self.assertEqual(response.status_code, 400)
+        event = PaymentEvent.objects.get(reference="pay-bad")
+        self.assertEqual((event.attempts, event.processed_at), (1, None))
+        self.assertIn("Unknown payment type", event.error)
+
+        response = self.api.get(reverse('verify-payment', args=["pay-bad"]))
+        self.assertEqual(response.status_code, 202)  # Still retried
+        PaymentEvent.objects.filter(pk=event.pk).update(attempts=PaymentEvent.MAX_ATTEMPTS)
+        self.assertEqual(process_payment_events(), (0, 0))
+        # Exhausted: never retried again, so pollers must not be told to keep waiting
+        response = self.api.get(reverse('verify-payment', args=["pay-bad"]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_lenders_can_fund(self):
+        founder = self.campaign.founder
+        self.api.force_authenticate(founder)
+        response = self.api.post(reverse('initialize-payment'), {'campaign_id': self.campaign.id, 'amount': 100}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        # A loan charge initialized for a non-lender some other way is never recorded
+        self.deliver("pay-founder", "loan", user=founder)
+        self.assertEqual(process_payment_events(), (0, 1))
+        self.assertIn("not a lender", PaymentEvent.objects.get().error)
+        self.assertFalse(Loan.objects.exists())
+
+
+class FundingTests(TestCase):
+    def setUp(self):
+        self.founder = make_user("founder", user_type='founder', is_approved=True)
+        self.lender = make_user("lender")
+        self.campaign = Campaign.objects.create(
+            founder=self.founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('1000.00'), interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+
+    def test_stale_campaign_copies_do_not_lose_updates(self):
+        first, second = Campaign.objects.get(), Campaign.objects.get()
+        record_loan(first, self.lender, Decimal('600.00'))
+        self.assertIsNone(first.funded_at)
+        record_loan(second, self.lender, Decimal('400.00'))
+        self.assertEqual(second.current_amount, Decimal('1000.00'))
+        self.assertIsNotNone(second.funded_at)
+        self.founder.refresh_from_db()
+        self.assertEqual(self.founder.balance, Decimal('1000.00'))
+
+    def test_founder_is_credited_once(self):
+        record_loan(self.campaign, self.lender, Decimal('1000.00'))
+        funded_at = self.campaign.funded_at
+        with CaptureQueriesContext(connection) as queries:
+            record_loan(self.campaign, self.lender, Decimal('50.00'))
+        self.assertEqual(self.campaign.funded_at, funded_at)
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "users_user"')])
+        self.founder.refresh_from_db()
+        self.assertEqual(self.founder.balance, Decimal('1000.00'))
+        self.assertEqual(self.campaign.schedule.count(), self.campaign.repayment_period)
+
+    def test_loan_serializer_funds_through_the_service(self):
+        request = APIRequestFactory().post('/')
+        request.user = self.lender
+        serializer = LoanSerializer(data={'campaign': self.campaign.id, 'amount': '1000.00'}, context={'request': request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        loan = serializer.save()
+        self.assertEqual(loan.lender, self.lender)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.current_amount, Decimal('1000.00'))
+        self.assertIsNotNone(self.campaign.founder_credited_at)
+
+
+class BatchFundingTests(TestCase):
+    def setUp(self):
+        self.founder = make_user("founder", user_type='founder', is_approved=True)
+        self.lender = make_user("lender")
+        self.campaigns = [self.make_campaign(f"Campaign {n}") for n in range(2)]
+
+    def make_campaign(self, title, **extra):
+        return Campaign.objects.create(
+            founder=self.founder, title=title, description="Synthetic", goal_amount=Decimal('1000.00'),
+            interest_rate=Decimal('10.00'), repayment_period=12, is_approved=extra.pop('is_approved', True), **extra
+        )
+
+    def test_items_are_checked_against_the_remaining_goal_together(self):
+        first, second = self.campaigns
+        closed = self.make_campaign("Closed", is_approved=False)
+        results = record_loans(self.lender, [
+            (first.pk, Decimal('600.00')), (second.pk, Decimal('1000.00')), (first.pk, Decimal('500.00')),
+            (first.pk, Decimal('400.00')), (closed.pk, Decimal('10.00')), (0, Decimal('10.00')),
+        ])
+
+        self.assertEqual([('loan' in result, result.get('funded')) for result in results], [
+            (True, True), (True, True), (False, None), (True, True), (False, None), (False, None),
+        ])
+        self.assertEqual(results[2]['error'], "Amount exceeds the remaining goal of 400.00.")
+        self.assertEqual(Loan.objects.filter(campaign=first).count(), 2)
+        for campaign in (first, second):
+            campaign.refresh_from_db()
+            self.assertEqual(campaign.current_amount, Decimal('1000.00'))
+            self.assertIsNotNone(campaign.funded_at)
+            self.assertEqual(campaign.founder_credited_at, campaign.funded_at)
+            self.assertGreater(campaign.version, 0)
+            self.assertEqual(campaign.schedule.count(), 12)
+            self.assertEqual(campaign.next_due_amount, Decimal('91.67'))
+        self.founder.refresh_from_db()
+        self.assertEqual(self.founder.balance, Decimal('2000.00'))
+        self.assertEqual(
+            set(BalanceEntry.objects.values_list('reference', flat=True)), {f"campaign:{first.pk}", f"campaign:{second.pk}"}
+        )
+
+    def test_endpoint_queries_do_not_grow_with_the_batch(self):
+        self.campaigns += [self.make_campaign(f"Campaign {n}") for n in range(2, 6)]
+        client = APIClient()
+        client.force_authenticate(self.lender)
+
+        def fund(campaigns):
+            payload = {'loans': [{'campaign': campaign.pk, 'amount': "1000.00"} for campaign in campaigns]}
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(reverse('loan-batch'), payload, format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(response.data['recorded'], len(campaigns))
+            return len(queries)
+
+        self.assertEqual(fund(self.campaigns[:2]), fund(self.campaigns[2:]))
+        response = client.post(reverse('loan-batch'), {'loans': [{'campaign': self.campaigns[0].pk, 'amount': "1.00"}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0]['error'], "Amount exceeds the remaining goal of 0.00.")
+
+    def test_only_lenders_can_fund_in_bulk(self):
+        client = APIClient()
+        client.force_authenticate(self.founder)
+        payload = {'loans': [{'campaign': campaign.pk, 'amount': "10.00"} for campaign in self.campaigns]}
+        response = client.post(reverse('loan-batch'), payload, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Loan.objects.exists())
+
+    def test_campaigns_cannot_be_self_funded(self):
+        # A founder's account switched to lending still cannot fund its own campaigns
+        User.objects.filter(pk=self.founder.pk).update(user_type='lender')
+        self.founder.refresh_from_db()
+        other = Campaign.objects.create(
+            founder=self.lender, title="Lender's own", description="Synthetic", goal_amount=Decimal('1000.00'),
+            interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        results = record_loans(self.founder, [(self.campaigns[0].pk, Decimal('1000.00')), (other.pk, Decimal('10.00'))])
+        self.assertEqual(results[0]['error'], "You cannot fund your own campaign.")
+        self.assertIn('loan', results[1])
+        self.founder.refresh_from_db()
+        self.assertEqual(self.founder.balance, Decimal('0.00'))
+        self.assertEqual(list(Loan.objects.values_list('campaign_id', flat=True)), [other.pk])
+
+
+class RepaymentImportTests(TestCase):
+    def setUp(self):
+        self.founder = make_user("founder", user_type='founder', is_approved=True)
+        self.lender = make_user("lender")
+        self.campaign = Campaign.objects.create(
+            founder=self.founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('1000.00'), interest_rate=Decimal('10.00'), repayment_period=2, is_approved=True,
+        )
+        record_loan(self.campaign, self.lender, Decimal('1000.00'))
+        Repayment.objects.create(campaign=self.campaign, amount=Decimal('1.00'), reference="rep-0", is_verified=True)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as export:
+            export.write(content)
+        return path
+
+    def transaction(self, reference, amount, status="success", **metadata):
+        return {"reference": reference, "amount": amount, "status": status, "metadata": metadata or None}
+
+    def test_json_export_is_imported_and_totals_recomputed_once(self):
+        # Matched through the webhook event queued for it
+        PaymentEvent.objects.create(event="charge.success", reference="rep-2", payload={"data": {
+            "reference": "rep-2", "metadata": {"type": "repayment", "campaign_id": self.campaign.pk},
+        }})
+        rows = [
+            self.transaction("rep-0", 100),  # Already recorded
+            self.transaction("rep-1", 55000, type="repayment", campaign_id=self.campaign.pk),
+            self.transaction("rep-1", 55000, type="repayment", campaign_id=self.campaign.pk),
+            self.transaction("rep-2", 54900),
+            self.transaction("rep-3", 55000, status="failed", type="repayment", campaign_id=self.campaign.pk),
+            self.transaction("loan-1", 55000, type="loan", campaign_id=self.campaign.pk),
+            self.transaction("rep-4", 55000, type="repayment", campaign_id=0),
+        ]
+        path = self.write("export.json", json.dumps(rows))
+        out, err = StringIO(), StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_paystack_repayments', path, stdout=out, stderr=err)
+
+        self.assertIn("Imported 2 repayment(s) for 1 campaign(s); 1 already recorded, 1 unmatched, 2 skipped", out.getvalue())
+        self.assertIn("rep-4", err.getvalue())
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT') and 'INTO "campaigns_repayment"' in q['sql']]), 1)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.repaid_amount, Decimal('1100.00'))
+        self.assertEqual(self.campaign.verified_installments, 3)
+        self.assertIsNotNone(self.campaign.fully_repaid_at)
+        self.assertIsNone(self.campaign.next_due_date)
+        self.assertFalse(self.campaign.is_approved)
+        self.assertEqual(self.campaign.schedule.filter(paid=True).count(), 2)
+        self.assertEqual(Disbursement.objects.get(campaign=self.campaign).amount, Decimal('1100.00'))
+
+    def test_csv_dry_run_writes_nothing(self):
+        path = self.write("export.csv", (
+            "Reference,Amount,Status,Campaign Id\n"
+            f"rep-1,\"1,000.00\",success,{self.campaign.pk}\n"
+            "rep-2,550.00,abandoned,\n"
+        ))
+        out = StringIO()
+        call_command('import_paystack_repayments', path, dry_run=True, stdout=out)
+        self.assertIn("Would import 1 repayment(s) for 1 campaign(s)", out.getvalue())
+        self.assertEqual(Repayment.objects.count(), 1)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.repaid_amount, Decimal('1.00'))
+
+    def test_rows_recorded_meanwhile_are_not_counted_as_imported(self):
+        PaymentEvent.objects.create(event="charge.success", reference="rep-2", payload={"data": {
+            "reference": "rep-2", "metadata": "{not json",
+        }})
+        rows = [
+            self.transaction("rep-1", 55000, type="repayment", campaign_id=self.campaign.pk),
+            self.transaction("rep-2", 55000),  # Its queued event's metadata is malformed
+            self.transaction("rep-3", 55000, type="repayment", campaign_id=self.campaign.pk),
+        ]
+        path = self.write("export.json", json.dumps(rows))
+        lookup = PaymentEvent.objects.filter
+
+        def webhook_records_rep_1(*args, **kwargs):
+            # The webhook worker records rep-1 after the import checked for it
+            Repayment.objects.get_or_create(
+                reference="rep-1", defaults={'campaign': self.campaign, 'amount': Decimal('550.00'), 'is_verified': True},
+            )
+            return lookup(*args, **kwargs)
+
+        out = StringIO()
+        with mock.patch.object(PaymentEvent.objects, 'filter', side_effect=webhook_records_rep_1):
+            call_command('import_paystack_repayments', path, stdout=out, stderr=StringIO())
+        self.assertIn("Imported 1 repayment(s) for 1 campaign(s); 1 already recorded, 1 unmatched", out.getvalue())
+        self.assertEqual(Repayment.objects.filter(reference__in=["rep-1", "rep-3"]).count(), 2)
+
+
+class ConcurrentFundingTests(TransactionTestCase):
+    def test_concurrent_lenders_fund_exact_totals(self):
+        founder = make_user("founder", user_type='founder', is_approved=True)
+        lenders = [make_user(f"lender{n}") for n in range(8)]
+        campaign = Campaign.objects.create(
+            founder=founder, title="Solar kiosks", description="Solar for traders",
+            goal_amount=Decimal('1000.00'), interest_rate=Decimal('10.00'), repayment_period=12, is_approved=True,
+        )
+        start = threading.Barrier(len(lenders))
+        errors = []
+
+        def fund(lender):
+            stale = Campaign.objects.get(pk=campaign.pk)
+            start.wait()
+            try:
+                for _ in range(5):
+                    while True:
+                        try:
+                            record_loan(stale, lender, Decimal('37.50'))
+                            break
+                        except OperationalError as e:
+                            # SQLite locks whole tables; retry the transaction like a client would
+                            if 'locked' not in str(e):
+                                raise
+                            time.sleep(0.001)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=fund, args=(lender,)) for lender in lenders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.current_amount, Decimal('1500.00'))
+        self.assertEqual(Loan.objects.filter(campaign=campaign).count(), 40)
+        founder.refresh_from_db()
+        self.assertEqual(founder.balance, Decimal('1000.00'))
@@ -1,7 +1,13 @@
 from django.urls import path
-from .views import InitializePaymentView, VerifyPaymentView
+from .views import (
+    AsyncInitializePaymentView, AsyncVerifyPaymentView, InitializePaymentView, PaystackWebhookView, VerifyPaymentView
+)
 
 urlpatterns = [
     path('initialize/', InitializePaymentView.as_view(), name='initialize-payment'),
     path('verify/<str:reference>/', VerifyPaymentView.as_view(), name='verify-payment'),
+    path('webhook/', PaystackWebhookView.as_view(), name='paystack-webhook'),
+    # Async equivalents, for use when served through backend/asgi.py
+    path('async/initialize/', AsyncInitializePaymentView.as_view(), name='async-initialize-payment'),
+    path('async/verify/<str:reference>/', AsyncVerifyPaymentView.as_view(), name='async-verify-payment'),
 ]
@@ -1,49 +1,33 @@
-import requests
-import os
-from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from .paystack import get_client
 
-PAYSTACK_SECRET_KEY = os.getenv('PAYSTACK_SECRET_KEY')
-PAYSTACK_BASE_URL = os.getenv('PAYSTACK_BASE_URL', 'https://api.paystack.co')
-
-def initialize_payment(email, amount):
+def initialize_payment(email, amount, **extra):
     """
     Initialize a payment with Paystack.
 
     :param email: The customer's email.
     :param amount: The amount to be paid in kobo (Naira * 100).
+    :param extra: Other transaction fields, e.g. metadata echoed back in the webhook.
     :return: The response data from Paystack.
     """
-    url = f"{PAYSTACK_BASE_URL}/transaction/initialize"
-    headers = {
-        "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "email": email,
-        "amount": amount,
-        "currency": "NGN"
-    }
-    response = requests.post(url, json=payload, headers=headers)
+    status_code, data = get_client().initialize_transaction(email, amount, currency="NGN", **extra)
 
-    if response.status_code != 200:
-        raise Exception(f"Paystack Initialization Error: {response.json()}")
+    if status_code != 200:
+        raise Exception(f"Paystack Initialization Error: {data}")
 
-    return response.json()
+    return data
 
-def verify_payment(reference):
+def confirmation_response(state, confirmed_message, failed_message):
     """
-    Verify a payment with Paystack.
-
-    :param reference: The transaction reference.
-    :return: The response data from Paystack.
+    Map a services.confirmation_status() result to the verify endpoints' response.
+    Pending transactions get 202 so clients can poll again.
     """
-    url = f"{PAYSTACK_BASE_URL}/transaction/verify/{reference}"
-    headers = {
-        "Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"
-    }
-    response = requests.get(url, headers=headers)
-
-    if response.status_code != 200:
-        raise Exception(f"Paystack Verification Error: {response.json()}")
-
-    return response.json()
+    if state == 'confirmed':
+        return Response({"message": confirmed_message}, status=status.HTTP_200_OK)
+    if state == 'failed':
+        return Response({"error": failed_message}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(
+        {"status": "pending", "detail": "Waiting for Paystack to confirm the transaction"},
+        status=status.HTTP_202_ACCEPTED
+    )
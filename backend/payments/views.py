@@ -1,13 +1,16 @@
+import json
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from .utils import initialize_payment, verify_payment
-from campaigns.models import Campaign
-from campaigns.models import Loan
-from django.utils import timezone
-from users.models import User  
-from django.shortcuts import get_object_or_404
-from decimal import Decimal
+from .models import PaymentEvent
+from .paystack import get_async_client, verify_signature
+from .services import confirmation_status
+from .utils import confirmation_response, initialize_payment
+from campaigns.models import Campaign, Loan
+from django.shortcuts import aget_object_or_404, get_object_or_404
 
 class InitializePaymentView(APIView):
     def post(self, request, *args, **kwargs):
@@ -15,52 +18,88 @@ class InitializePaymentView(APIView):
         amount = request.data.get("amount")
         campaign = get_object_or_404(Campaign, id=campaign_id)
 
+        # Checked before Paystack is called; the webhook worker checks again before recording the Loan
+        if request.user.user_type != "lender":
+            return Response({"error": "Only lenders can fund campaigns"}, status=status.HTTP_403_FORBIDDEN)
+
         if amount > (campaign.goal_amount - campaign.current_amount):
             return Response({"error": "Amount exceeds campaign goal"}, status=status.HTTP_400_BAD_REQUEST)
 
         email = request.user.email  # Assuming user authentication is handled
+        # Echoed back in the charge.success webhook, which creates the Loan
+        metadata = {"type": "loan", "campaign_id": campaign.id, "user_id": request.user.id}
         try:
-            payment_data = initialize_payment(email, int(amount * 100))  # Convert to kobo
+            payment_data = initialize_payment(email, int(amount * 100), metadata=metadata)  # Convert to kobo
             return Response(payment_data, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class VerifyPaymentView(APIView):
+    """
+    Report whether the Paystack webhook has confirmed the payment yet.
+    Only reads the database; the Loan itself is created by process_payment_events.
+    """
     def get(self, request, reference, *args, **kwargs):
+        state = confirmation_status(Loan.objects.filter(reference=reference, lender=request.user), reference)
+        return confirmation_response(state, "Payment verified successfully, loan created", "Payment not successful")
+
+
+class PaystackWebhookView(APIView):
+    """
+    Receives Paystack webhook calls. Checks the signature and appends the raw
+    event to the PaymentEvent queue; process_payment_events applies it.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        body = request.body
+        if not verify_signature(body, request.headers.get("x-paystack-signature")):
+            return Response({"error": "Invalid signature"}, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return Response({"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+        PaymentEvent.objects.create(
+            event=payload.get("event", ""),
+            reference=(payload.get("data") or {}).get("reference") or "",
+            payload=payload,
+        )
+        return Response(status=status.HTTP_200_OK)
+
+
+# Async variants for ASGI deployments: the Paystack round-trip awaits on the
+# shared httpx pool instead of holding a worker thread.
+
+class AsyncInitializePaymentView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        campaign_id = request.data.get("campaign_id")
+        amount = request.data.get("amount")
+        campaign = await aget_object_or_404(Campaign, id=campaign_id)
+
+        # Checked before Paystack is called; the webhook worker checks again before recording the Loan
+        if request.user.user_type != "lender":
+            return Response({"error": "Only lenders can fund campaigns"}, status=status.HTTP_403_FORBIDDEN)
+
+        if amount > (campaign.goal_amount - campaign.current_amount):
+            return Response({"error": "Amount exceeds campaign goal"}, status=status.HTTP_400_BAD_REQUEST)
+
+        email = request.user.email
+        metadata = {"type": "loan", "campaign_id": campaign.id, "user_id": request.user.id}
         try:
-            payment_data = verify_payment(reference)
-
-            if payment_data["data"]["status"] == "success":
-                campaign_id = request.query_params.get("campaign_id")
-                campaign = get_object_or_404(Campaign, id=campaign_id)
-                
-                # Convert amount from kobo to Naira
-                amount_paid = Decimal(payment_data["data"]["amount"]) / 100
-                
-                # Get the lender (authenticated user)
-                lender = get_object_or_404(User, id=request.user.id)
-
-                # Ensure the user is a lender
-                if lender.user_type != "lender":
-                    return Response({"error": "Only lenders can fund campaigns"}, status=status.HTTP_403_FORBIDDEN)
-
-                # Create a new Loan instance instead of updating campaign amount
-                Loan.objects.create(
-                    campaign=campaign,
-                    lender=lender,
-                    amount=amount_paid
-                )
-                
-                campaign.current_amount += amount_paid
-                
-                # If campaign is now fully funded and funded_at is not set, update funded_at.
-                if campaign.is_goal_reached() and not campaign.funded_at:
-                    campaign.funded_at = timezone.now() + timezone.timedelta(hours=1)
-                
-                campaign.save()
-
-                return Response({"message": "Payment verified successfully, loan created"}, status=status.HTTP_200_OK)
-            else:
-                return Response({"error": "Payment not successful"}, status=status.HTTP_400_BAD_REQUEST)
+            status_code, payment_data = await get_async_client().initialize_transaction(
+                email, int(amount * 100), currency="NGN", metadata=metadata  # Convert to kobo
+            )
+            if status_code != 200:
+                raise Exception(f"Paystack Initialization Error: {payment_data}")
+            return Response(payment_data, status=status.HTTP_200_OK)
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class AsyncVerifyPaymentView(AsyncAPIView):
+    async def get(self, request, reference, *args, **kwargs):
+        state = await sync_to_async(confirmation_status)(
+            Loan.objects.filter(reference=reference, lender=request.user), reference
+        )
+        return confirmation_response(state, "Payment verified successfully, loan created", "Payment not successful")
@@ -6,3 +6,4 @@ class UserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'user_type', 'is_approved', 'has_defaulted')
     list_filter = ('user_type', 'is_approved', 'has_defaulted')
     search_fields = ('username', 'email')
+    readonly_fields = ('balance',)  # Cached from the payments BalanceEntry ledger
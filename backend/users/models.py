@@ -20,6 +20,7 @@ class User(AbstractUser):
     identity_document = models.ImageField(upload_to='identity_documents/', null=True, blank=True)
 
     # Lender-specific fields
+    # Cached sum of payments.BalanceEntry; change it only through payments.services
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0, null=True, blank=True)
 
     def is_accessible(self):
@@ -1,19 +1,21 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from backend.uploads import DirectUploadField
 
 User = get_user_model()
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     identity_document = serializers.FileField(required=False)
+    identity_document_upload = DirectUploadField('identity_document')  # Token from api/uploads/direct/
 
     class Meta:
         model = User
         fields = [
             'username', 'first_name', 'last_name', 'email', 'password',
             'bank_name', 'account_number', 'user_type', 'bvn', 
-            'identity_document', 'balance', 'is_approved'
+            'identity_document', 'identity_document_upload', 'balance', 'is_approved'
         ]
         read_only_fields = ['balance', 'is_approved']
 
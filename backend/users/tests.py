@@ -1,3 +1,104 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+from backend.uploads import LimitedUploadHandler
+from payments.models import BalanceEntry
+from payments.services import credit_balances
+from .models import User
 
-# Create your tests here.
+
+class WithdrawTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="lender", email="lender@example.com", password="password123", user_type='lender'
+        )
+        credit_balances({self.user.id: Decimal('100.00')}, source='disbursement', reference="campaign:1")
+        self.user.refresh_from_db()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_withdrawal_debits_balance_and_ledger(self):
+        response = self.api.post(reverse('withdraw'), {'amount': '40.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['new_balance'], Decimal('60.00'))
+        entry = BalanceEntry.objects.get(entry_type=BalanceEntry.DEBIT)
+        self.assertEqual((entry.user, entry.amount, entry.source), (self.user, Decimal('40.00'), 'withdrawal'))
+
+    def test_overdraw_is_rejected_by_the_guarded_update(self):
+        # A concurrent withdrawal drained the balance after the serializer checked it
+        User.objects.filter(pk=self.user.pk).update(balance=Decimal('10.00'))
+        response = self.api.post(reverse('withdraw'), {'amount': '40.00'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Insufficient balance.'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('10.00'))
+        self.assertFalse(BalanceEntry.objects.filter(entry_type=BalanceEntry.DEBIT).exists())
+
+
+def make_scan(size=(16, 16), name="id.png", content_type='image/png'):
+    buffer = BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(buffer, 'PNG')  # Noise: no compression
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=content_type)
+
+
+class RegistrationUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        limits = override_settings(
+            MEDIA_ROOT=os.path.join(media, 'public'), PRIVATE_MEDIA_ROOT=os.path.join(media, 'private'),
+            UPLOAD_MAX_SIZES={'identity_document': 2048},
+        )
+        limits.enable()
+        self.addCleanup(limits.disable)
+
+    def register(self, **files):
+        return self.client.post(reverse('user-registration'), {
+            'username': "founder", 'first_name': "Ada", 'last_name': "Obi", 'email': "founder@example.com",
+            'password': "password123", 'bank_name': "Bank", 'account_number': "0123456789",
+            'user_type': 'founder', **files,
+        })
+
+    def test_document_within_limits_is_saved(self):
+        response = self.register(identity_document=make_scan())
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username="founder").identity_document.name.startswith('identity_documents/'))
+
+    def test_oversized_document_is_rejected(self):
+        # Past the field limit mid-stream, and a body too large to be read at all
+        for size in ((40, 40), (512, 512)):
+            response = self.register(identity_document=make_scan(size=size))
+            self.assertEqual(response.status_code, 413)
+        self.assertFalse(User.objects.exists())
+
+    def test_declared_type_must_be_an_accepted_image(self):
+        response = self.register(identity_document=SimpleUploadedFile("id.pdf", b"%PDF-1.4", 'application/pdf'))
+        self.assertEqual(response.status_code, 415)
+
+    def test_content_must_match_declared_type(self):
+        response = self.register(identity_document=SimpleUploadedFile("id.jpg", b"<html>" * 10, 'image/jpeg'))
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(User.objects.exists())
+
+    def test_files_in_other_fields_are_rejected(self):
+        response = self.register(identity_document=make_scan(), avatar=make_scan(name="me.png"))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.exists())
+
+    def test_upload_is_hashed_while_streamed(self):
+        scan = make_scan()
+        content = scan.read()
+        scan.seek(0)
+        request = RequestFactory().post('/', {'identity_document': scan})
+        request.upload_handlers = [LimitedUploadHandler(request, {'identity_document': 2048})]
+        uploaded = request.FILES['identity_document']
+        self.assertEqual(uploaded.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(uploaded.read(), content)
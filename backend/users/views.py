@@ -10,20 +10,19 @@ from .serializers import (
 )
 from .permissions import IsAccountApproved
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from backend.uploads import LimitedUploadMixin
+from payments.services import InsufficientBalance, debit_balance
 
 User = get_user_model()
 
-class UserRegistrationView(APIView):
+class UserRegistrationView(LimitedUploadMixin, APIView):
+    upload_fields = ('identity_document',)
+
     def post(self, request):
-        print("Received data:", request.data)  # Log incoming data
-        
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response({'message': 'User registered successfully!'}, status=status.HTTP_201_CREATED)
-        
-        print("Errors:", serializer.errors)  # Log errors if validation fails
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -51,14 +50,12 @@ class WithdrawView(APIView):
             amount = serializer.validated_data['amount']
             user = request.user
 
-            if user.balance < amount:
+            # Checked and decremented in one guarded UPDATE, recorded in the balance ledger
+            try:
+                debit_balance(user, amount, source='withdrawal')
+            except InsufficientBalance:
                 return Response({'error': 'Insufficient balance.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Perform withdrawal within a transaction
-            with transaction.atomic():
-                user.balance -= amount
-                user.save()
-
             return Response({'message': 'Withdrawal successful.', 'new_balance': user.balance}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
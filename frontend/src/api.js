@@ -5,7 +5,7 @@ const API_BASE_URL = "https://localhost:8000/api";
 export const fetchCampaigns = async (search = "") => {
   try {
     const response = await axios.get(`${API_BASE_URL}/campaigns/campaign/search/?search=${search}`);
-    return response.data;
+    return response.data.results;
   } catch (error) {
     console.error("Error fetching campaigns:", error);
     return [];
@@ -1,6 +1,7 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
 import api from "../utils/api";
+import { variantSrcSet } from "../utils/images";
 import { toast } from "react-toastify";
 
 const CampaignCard = ({ campaign, isFounder = false, refreshCampaigns, user }) => {
@@ -38,7 +39,9 @@ const CampaignCard = ({ campaign, isFounder = false, refreshCampaigns, user }) =
             const verifyResponse = await api.get(
               `/payments/verify/${reference}/?campaign_id=${campaign.id}`
             );
-            if (verifyResponse.data.message) {
+            if (verifyResponse.data.status === "pending") {
+              toast.info("Payment received. Confirmation is still pending.");
+            } else if (verifyResponse.data.message) {
               toast.success("Payment verified successfully.");
               if (refreshCampaigns) refreshCampaigns();
             } else {
@@ -76,7 +79,9 @@ const CampaignCard = ({ campaign, isFounder = false, refreshCampaigns, user }) =
             const verifyResponse = await api.get(
               `/campaigns/repayment/verify/${reference}/?campaign_id=${campaign.id}`
             );
-            if (verifyResponse.data.message) {
+            if (verifyResponse.data.status === "pending") {
+              toast.info("Repayment received. Confirmation is still pending.");
+            } else if (verifyResponse.data.message) {
               toast.success("Repayment verified successfully.");
               if (refreshCampaigns) refreshCampaigns();
             } else {
@@ -127,11 +132,31 @@ const CampaignCard = ({ campaign, isFounder = false, refreshCampaigns, user }) =
         </div>
       )}
       <div className="relative">
-        <img
-          src={campaign.image || "https://via.placeholder.com/300"}
-          alt={campaign.title}
-          className="w-full h-48 object-contain rounded-md mb-4"
-        />
+        <picture>
+          {campaign.image_variants && (
+            <source
+              type="image/webp"
+              srcSet={variantSrcSet(campaign.image_variants, "webp")}
+              sizes="(min-width: 768px) 33vw, 100vw"
+            />
+          )}
+          <img
+            src={
+              campaign.image_variants?.card.jpeg ||
+              campaign.image ||
+              "https://via.placeholder.com/300"
+            }
+            srcSet={
+              campaign.image_variants
+                ? variantSrcSet(campaign.image_variants, "jpeg")
+                : undefined
+            }
+            sizes="(min-width: 768px) 33vw, 100vw"
+            loading="lazy"
+            alt={campaign.title}
+            className="w-full h-48 object-contain rounded-md mb-4"
+          />
+        </picture>
         <div className="absolute inset-0 bg-black opacity-[0.5%] rounded-md"></div>
       </div>
       <div className="flex-1">
@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
 import api from "../utils/api";
 import { toast } from "react-toastify";
+import { variantSrcSet } from "../utils/images";
 
 const CampaignDetail = () => {
   const { id } = useParams(); // Get campaign ID from URL
@@ -46,6 +47,18 @@ const CampaignDetail = () => {
     fetchUser();
   }, [id]);
 
+  // Live funding / repayment progress pushed by the server after each committed payment
+  useEffect(() => {
+    const stream = new EventSource(
+      `${import.meta.env.VITE_API_URL}/campaigns/campaign/${id}/progress/stream/`
+    );
+    stream.addEventListener("progress", (event) => {
+      const progress = JSON.parse(event.data);
+      setCampaign((current) => (current ? { ...current, ...progress } : current));
+    });
+    return () => stream.close();
+  }, [id]);
+
   // Process a loan/investment
   const processInvest = async (amount) => {
     setBtnLoading(true);
@@ -63,7 +76,9 @@ const CampaignDetail = () => {
             const verifyResponse = await api.get(
               `/payments/verify/${reference}/?campaign_id=${campaign.id}`
             );
-            if (verifyResponse.data.message) {
+            if (verifyResponse.data.status === "pending") {
+              toast.info("Payment received. Confirmation is still pending.");
+            } else if (verifyResponse.data.message) {
               toast.success("Payment verified successfully.");
               fetchCampaignDetail();
             } else {
@@ -100,7 +115,9 @@ const CampaignDetail = () => {
             const verifyResponse = await api.get(
               `/campaigns/repayment/verify/${reference}/?campaign_id=${campaign.id}`
             );
-            if (verifyResponse.data.message) {
+            if (verifyResponse.data.status === "pending") {
+              toast.info("Repayment received. Confirmation is still pending.");
+            } else if (verifyResponse.data.message) {
               toast.success("Repayment verified successfully.");
               fetchCampaignDetail();
             } else {
@@ -138,11 +155,28 @@ const CampaignDetail = () => {
       <div className="bg-white rounded-lg shadow overflow-hidden">
         {/* Campaign Image */}
         <div className="relative w-full">
-          <img
-            src={campaign.image || "https://via.placeholder.com/600x400"}
-            alt={campaign.title}
-            className="w-full h-80 object-contain"
-          />
+          <picture>
+            {campaign.image_variants && (
+              <source
+                type="image/webp"
+                srcSet={variantSrcSet(campaign.image_variants, "webp")}
+              />
+            )}
+            <img
+              src={
+                campaign.image_variants?.full.jpeg ||
+                campaign.image ||
+                "https://via.placeholder.com/600x400"
+              }
+              srcSet={
+                campaign.image_variants
+                  ? variantSrcSet(campaign.image_variants, "jpeg")
+                  : undefined
+              }
+              alt={campaign.title}
+              className="w-full h-80 object-contain"
+            />
+          </picture>
           <div className="absolute inset-0 bg-black opacity-1"></div>
         </div>
 
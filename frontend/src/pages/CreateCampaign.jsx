@@ -1,6 +1,7 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
 import api from "../utils/api";
+import { directUpload } from "../utils/uploads";
 import { toast } from "react-toastify";
 
 const CreateCampaign = () => {
@@ -29,13 +30,16 @@ const CreateCampaign = () => {
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
-    const campaignData = new FormData();
-    Object.keys(formData).forEach((key) => {
-      if (formData[key]) {
-        campaignData.append(key, formData[key]);
-      }
-    });
     try {
+      // Files go straight to storage; the form carries their upload tokens
+      const campaignData = new FormData();
+      for (const key of Object.keys(formData)) {
+        if (formData[key] instanceof File) {
+          campaignData.append(`${key}_upload`, await directUpload(key, formData[key]));
+        } else if (formData[key]) {
+          campaignData.append(key, formData[key]);
+        }
+      }
       await api.post("/campaigns/create/", campaignData, {
         headers: { "Content-Type": "multipart/form-data" },
       });
@@ -7,6 +7,7 @@ import CampaignCard from "../components/CampaignCard";
 const Dashboard = () => {
   const [user, setUser] = useState(null);
   const [campaigns, setCampaigns] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [searchTerm, setSearchTerm] = useState("");
   const [refresh, setRefresh] = useState(false);
   const [showWithdrawModal, setShowWithdrawModal] = useState(false);
@@ -14,10 +15,14 @@ const Dashboard = () => {
 
   const navigate = useNavigate();
 
-  const fetchCampaigns = async () => {
+  // Campaigns are cursor-paginated; `next` is the absolute URL of the following page
+  const fetchCampaigns = async (pageUrl = null) => {
     try {
-      const response = await api.get("/campaigns/create/");
-      setCampaigns(response.data);
+      const response = await api.get(pageUrl || "/campaigns/create/");
+      setCampaigns((prev) =>
+        pageUrl ? [...prev, ...response.data.results] : response.data.results
+      );
+      setNextPage(response.data.next);
     } catch (error) {
       toast.error("Failed to fetch campaigns.");
     }
@@ -171,6 +176,16 @@ const Dashboard = () => {
             </div>
           </div>
         )}
+        {nextPage && (
+          <div className="flex justify-center mt-6">
+            <button
+              className="bg-green-500 hover:bg-green-600 transition-colors text-white px-5 py-2 rounded"
+              onClick={() => fetchCampaigns(nextPage)}
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Withdraw Modal */}
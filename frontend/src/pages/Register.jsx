@@ -1,6 +1,7 @@
 import { useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import api from "../utils/api";
+import { directUpload } from "../utils/uploads";
 import { toast } from "react-toastify";
 import AuthNavbar from "../components/AuthNavbar";
 
@@ -37,11 +38,14 @@ const Register = () => {
     try {
       const formDataToSend = new FormData();
       for (let key in formData) {
-        if (formData[key]) {
+        if (key === "identity_document" && formData[key]) {
+          // Uploaded straight to storage; the form carries its upload token
           formDataToSend.append(
-            key,
-            key === "identity_document" ? formData[key] : formData[key].toString()
+            "identity_document_upload",
+            await directUpload(key, formData[key])
           );
+        } else if (formData[key]) {
+          formDataToSend.append(key, formData[key].toString());
         }
       }
       await api.post("/users/register/", formDataToSend, {
@@ -0,0 +1,5 @@
+// Build a srcset string from a campaign's image_variants for one format ("webp" or "jpeg")
+export const variantSrcSet = (variants, format) =>
+  Object.values(variants)
+    .map((variant) => `${variant[format]} ${variant.width}w`)
+    .join(", ");
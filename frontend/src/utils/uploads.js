@@ -0,0 +1,25 @@
+import api from "./api";
+
+// Upload a file straight to media storage and return the token to send as `${field}_upload`.
+// Files the server already has (same SHA-256) are not sent again.
+export const directUpload = async (field, file) => {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  const sha256 = Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, "0"))
+    .join("");
+  const { data } = await api.post("/uploads/direct/", {
+    field,
+    content_type: file.type,
+    size: file.size,
+    sha256,
+  });
+  if (data.upload) {
+    const response = await fetch(data.upload.url, {
+      method: data.upload.method,
+      headers: data.upload.headers,
+      body: file,
+    });
+    if (!response.ok) throw new Error(`Upload of ${file.name} failed`);
+  }
+  return data.token;
+};